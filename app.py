@@ -8,9 +8,8 @@ Date: November 2025
 Version: 1.0.0
 """
 
-from flask import Flask, render_template, session, jsonify, request
+from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
-from flask_session import Session
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -52,7 +51,10 @@ class ProductionConfig:
     TESTING = False
     
     # Session configuration
-    SESSION_TYPE = 'filesystem'
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'filesystem')  # filesystem, sqlalchemy or redis
+    SESSION_FILE_DIR = os.environ.get('SESSION_FILE_DIR', 'flask_session')
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_PERMANENT = True
     PERMANENT_SESSION_LIFETIME = 3600
     SESSION_COOKIE_SECURE = False  # Set to True if using HTTPS
     SESSION_COOKIE_HTTPONLY = True
@@ -70,6 +72,47 @@ class ProductionConfig:
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@edubot.com')
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    
+    # Performance monitoring
+    PERFORMANCE_SAMPLE_INTERVAL = float(os.environ.get('PERFORMANCE_SAMPLE_INTERVAL', 5))
+    PERFORMANCE_HISTORY_SIZE = int(os.environ.get('PERFORMANCE_HISTORY_SIZE', 120))
+    QUERY_MONITOR_ENABLED = os.environ.get('QUERY_MONITOR_ENABLED', 'True').lower() == 'true'
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False').lower() == 'true'
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', 0.1))
+    TRACING_EXPORT_PATH = os.environ.get('TRACING_EXPORT_PATH', '')
+    CONTEXT_HOT_CAPACITY = int(os.environ.get('CONTEXT_HOT_CAPACITY', 1000))
+    CONTEXT_HOT_TTL = int(os.environ.get('CONTEXT_HOT_TTL', 300))
+    CONTEXT_FLUSH_INTERVAL = float(os.environ.get('CONTEXT_FLUSH_INTERVAL', 2.0))
+    SWEEPER_ENABLED = os.environ.get('SWEEPER_ENABLED', 'True').lower() == 'true'
+    SWEEPER_INTERVAL = int(os.environ.get('SWEEPER_INTERVAL', 300))
+    SWEEPER_BATCH_SIZE = int(os.environ.get('SWEEPER_BATCH_SIZE', 500))
+    SESSION_RETENTION_DAYS = int(os.environ.get('SESSION_RETENTION_DAYS', 30))
+    SENTIMENT_LEXICON_PATH = os.environ.get('SENTIMENT_LEXICON_PATH', '')
+    LECTURE_SUMMARIZER_ENGINE = os.environ.get('LECTURE_SUMMARIZER_ENGINE', 'tfidf')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 100))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_DELAY = float(os.environ.get('JOB_RETRY_DELAY', 5.0))
+    JOB_STALE_AFTER = float(os.environ.get('JOB_STALE_AFTER', 300))
+    LECTURE_SIMHASH_DISTANCE = int(os.environ.get('LECTURE_SIMHASH_DISTANCE', 3))
+    LECTURE_MAX_TRANSCRIPT_BYTES = int(os.environ.get('LECTURE_MAX_TRANSCRIPT_BYTES', 2 * 1024 * 1024))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'True').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL', '')
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 0))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 5.0))
+    PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    JWT_REVOCATION_BACKEND = os.environ.get('JWT_REVOCATION_BACKEND', 'sqlalchemy')
+    JWT_REVOCATION_REDIS_URL = os.environ.get('JWT_REVOCATION_REDIS_URL', '')
+    JWT_REVOCATION_SYNC_INTERVAL = float(os.environ.get('JWT_REVOCATION_SYNC_INTERVAL', 5.0))
+    JWT_REVOCATION_CAPACITY = int(os.environ.get('JWT_REVOCATION_CAPACITY', 100000))
 
 # Initialize Flask app
 app = Flask(__name__, 
@@ -83,7 +126,10 @@ logger = StructuredLogger.get_logger(
     log_file=os.getenv('LOG_FILE', 'logs/edubot.log'),
     level=os.getenv('LOG_LEVEL', 'INFO'),
     max_bytes=int(os.getenv('LOG_MAX_SIZE', 10485760)),
-    backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5))
+    backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+    async_mode=os.getenv('LOG_ASYNC', 'True').lower() == 'true',
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('LOG_BATCH_SIZE', 100))
 )
 app.logger = logger
 logger.info('EduBot application starting...')
@@ -104,13 +150,28 @@ except Exception as e:
 
 # Initialize extensions
 from database import db
+from database.engine import configure_engine_options, init_engine
+configure_engine_options(app)
 db.init_app(app)
+try:
+    init_engine(app, db)
+except Exception as e:
+    print(f"[WARNING] Database engine tuning failed: {e}")
+
+# Initialize Read Replica Routing
+try:
+    from database.replica import init_replica
+    app.replica_router = init_replica(app)
+except Exception as e:
+    print(f"[WARNING] Read replica initialization failed: {e}")
+    app.replica_router = None
 
 # Enable CORS
 CORS(app, resources={r"/api/*": {"origins": app.config['CORS_ORIGINS']}})
 
 # Session configuration
-Session(app)
+from backend.session_store import init_session_store
+init_session_store(app)
 
 # Create required directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -180,6 +241,15 @@ except Exception as e:
     print(f"[WARNING] I18n initialization failed: {e}")
     app.i18n = None
 
+# Apply pending schema migrations
+try:
+    from database.migrations import run_migrations
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+except Exception as e:
+    print(f"[WARNING] Schema migrations failed: {e}")
+
 # Initialize Context Memory Manager
 try:
     from backend.context_manager import init_context_manager
@@ -189,6 +259,45 @@ except Exception as e:
     print(f"[WARNING] Context Manager initialization failed: {e}")
     app.context_manager = None
 
+# Initialize Expiry Sweeper
+try:
+    from backend.expiry_sweeper import init_expiry_sweeper
+    app.expiry_sweeper = init_expiry_sweeper(app)
+except Exception as e:
+    print(f"[WARNING] Expiry Sweeper initialization failed: {e}")
+    app.expiry_sweeper = None
+
+# Initialize Job Queue
+try:
+    from backend.job_queue import init_job_queue
+    app.job_queue = init_job_queue(app)
+except Exception as e:
+    print(f"[WARNING] Job Queue initialization failed: {e}")
+    app.job_queue = None
+
+# Initialize Principal Cache
+try:
+    from backend.principal_cache import init_principal_cache
+    app.principal_cache = init_principal_cache(app)
+except Exception as e:
+    print(f"[WARNING] Principal Cache initialization failed: {e}")
+    app.principal_cache = None
+
+# Initialize Lecture Content Store
+try:
+    from backend.lecture_store import init_lecture_store
+    app.lecture_store = init_lecture_store(app)
+except Exception as e:
+    print(f"[WARNING] Lecture Content Store initialization failed: {e}")
+    app.lecture_store = None
+
+# Initialize Sentiment Analyzer
+try:
+    from backend.sentiment_analyzer import init_sentiment_analyzer
+    init_sentiment_analyzer(app)
+except Exception as e:
+    print(f"[WARNING] Sentiment Analyzer initialization failed: {e}")
+
 # Initialize Autocomplete Engine
 try:
     from backend.autocomplete_engine import init_autocomplete
@@ -219,6 +328,14 @@ except Exception as e:
     print(f"[WARNING] Security Manager initialization failed: {e}")
     app.security_manager = None
 
+# Initialize JWT Revocation List
+try:
+    from backend.token_revocation import init_token_revocation
+    app.token_revocations = init_token_revocation(app)
+except Exception as e:
+    print(f"[WARNING] Token revocation list initialization failed: {e}")
+    app.token_revocations = None
+
 # Initialize JWT Authentication
 try:
     from routes.auth_routes import init_auth
@@ -244,10 +361,18 @@ try:
     from backend.performance_monitor import performance_monitor
     from backend.rate_limiter import rate_limiter
     from backend.knowledge_gap_analyzer import KnowledgeGapAnalyzer
+    from backend.query_monitor import init_query_monitor
+    from backend.tracing import init_tracing
     
     app.performance_monitor = performance_monitor
     app.rate_limiter = rate_limiter
+    performance_monitor.start_sampler(
+        interval=app.config.get('PERFORMANCE_SAMPLE_INTERVAL', 5),
+        history_size=app.config.get('PERFORMANCE_HISTORY_SIZE', 120)
+    )
     app.knowledge_gap = KnowledgeGapAnalyzer(db)
+    app.query_monitor = init_query_monitor(app)
+    app.tracer = init_tracing(app)
     
     print("[OK] Performance Monitor initialized")
     print("[OK] Rate Limiter initialized")
@@ -264,31 +389,15 @@ except Exception as e:
     print(f"[WARNING] API Documentation initialization failed: {e}")
 
 
-# Request/Response Logging Middleware
-import time
-from backend.logging_system import StructuredLogger
-
-@app.before_request
-def log_request_start():
-    """Log request start time"""
-    request.start_time = time.time()
-
-@app.after_request
-def log_request_end(response):
-    """Log request completion"""
-    if hasattr(request, 'start_time'):
-        duration_ms = (time.time() - request.start_time) * 1000
-        user_id = getattr(request, 'user_id', None)
-        
-        StructuredLogger.log_request(
-            app.logger,
-            request,
-            response.status_code,
-            duration_ms,
-            user_id
-        )
-    
-    return response
+# Request timing, rate limiting, logging and metrics in one WSGI pass
+from backend.request_middleware import init_request_middleware
+init_request_middleware(
+    app,
+    logger=app.logger,
+    monitor=getattr(app, 'performance_monitor', None),
+    rate_limiter=getattr(app, 'rate_limiter', None),
+    query_monitor=getattr(app, 'query_monitor', None)
+)
 
 
 def initialize_database():
@@ -314,74 +423,6 @@ def initialize_database():
             print(f"[OK] Admin user created: {admin.username}")
 
 
-@app.before_request
-def before_request():
-    """Before each request - rate limiting and performance tracking"""
-    import time
-    from flask import request, jsonify
-    
-    # Set session permanent
-    session.permanent = True
-    
-    # Track request start time
-    request.start_time = time.time()
-    
-    # Get client identifier (IP or user_id)
-    client_ip = request.remote_addr
-    user_id = session.get('user_id')
-    identifier = f"user_{user_id}" if user_id else client_ip
-    
-    # Check rate limit for API endpoints
-    if request.path.startswith('/api/'):
-        try:
-            from backend.rate_limiter import rate_limiter
-            
-            limit_type = 'user' if user_id else 'ip'
-            result = rate_limiter.check_rate_limit(identifier, limit_type)
-            
-            if not result['allowed']:
-                response = jsonify({
-                    'error': 'Rate limit exceeded',
-                    'reason': result['reason'],
-                    'retry_after': result.get('retry_after'),
-                    'limit': result.get('limit'),
-                    'period': result.get('period')
-                })
-                response.status_code = 429
-                response.headers['Retry-After'] = str(result.get('retry_after', 60))
-                return response
-        except:
-            pass  # If rate limiter fails, allow request
-
-
-@app.after_request
-def after_request(response):
-    """After each request - track performance"""
-    import time
-    from flask import request
-    
-    # Calculate request duration
-    if hasattr(request, 'start_time'):
-        duration = time.time() - request.start_time
-        
-        # Track in performance monitor
-        try:
-            from backend.performance_monitor import performance_monitor
-            
-            user_id = session.get('user_id')
-            performance_monitor.track_request(
-                endpoint=request.endpoint or request.path,
-                method=request.method,
-                duration=duration,
-                status_code=response.status_code,
-                user_id=user_id
-            )
-        except:
-            pass  # If tracking fails, don't break request
-    
-    return response
-
-
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
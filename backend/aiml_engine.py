@@ -15,6 +15,7 @@ class AIMLEngine:
         self.aiml_dir = aiml_dir
         self.kernel = aiml.Kernel()
         self.loaded = False
+        self.pattern_listeners = []
         self.load_patterns()
     
     def load_patterns(self):
@@ -52,6 +53,7 @@ class AIMLEngine:
             
             self.loaded = True
             print(f"[OK] AIML Engine initialized with {len(pattern_files)} pattern files")
+            self._notify_pattern_listeners()
             return True
             
         except Exception as e:
@@ -261,6 +263,7 @@ class AIMLEngine:
                 # Reload the pattern
                 self.kernel.learn(kb_file)
                 print(f"[OK] Added new pattern: {pattern}")
+                self._notify_pattern_listeners()
                 return True
             
             return False
@@ -281,6 +284,52 @@ class AIMLEngine:
         except:
             return 0
     
+    def iter_patterns(self):
+        """
+        Iterate over the loaded pattern strings (e.g. "WHAT IS *")
+        
+        Walks the kernel's in-memory pattern tree, so nothing is reparsed.
+        <that>/<topic> qualifiers are not included.
+        """
+        brain = getattr(self.kernel, '_brain', None)
+        if brain is None:
+            return
+        
+        wildcards = {
+            brain._UNDERSCORE: '_',
+            brain._STAR: '*',
+            brain._BOT_NAME: 'BOT_NAME'
+        }
+        ends = (brain._TEMPLATE, brain._THAT, brain._TOPIC)
+        stack = [(brain._root, ())]
+        
+        while stack:
+            node, words = stack.pop()
+            if words and any(end in node for end in ends):
+                yield ' '.join(words)
+            for key, child in node.items():
+                if isinstance(key, str):
+                    stack.append((child, words + (key,)))
+                elif key in wildcards:
+                    stack.append((child, words + (wildcards[key],)))
+    
+    def add_pattern_listener(self, callback):
+        """
+        Call callback(engine) whenever patterns are (re)loaded or added
+        
+        Args:
+            callback: Function taking this engine
+        """
+        self.pattern_listeners.append(callback)
+    
+    def _notify_pattern_listeners(self):
+        """Tell listeners the pattern set changed"""
+        for callback in self.pattern_listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"[ERROR] AIML pattern listener failed: {str(e)}")
+    
     def set_predicate(self, name, value, session_id='default'):
         """Set a predicate for the session"""
         self.kernel.setPredicate(name, value, sessionID=session_id)
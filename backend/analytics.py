@@ -5,6 +5,14 @@ Provides analytics and reporting capabilities
 from datetime import datetime, timedelta
 from collections import Counter
 
+from database.replica import read_only
+
+
+CONVERSATION_EXPORT_FIELDS = [
+    'conversation_id', 'user_id', 'username', 'session_id', 'message_type', 'message',
+    'response', 'sentiment', 'confidence_score', 'feedback_rating', 'timestamp'
+]
+
 
 class Analytics:
     """Handles analytics and reporting"""
@@ -12,6 +20,7 @@ class Analytics:
     def __init__(self, db_manager):
         self.db_manager = db_manager
     
+    @read_only()
     def get_dashboard_stats(self):
         """Get main dashboard statistics"""
         try:
@@ -34,7 +43,7 @@ class Analytics:
     def _get_recent_feedback_summary(self, days=7):
         """Get recent feedback summary"""
         try:
-            all_feedback = self.db_manager.get_all_feedback(page=1, per_page=9999)
+            all_feedback = self.db_manager.get_all_feedback(per_page=9999)
             
             since_date = datetime.utcnow() - timedelta(days=days)
             recent = [
@@ -125,11 +134,12 @@ class Analytics:
             print(f"Error calculating growth metrics: {str(e)}")
             return {}
     
+    @read_only()
     def get_user_engagement(self, user_id):
         """Get engagement metrics for a specific user"""
         try:
             analytics = self.db_manager.get_analytics(user_id)
-            conversations = self.db_manager.get_user_conversations(user_id, page=1, per_page=9999)
+            conversations = self.db_manager.get_user_conversations(user_id, per_page=9999)
             
             if not analytics:
                 return None
@@ -158,6 +168,7 @@ class Analytics:
             print(f"Error getting user engagement: {str(e)}")
             return None
     
+    @read_only()
     def get_popular_topics(self, limit=10):
         """Get most popular topics based on conversations"""
         try:
@@ -189,12 +200,13 @@ class Analytics:
             print(f"Error getting popular topics: {str(e)}")
             return []
     
+    @read_only()
     def get_response_time_stats(self):
         """Get response time statistics"""
         try:
             # This would require storing response times - simplified version
             all_analytics = []
-            users = self.db_manager.get_all_users(page=1, per_page=9999)
+            users = self.db_manager.get_all_users(per_page=9999)
             
             for user in users.items:
                 analytics = self.db_manager.get_analytics(user.user_id)
@@ -219,6 +231,7 @@ class Analytics:
             print(f"Error getting response time stats: {str(e)}")
             return {}
     
+    @read_only()
     def get_hourly_activity(self, days=7):
         """Get hourly activity distribution"""
         try:
@@ -246,6 +259,49 @@ class Analytics:
             print(f"Error getting hourly activity: {str(e)}")
             return {}
     
+    @read_only()
+    def iter_conversation_rows(self, user_id=None, days=None, batch_size=1000):
+        """
+        Stream conversations with their feedback rating, oldest first, for export
+
+        Args:
+            user_id: Only this user's conversations (None for all)
+            days: Only conversations from the last N days (None for all)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            generator: Row dicts (see CONVERSATION_EXPORT_FIELDS)
+        """
+        from database import db
+        from database.models import Conversation, Feedback, User
+        from backend.streaming_export import iter_rows
+
+        statement = db.select(
+            Conversation.conversation_id,
+            Conversation.user_id,
+            User.username,
+            Conversation.session_id,
+            Conversation.message_type,
+            Conversation.message,
+            Conversation.response,
+            Conversation.sentiment,
+            Conversation.confidence_score,
+            Feedback.rating.label('feedback_rating'),
+            Conversation.timestamp
+        ).outerjoin(
+            User, Conversation.user_id == User.user_id
+        ).outerjoin(
+            Feedback, Feedback.conversation_id == Conversation.conversation_id
+        ).order_by(Conversation.conversation_id)
+
+        if user_id:
+            statement = statement.where(Conversation.user_id == user_id)
+        if days:
+            statement = statement.where(Conversation.timestamp >= datetime.utcnow() - timedelta(days=days))
+
+        return iter_rows(statement, batch_size=batch_size)
+    
+    @read_only()
     def export_analytics_report(self, user_id=None):
         """Export comprehensive analytics report"""
         try:
@@ -4,8 +4,15 @@ Provides intelligent question suggestions using AIML patterns and NLP
 """
 
 from typing import List, Dict, Set
+import heapq
 import re
-from difflib import SequenceMatcher
+
+from backend.suggestion_index import SuggestionIndex, normalize
+from backend.trending_tracker import TrendingTracker
+
+# Display icon and base popularity per suggestion source
+SOURCE_ICONS = {'popular': '⭐', 'history': '🕒', 'aiml': '🤖'}
+SOURCE_WEIGHTS = {'popular': 3.0, 'history': 2.0, 'aiml': 1.0}
 
 class AutocompleteEngine:
     """Smart autocomplete engine with pattern matching and NLP"""
@@ -20,9 +27,14 @@ class AutocompleteEngine:
         self.aiml_engine = aiml_engine
         self.patterns = set()
         self.popular_questions = []
-        self.user_query_history = []
-        self.max_history = 100
-        self.min_similarity = 0.6
+        self.max_history = 20
+        # Trending counts plus each user's recent queries
+        self.trending = TrendingTracker(history_size=self.max_history)
+        self.index = SuggestionIndex()
+        self._history_keys = {}
+        # AIML patterns added since the last index build, as (text, ' ' + key)
+        self.pending_patterns = []
+        self.max_pending_patterns = 200
         
         # Pre-defined popular questions
         self.init_popular_questions()
@@ -30,6 +42,10 @@ class AutocompleteEngine:
         # Extract patterns from AIML if available
         if aiml_engine:
             self.extract_aiml_patterns()
+            if hasattr(aiml_engine, 'add_pattern_listener'):
+                aiml_engine.add_pattern_listener(self.refresh_patterns)
+        
+        self.rebuild_index()
     
     def init_popular_questions(self):
         """Initialize list of popular questions"""
@@ -76,25 +92,75 @@ class AutocompleteEngine:
             "Export chat history"
         ]
     
+    def load_aiml_patterns(self) -> Set[str]:
+        """
+        Read the cleaned pattern set from the AIML engine
+        
+        Returns:
+            set: Suggestion texts for the loaded patterns
+        """
+        patterns = set()
+        for pattern in self.aiml_engine.iter_patterns():
+            clean_text = self.clean_pattern(pattern)
+            if len(clean_text) >= 2:
+                patterns.add(clean_text)
+        return patterns
+    
     def extract_aiml_patterns(self):
         """Extract patterns from AIML engine"""
         try:
-            if hasattr(self.aiml_engine, 'brain'):
-                # Extract pattern texts
-                patterns = []
-                for pattern in self.aiml_engine.brain._patternsTemplate:
-                    pattern_text = pattern.template
-                    if pattern_text:
-                        # Clean pattern text
-                        clean_text = self.clean_pattern(pattern_text)
-                        if clean_text:
-                            patterns.append(clean_text)
-                
-                self.patterns = set(patterns)
-                print(f"[Autocomplete] Extracted {len(self.patterns)} AIML patterns")
+            self.patterns = self.load_aiml_patterns()
+            print(f"[Autocomplete] Extracted {len(self.patterns)} AIML patterns")
         except Exception as e:
             print(f"[Autocomplete] Could not extract AIML patterns: {e}")
     
+    def refresh_patterns(self, aiml_engine=None) -> Dict:
+        """
+        Bring suggestions in line with the AIML engine after a (re)load
+        
+        New patterns are served from a small pending list until it fills
+        up; removals, or a full pending list, rebuild the index.
+        
+        Args:
+            aiml_engine: Engine that changed (defaults to the attached one)
+            
+        Returns:
+            dict: Counts of added and removed patterns and whether the index was rebuilt
+        """
+        if aiml_engine is not None:
+            self.aiml_engine = aiml_engine
+        
+        patterns = self.load_aiml_patterns()
+        added = patterns - self.patterns
+        removed = self.patterns - patterns
+        rebuilt = False
+        
+        if removed or len(self.pending_patterns) + len(added) > self.max_pending_patterns:
+            self.patterns = patterns
+            self.rebuild_index()
+            rebuilt = True
+        elif added:
+            self.patterns = patterns
+            self.pending_patterns = self.pending_patterns + [
+                (text, ' ' + normalize(text)) for text in sorted(added)
+            ]
+        
+        return {'added': len(added), 'removed': len(removed), 'rebuilt': rebuilt}
+    
+    def rebuild_index(self):
+        """Compile popular questions and AIML patterns into the suggestion index"""
+        count = len(self.popular_questions)
+        candidates = [
+            # Earlier popular questions rank slightly higher
+            (question, 'popular', SOURCE_WEIGHTS['popular'] + (count - i) / (count + 1))
+            for i, question in enumerate(self.popular_questions)
+        ]
+        candidates.extend(
+            (pattern, 'aiml', SOURCE_WEIGHTS['aiml']) for pattern in self.patterns
+        )
+        self.index = SuggestionIndex(candidates)
+        self.pending_patterns = []
+    
     def clean_pattern(self, pattern: str) -> str:
         """
         Clean AIML pattern text
@@ -106,110 +172,105 @@ class AutocompleteEngine:
             str: Cleaned pattern
         """
         # Remove AIML wildcards and special chars
-        pattern = re.sub(r'[*_#]', '', pattern)
+        pattern = re.sub(r'\bBOT_NAME\b|[*_#^$]', '', pattern)
         # Remove extra spaces
         pattern = ' '.join(pattern.split())
-        # Capitalize first letter
+        # Sentence case (patterns are stored upper case)
         if pattern:
-            pattern = pattern[0].upper() + pattern[1:]
+            pattern = pattern[0].upper() + pattern[1:].lower()
         return pattern
     
-    def get_suggestions(self, query: str, limit: int = 5) -> List[Dict]:
+    def get_suggestions(self, query: str, limit: int = 5, user_id=None) -> List[Dict]:
         """
         Get autocomplete suggestions for a query
         
         Args:
             query: User's partial query
             limit: Maximum number of suggestions
+            user_id: User whose recent queries are suggested (None for none)
             
         Returns:
             list: List of suggestion dictionaries with text, score, and source
         """
-        if not query or len(query) < 2:
+        if not query or len(query.strip()) < 2:
             return []
         
-        query = query.lower().strip()
-        suggestions = []
-        
-        # Search in popular questions
-        for question in self.popular_questions:
-            similarity = self.calculate_similarity(query, question.lower())
-            if similarity > self.min_similarity or question.lower().startswith(query):
-                suggestions.append({
-                    'text': question,
-                    'score': similarity,
-                    'source': 'popular',
-                    'icon': '⭐'
-                })
+        # (score, source weight, order, text, source); order keeps ties stable
+        candidates = []
         
-        # Search in user history
-        for past_query in reversed(self.user_query_history):
-            similarity = self.calculate_similarity(query, past_query.lower())
-            if similarity > self.min_similarity or past_query.lower().startswith(query):
-                suggestions.append({
-                    'text': past_query,
-                    'score': similarity,
-                    'source': 'history',
-                    'icon': '🕒'
-                })
+        # Recent history and pending patterns are small, so they are scanned
+        key = normalize(query)
+        self._scan(self._history_entries(user_id), 'history', key, limit, candidates)
+        self._scan(self.pending_patterns, 'aiml', key, limit, candidates)
         
-        # Search in AIML patterns
-        for pattern in self.patterns:
-            similarity = self.calculate_similarity(query, pattern.lower())
-            if similarity > self.min_similarity or pattern.lower().startswith(query):
-                suggestions.append({
-                    'text': pattern,
-                    'score': similarity,
-                    'source': 'aiml',
-                    'icon': '🤖'
-                })
+        for order, (i, score) in enumerate(self.index.search(query, limit)):
+            candidates.append((score, SOURCE_WEIGHTS[self.index.sources[i]], -order,
+                               self.index.texts[i], self.index.sources[i]))
         
-        # Remove duplicates
+        suggestions = []
         seen = set()
-        unique_suggestions = []
-        for suggestion in suggestions:
-            text_lower = suggestion['text'].lower()
-            if text_lower not in seen:
-                seen.add(text_lower)
-                unique_suggestions.append(suggestion)
-        
-        # Sort by score (highest first)
-        unique_suggestions.sort(key=lambda x: x['score'], reverse=True)
+        for score, _, _, text, source in heapq.nlargest(len(candidates), candidates):
+            text_key = normalize(text)
+            if text_key in seen:
+                continue
+            seen.add(text_key)
+            suggestions.append({
+                'text': text,
+                'score': score,
+                'source': source,
+                'icon': SOURCE_ICONS[source]
+            })
+            if len(suggestions) >= limit:
+                break
         
-        # Return top suggestions
-        return unique_suggestions[:limit]
+        return suggestions
+    
+    def _history_entries(self, user_id=None):
+        """A user's recent queries, newest first, as (text, ' ' + normalized text)"""
+        if len(self._history_keys) > 10000:
+            self._history_keys = {}
+        for past_query in self.trending.recent(user_id):
+            padded = self._history_keys.get(past_query)
+            if padded is None:
+                padded = self._history_keys[past_query] = ' ' + normalize(past_query)
+            yield past_query, padded
     
-    def calculate_similarity(self, s1: str, s2: str) -> float:
+    def _scan(self, entries, source: str, key: str, limit: int, candidates: List):
         """
-        Calculate similarity between two strings
+        Collect entries whose words start with the query
         
         Args:
-            s1: First string
-            s2: Second string
-            
-        Returns:
-            float: Similarity score (0-1)
+            entries: (text, ' ' + normalized text) pairs, best first
+            source: Suggestion source name
+            key: Normalized query
+            limit: Prefix hits after which scanning stops
+            candidates: List the (score, weight, order, text, source) tuples go to
         """
-        # Exact prefix match gets bonus
-        if s2.startswith(s1):
-            return 1.0
-        
-        # Use SequenceMatcher for similarity
-        return SequenceMatcher(None, s1, s2).ratio()
+        word_key = ' ' + key
+        prefix_hits = 0
+        for order, (text, padded) in enumerate(entries):
+            if word_key not in padded:
+                continue
+            if padded.startswith(word_key):
+                score = 1.0
+                prefix_hits += 1
+            else:
+                score = round(min(len(key) / (len(padded) - 1), 0.9), 3)
+            candidates.append((score, SOURCE_WEIGHTS[source], -order, text, source))
+            if prefix_hits >= limit:
+                break  # later entries can no longer make the cut
     
-    def add_to_history(self, query: str):
+    def add_to_history(self, query: str, user_id=None):
         """
-        Add query to user history
+        Add query to user history and the trending counts
         
         Args:
             query: User's query
+            user_id: User who asked (None for anonymous visitors, whose
+                     queries only count towards trending)
         """
         if query and len(query.strip()) > 0:
-            self.user_query_history.append(query.strip())
-            
-            # Limit history size
-            if len(self.user_query_history) > self.max_history:
-                self.user_query_history.pop(0)
+            self.trending.record(query, user_id)
     
     def get_category_suggestions(self, category: str, limit: int = 5) -> List[str]:
         """
@@ -255,31 +316,27 @@ class AutocompleteEngine:
         
         return category_questions.get(category, [])[:limit]
     
-    def get_trending_queries(self, limit: int = 5) -> List[str]:
+    def get_trending_queries(self, limit: int = 5, window: str = 'hour') -> List[str]:
         """
-        Get trending queries from recent history
+        Get trending queries across all users
         
         Args:
             limit: Maximum number of queries
+            window: Time window ('hour' or 'day')
             
         Returns:
             list: List of trending queries
         """
-        # Count frequency in recent history
-        recent_queries = self.user_query_history[-50:]  # Last 50 queries
-        query_freq = {}
-        
-        for query in recent_queries:
-            query_freq[query] = query_freq.get(query, 0) + 1
-        
-        # Sort by frequency
-        sorted_queries = sorted(query_freq.items(), key=lambda x: x[1], reverse=True)
-        
-        return [query for query, _ in sorted_queries[:limit]]
+        return [item['query'] for item in self.trending.top(window, limit)]
     
-    def clear_history(self):
-        """Clear user query history"""
-        self.user_query_history = []
+    def clear_history(self, user_id=None):
+        """
+        Clear a user's query history
+        
+        Args:
+            user_id: User whose history is cleared
+        """
+        self.trending.clear_user(user_id)
         print("[Autocomplete] User history cleared")
     
     def get_stats(self) -> Dict:
@@ -291,10 +348,11 @@ class AutocompleteEngine:
         """
         return {
             'total_patterns': len(self.patterns),
+            'pending_patterns': len(self.pending_patterns),
             'popular_questions': len(self.popular_questions),
-            'user_history_size': len(self.user_query_history),
             'max_history': self.max_history,
-            'min_similarity': self.min_similarity
+            'trending': self.trending.get_stats(),
+            'index': self.index.get_stats()
         }
 
 
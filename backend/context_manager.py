@@ -3,54 +3,553 @@ Context Memory Manager
 Manages conversation context across sessions with session storage and database persistence
 """
 
-from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
+import atexit
 import json
+import threading
+import time
 from database.db_manager import db
 
 class ConversationContext(db.Model):
-    """Database model for storing conversation context"""
+    """Database model for a session's conversation context (header row)"""
     __tablename__ = 'conversation_contexts'
     
     context_id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=True)
-    context_data = db.Column(db.Text, nullable=False)  # JSON string
+    # Legacy JSON blob; messages live in context_messages since migration 0001
+    context_data = db.Column(db.Text, nullable=False, default='[]')
     message_count = db.Column(db.Integer, default=0)
-    last_active = db.Column(db.DateTime, default=datetime.utcnow)
+    last_active = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        """Convert to dictionary"""
+    def to_dict(self, messages: Optional[List[Dict]] = None):
+        """
+        Convert to dictionary
+        
+        Args:
+            messages: Context messages; loaded from context_messages if omitted
+        """
+        if messages is None:
+            messages = load_context_messages(self.session_id)
         return {
             'context_id': self.context_id,
             'session_id': self.session_id,
             'user_id': self.user_id,
-            'context_data': json.loads(self.context_data) if self.context_data else [],
+            'context_data': messages,
             'message_count': self.message_count,
             'last_active': self.last_active.isoformat() if self.last_active else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
+class ContextMessage(db.Model):
+    """One message of a conversation context, stored append-only"""
+    __tablename__ = 'context_messages'
+    __table_args__ = (
+        db.Index('ix_context_messages_session_seq', 'session_id', 'seq', unique=True),
+    )
+    
+    message_id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(100), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    sender = db.Column(db.String(20))
+    text = db.Column(db.Text)
+    ts = db.Column(db.DateTime, default=datetime.utcnow)
+    extra = db.Column(db.Text, nullable=True)  # JSON of any other message keys
+
+
+_MESSAGE_KEYS = ('sender', 'text', 'timestamp')
+
+
+def message_to_row(session_id: str, seq: int, message: Dict) -> Dict:
+    """
+    Convert a message dict into a context_messages row mapping
+    
+    Args:
+        session_id: Session the message belongs to
+        seq: Position of the message within the session
+        message: Message dictionary with 'sender', 'text' and 'timestamp'
+        
+    Returns:
+        dict: Column values for a bulk INSERT
+    """
+    extra = {k: v for k, v in message.items() if k not in _MESSAGE_KEYS}
+    ts = None
+    timestamp = message.get('timestamp')
+    if isinstance(timestamp, str):
+        try:
+            ts = datetime.fromisoformat(timestamp)
+            if ts.tzinfo is not None:
+                ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        except ValueError:
+            ts = None
+    if ts is None:
+        ts = datetime.utcnow()
+        if timestamp is not None:
+            # Keep values we cannot store as a datetime verbatim
+            extra['timestamp'] = timestamp
+    
+    sender = message.get('sender')
+    text = message.get('text')
+    return {
+        'session_id': session_id,
+        'seq': seq,
+        'sender': str(sender)[:20] if sender is not None else None,
+        'text': text if text is None or isinstance(text, str) else str(text),
+        'ts': ts,
+        'extra': json.dumps(extra) if extra else None
+    }
+
+
+def row_to_message(row) -> Dict:
+    """Convert a context_messages row back into a message dict"""
+    message = {
+        'sender': row.sender,
+        'text': row.text,
+        'timestamp': row.ts.isoformat() if row.ts else None
+    }
+    if row.extra:
+        message.update(json.loads(row.extra))
+    return message
+
+
+def _recent_message_rows(session_id: str, limit: Optional[int] = None) -> List:
+    """Index range scan over (session_id, seq), newest first"""
+    query = db.select(
+        ContextMessage.seq, ContextMessage.sender, ContextMessage.text,
+        ContextMessage.ts, ContextMessage.extra
+    ).where(ContextMessage.session_id == session_id).order_by(ContextMessage.seq.desc())
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+def load_context_messages(session_id: str, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Read the most recent messages of a session in order
+    
+    Args:
+        session_id: Unique session identifier
+        limit: Maximum number of (most recent) messages
+        
+    Returns:
+        list: Message dictionaries, oldest first
+    """
+    rows = _recent_message_rows(session_id, limit)
+    return [row_to_message(row) for row in reversed(rows)]
+
+
+def delete_context_messages(session_ids) -> int:
+    """Bulk-delete the messages of the given sessions (subquery or list)"""
+    result = db.session.execute(
+        db.delete(ContextMessage).where(ContextMessage.session_id.in_(session_ids))
+    )
+    return result.rowcount
+
+
+class _HotContext:
+    """In-memory copy of one session's context"""
+    
+    __slots__ = ('session_id', 'user_id', 'messages', 'context_id', 'created_at',
+                 'last_active', 'persisted_active', 'dirty', 'touched_at',
+                 'next_seq', 'unflushed', 'replaced')
+    
+    def __init__(self, session_id: str, messages, max_messages: int,
+                 user_id: Optional[int] = None, context_id: Optional[int] = None,
+                 created_at: Optional[datetime] = None,
+                 last_active: Optional[datetime] = None, next_seq: int = 1):
+        now = datetime.utcnow()
+        self.session_id = session_id
+        self.user_id = user_id
+        self.messages = deque(messages, maxlen=max_messages)
+        self.context_id = context_id
+        self.created_at = created_at or now
+        self.last_active = last_active or now
+        self.persisted_active = last_active
+        self.dirty = False
+        self.touched_at = time.monotonic()
+        self.next_seq = next_seq
+        self.unflushed = []  # (seq, message) appended since the last flush
+        self.replaced = False  # whole message list replaced since the last flush
+    
+    def append(self, message: Dict):
+        """Append a message and queue it for insertion"""
+        self.messages.append(message)
+        self.unflushed.append((self.next_seq, message))
+        self.next_seq += 1
+    
+    def replace(self, messages: List[Dict]):
+        """Replace all messages; the next flush rewrites the session"""
+        self.messages = deque(messages, maxlen=self.messages.maxlen)
+        self.next_seq = len(self.messages) + 1
+        self.unflushed = []
+        self.replaced = True
+    
+    def to_dict(self) -> Dict:
+        """Convert to the ConversationContext.to_dict() shape"""
+        return {
+            'context_id': self.context_id,
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'context_data': list(self.messages),
+            'message_count': len(self.messages),
+            'last_active': self.last_active.isoformat(),
+            'created_at': self.created_at.isoformat()
+        }
+
+
 class ContextMemoryManager:
     """Manages conversation context and memory"""
     
-    def __init__(self, max_context_messages=20, context_window_hours=24):
+    def __init__(self, max_context_messages=20, context_window_hours=24,
+                 hot_capacity=1000, hot_ttl_seconds=300, flush_interval=2.0,
+                 flush_batch_size=100, last_active_granularity=60):
         """
         Initialize context memory manager
         
+        Recently used sessions are kept in an in-memory hot tier that
+        serves reads directly. Once the background flusher is started
+        (see start_flusher), writes are coalesced and persisted in batches;
+        until then every write is flushed immediately.
+        
         Args:
             max_context_messages: Maximum number of messages to keep in context
             context_window_hours: Hours to keep context active
+            hot_capacity: Sessions kept in memory (LRU)
+            hot_ttl_seconds: Idle seconds before a session leaves memory
+            flush_interval: Seconds between background flushes
+            flush_batch_size: Dirty sessions that trigger an early flush
+            last_active_granularity: Seconds last_active may lag in the database
         """
         self.max_context_messages = max_context_messages
         self.context_window_hours = context_window_hours
+        self.hot_capacity = hot_capacity
+        self.hot_ttl_seconds = hot_ttl_seconds
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.last_active_granularity = timedelta(seconds=last_active_granularity)
+        
+        self._hot = OrderedDict()  # session_id -> _HotContext, LRU order
+        self._evicted = {}  # dirty sessions pushed out of the LRU, awaiting flush
+        self._in_flight = {}  # sessions being written by flush(), until it commits
+        self._dirty_count = 0
+        self._lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._app = None
+        self._flusher = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self.stats = {'hits': 0, 'misses': 0, 'flushes': 0, 'rows_written': 0}
+    
+    # ==================== Hot tier ====================
+    
+    def _is_expired(self, last_active: datetime) -> bool:
+        return last_active < datetime.utcnow() - timedelta(hours=self.context_window_hours)
+    
+    def _get_entry(self, session_id: str, create: bool = False) -> Optional[_HotContext]:
+        """Get a session from the hot tier, loading it from the database on a miss"""
+        with self._lock:
+            entry = self._hot.get(session_id)
+            if entry is None:
+                # A session being flushed must not be reloaded from the
+                # database before the flush commits (its next_seq would be stale)
+                entry = self._evicted.pop(session_id, None) or self._in_flight.get(session_id)
+                if entry is not None:
+                    self._hot[session_id] = entry
+            
+            if entry is not None:
+                if self._is_expired(entry.last_active):
+                    self._drop(session_id)
+                    entry = None
+                else:
+                    self.stats['hits'] += 1
+                    self._hot.move_to_end(session_id)
+                    entry.touched_at = time.monotonic()
+                    return entry
+        
+        self.stats['misses'] += 1
+        entry = self._load_entry(session_id)
+        
+        if entry is None and create:
+            entry = _HotContext(session_id, [], self.max_context_messages)
+        
+        if entry is not None:
+            with self._lock:
+                # Another request may have loaded it meanwhile
+                entry = self._hot.setdefault(session_id, entry)
+                self._hot.move_to_end(session_id)
+                self._evict_overflow()
+        
+        return entry
+    
+    def _load_entry(self, session_id: str) -> Optional[_HotContext]:
+        """Read a context header and its recent messages into a hot entry"""
+        context = ConversationContext.query.filter_by(session_id=session_id).first()
+        
+        if not context:
+            return None
+        
+        if self._is_expired(context.last_active):
+            # Context expired, delete it
+            delete_context_messages([session_id])
+            db.session.delete(context)
+            db.session.commit()
+            return None
+        
+        rows = _recent_message_rows(session_id, self.max_context_messages)
+        
+        return _HotContext(
+            session_id,
+            [row_to_message(row) for row in reversed(rows)],
+            self.max_context_messages,
+            user_id=context.user_id,
+            context_id=context.context_id,
+            created_at=context.created_at,
+            last_active=context.last_active,
+            next_seq=rows[0].seq + 1 if rows else 1
+        )
+    
+    def _mark_dirty(self, entry: _HotContext):
+        """Record a pending write and flush per the write policy"""
+        with self._lock:
+            if not entry.dirty:
+                entry.dirty = True
+                self._dirty_count += 1
+            dirty_count = self._dirty_count
+        
+        if self._flusher is None:
+            self.flush()
+        elif dirty_count >= self.flush_batch_size:
+            self._wake_event.set()
+    
+    def _evict_overflow(self):
+        """Push least recently used sessions out of memory (lock held)"""
+        while len(self._hot) > self.hot_capacity:
+            session_id, entry = self._hot.popitem(last=False)
+            if entry.dirty:
+                self._evicted[session_id] = entry
+    
+    def _drop(self, session_id: str):
+        """Forget a session in memory (lock held)"""
+        entry = self._hot.pop(session_id, None) or self._evicted.pop(session_id, None)
+        self._in_flight.pop(session_id, None)
+        if entry is not None and entry.dirty:
+            self._dirty_count -= 1
+    
+    def _evict_idle(self):
+        """Drop clean sessions idle longer than the TTL"""
+        cutoff = time.monotonic() - self.hot_ttl_seconds
+        with self._lock:
+            idle = [sid for sid, entry in self._hot.items()
+                    if entry.touched_at < cutoff and not entry.dirty]
+            for session_id in idle:
+                del self._hot[session_id]
+    
+    def flush(self) -> int:
+        """
+        Persist dirty sessions and stale last_active times in one transaction
         
+        New messages are bulk-inserted into context_messages, messages
+        beyond max_context_messages are trimmed with one DELETE per
+        session, and only the small header row is updated.
+        
+        Returns:
+            int: Number of sessions written
+        """
+        with self._flush_lock:
+            with self._lock:
+                candidates = list(self._evicted.values()) + [
+                    entry for entry in self._hot.values()
+                    if entry.dirty or entry.persisted_active is None or
+                    entry.last_active - entry.persisted_active > self.last_active_granularity
+                ]
+                # Snapshot under the lock so request threads can keep appending
+                pending = []
+                for entry in candidates:
+                    if not entry.dirty and entry.context_id is None:
+                        continue
+                    keep_from = entry.next_seq - self.max_context_messages
+                    if entry.replaced:
+                        first_seq = entry.next_seq - len(entry.messages)
+                        new_rows = [
+                            message_to_row(entry.session_id, first_seq + i, message)
+                            for i, message in enumerate(entry.messages)
+                        ]
+                    else:
+                        new_rows = [
+                            message_to_row(entry.session_id, seq, message)
+                            for seq, message in entry.unflushed if seq >= keep_from
+                        ]
+                    pending.append({
+                        'entry': entry,
+                        'was_dirty': entry.dirty,
+                        'replaced': entry.replaced,
+                        'rows': new_rows,
+                        'keep_from': keep_from,
+                        'count': len(entry.messages),
+                        'user_id': entry.user_id,
+                        'last_active': entry.last_active
+                    })
+                    if entry.dirty:
+                        entry.dirty = False
+                        self._dirty_count -= 1
+                    entry.unflushed = []
+                    entry.replaced = False
+                self._evicted.clear()
+                self._in_flight = {item['entry'].session_id: item['entry'] for item in pending}
+            
+            if not pending:
+                return 0
+            
+            try:
+                ids = [item['entry'].context_id for item in pending if item['entry'].context_id]
+                headers = {}
+                if ids:
+                    headers = {
+                        row.context_id: row for row in
+                        ConversationContext.query.filter(
+                            ConversationContext.context_id.in_(ids)
+                        ).all()
+                    }
+                
+                created = []
+                inserts = []
+                for item in pending:
+                    entry = item['entry']
+                    context = headers.get(entry.context_id)
+                    if context is None:
+                        if not item['was_dirty']:
+                            continue  # Deleted elsewhere, nothing new to write
+                        context = ConversationContext(
+                            session_id=entry.session_id,
+                            context_data='[]',
+                            created_at=entry.created_at
+                        )
+                        db.session.add(context)
+                        created.append((entry, context))
+                    
+                    if item['replaced']:
+                        delete_context_messages([entry.session_id])
+                    elif item['rows'] and item['keep_from'] > 1:
+                        # Trim to the most recent max_context_messages
+                        db.session.execute(
+                            db.delete(ContextMessage).where(
+                                ContextMessage.session_id == entry.session_id,
+                                ContextMessage.seq < item['keep_from']
+                            )
+                        )
+                    inserts.extend(item['rows'])
+                    
+                    if item['was_dirty']:
+                        context.message_count = item['count']
+                        context.user_id = item['user_id']
+                    context.last_active = item['last_active']
+                
+                if inserts:
+                    db.session.execute(db.insert(ContextMessage), inserts)
+                
+                db.session.commit()
+                
+                for entry, context in created:
+                    entry.context_id = context.context_id
+                for item in pending:
+                    item['entry'].persisted_active = item['last_active']
+                with self._lock:
+                    self._in_flight = {}
+                
+                self.stats['flushes'] += 1
+                self.stats['rows_written'] += len(inserts)
+                return len(pending)
+                
+            except Exception as e:
+                print(f"[ERROR] Failed to flush contexts: {e}")
+                db.session.rollback()
+                # Rewrite these sessions in full on the next flush; entries
+                # reloaded meanwhile are the same objects, so messages
+                # appended since the snapshot are kept
+                with self._lock:
+                    for item in pending:
+                        entry = item['entry']
+                        if not item['was_dirty'] or self._in_flight.get(entry.session_id) is not entry:
+                            continue  # Dropped while flushing
+                        entry.replaced = True
+                        if not entry.dirty:
+                            entry.dirty = True
+                            self._dirty_count += 1
+                        if entry.session_id not in self._hot:
+                            self._evicted[entry.session_id] = entry
+                    self._in_flight = {}
+                return 0
+    
+    def start_flusher(self, app):
+        """
+        Start the background thread that persists the hot tier
+        
+        Args:
+            app: Flask application providing the database context
+        """
+        if self._flusher is not None:
+            return
+        
+        self._app = app
+        self._stop_event.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name='context-flusher',
+            daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.stop_flusher)
+    
+    def stop_flusher(self):
+        """Stop the background flusher after a final flush"""
+        if self._flusher is None:
+            return
+        
+        self._stop_event.set()
+        self._wake_event.set()
+        self._flusher.join(timeout=10)
+        self._flusher = None
+    
+    def _flush_loop(self):
+        """Flush periodically, early when enough sessions are dirty"""
+        while True:
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            stopping = self._stop_event.is_set()
+            
+            try:
+                with self._app.app_context():
+                    self.flush()
+                    db.session.remove()
+                self._evict_idle()
+            except Exception as e:
+                print(f"[ERROR] Context flusher failed: {e}")
+            
+            if stopping:
+                break
+    
+    def get_hot_tier_stats(self) -> Dict:
+        """Get hot tier size and hit/flush counters"""
+        with self._lock:
+            return {
+                'sessions': len(self._hot),
+                'pending_evicted': len(self._evicted),
+                'dirty': self._dirty_count,
+                'capacity': self.hot_capacity,
+                'write_behind': self._flusher is not None,
+                **self.stats
+            }
+    
+    # ==================== Public API ====================
+    
     def save_context(self, session_id: str, messages: List[Dict], 
                      user_id: Optional[int] = None) -> bool:
         """
-        Save conversation context to database
+        Save conversation context
         
         Args:
             session_id: Unique session identifier
@@ -61,30 +560,15 @@ class ContextMemoryManager:
             bool: Success status
         """
         try:
-            # Limit context to recent messages
-            recent_messages = messages[-self.max_context_messages:] if len(messages) > self.max_context_messages else messages
-            
-            # Find or create context
-            context = ConversationContext.query.filter_by(session_id=session_id).first()
-            
-            if context:
-                # Update existing context
-                context.context_data = json.dumps(recent_messages)
-                context.message_count = len(recent_messages)
-                context.last_active = datetime.utcnow()
-                context.user_id = user_id
-            else:
-                # Create new context
-                context = ConversationContext(
-                    session_id=session_id,
-                    user_id=user_id,
-                    context_data=json.dumps(recent_messages),
-                    message_count=len(recent_messages),
-                    last_active=datetime.utcnow()
-                )
-                db.session.add(context)
+            entry = self._get_entry(session_id, create=True)
             
-            db.session.commit()
+            with self._lock:
+                # deque(maxlen) keeps only the most recent messages
+                entry.replace(messages)
+                entry.user_id = user_id
+                entry.last_active = datetime.utcnow()
+            
+            self._mark_dirty(entry)
             return True
             
         except Exception as e:
@@ -94,7 +578,7 @@ class ContextMemoryManager:
     
     def load_context(self, session_id: str) -> Optional[Dict]:
         """
-        Load conversation context from database
+        Load conversation context
         
         Args:
             session_id: Unique session identifier
@@ -103,24 +587,15 @@ class ContextMemoryManager:
             dict: Context data or None if not found/expired
         """
         try:
-            context = ConversationContext.query.filter_by(session_id=session_id).first()
+            entry = self._get_entry(session_id)
             
-            if not context:
+            if entry is None:
                 return None
             
-            # Check if context is expired
-            expiry_time = datetime.utcnow() - timedelta(hours=self.context_window_hours)
-            if context.last_active < expiry_time:
-                # Context expired, delete it
-                db.session.delete(context)
-                db.session.commit()
-                return None
-            
-            # Update last active time
-            context.last_active = datetime.utcnow()
-            db.session.commit()
-            
-            return context.to_dict()
+            # last_active is persisted lazily by the flusher
+            with self._lock:
+                entry.last_active = datetime.utcnow()
+                return entry.to_dict()
             
         except Exception as e:
             print(f"[ERROR] Failed to load context: {e}")
@@ -137,13 +612,21 @@ class ContextMemoryManager:
         Returns:
             list: Recent messages
         """
-        context_data = self.load_context(session_id)
-        
-        if not context_data:
+        try:
+            entry = self._get_entry(session_id)
+            
+            if entry is None:
+                return []
+            
+            with self._lock:
+                entry.last_active = datetime.utcnow()
+                messages = list(entry.messages)
+            
+            return messages[-limit:] if len(messages) > limit else messages
+            
+        except Exception as e:
+            print(f"[ERROR] Failed to get recent messages: {e}")
             return []
-        
-        messages = context_data.get('context_data', [])
-        return messages[-limit:] if len(messages) > limit else messages
     
     def append_message(self, session_id: str, message: Dict, user_id: Optional[int] = None) -> bool:
         """
@@ -158,19 +641,19 @@ class ContextMemoryManager:
             bool: Success status
         """
         try:
-            context_data = self.load_context(session_id)
-            
             # Add timestamp if not present
             if 'timestamp' not in message:
                 message['timestamp'] = datetime.utcnow().isoformat()
             
-            if context_data:
-                messages = context_data.get('context_data', [])
-                messages.append(message)
-            else:
-                messages = [message]
+            entry = self._get_entry(session_id, create=True)
+            
+            with self._lock:
+                entry.append(message)
+                entry.user_id = user_id
+                entry.last_active = datetime.utcnow()
             
-            return self.save_context(session_id, messages, user_id)
+            self._mark_dirty(entry)
+            return True
             
         except Exception as e:
             print(f"[ERROR] Failed to append message: {e}")
@@ -187,10 +670,14 @@ class ContextMemoryManager:
             bool: Success status
         """
         try:
-            context = ConversationContext.query.filter_by(session_id=session_id).first()
-            
-            if context:
-                db.session.delete(context)
+            # Wait out a flush in progress so it cannot write the session back
+            with self._flush_lock:
+                with self._lock:
+                    self._drop(session_id)
+                
+                delete_context_messages([session_id])
+                ConversationContext.query.filter_by(session_id=session_id)\
+                    .delete(synchronize_session=False)
                 db.session.commit()
             
             return True
@@ -212,12 +699,28 @@ class ContextMemoryManager:
             list: List of context dictionaries
         """
         try:
+            # Make pending writes visible to the query
+            self.flush()
+            
             contexts = ConversationContext.query.filter_by(user_id=user_id)\
                 .order_by(ConversationContext.last_active.desc())\
                 .limit(limit)\
                 .all()
             
-            return [ctx.to_dict() for ctx in contexts]
+            # Fetch all their messages in one query
+            messages = {ctx.session_id: [] for ctx in contexts}
+            if messages:
+                rows = db.session.execute(
+                    db.select(
+                        ContextMessage.session_id, ContextMessage.sender,
+                        ContextMessage.text, ContextMessage.ts, ContextMessage.extra
+                    ).where(ContextMessage.session_id.in_(list(messages)))
+                    .order_by(ContextMessage.session_id, ContextMessage.seq)
+                ).all()
+                for row in rows:
+                    messages[row.session_id].append(row_to_message(row))
+            
+            return [ctx.to_dict(messages[ctx.session_id]) for ctx in contexts]
             
         except Exception as e:
             print(f"[ERROR] Failed to get user contexts: {e}")
@@ -234,18 +737,25 @@ class ContextMemoryManager:
             int: Number of contexts deleted
         """
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-            
-            old_contexts = ConversationContext.query.filter(
-                ConversationContext.last_active < cutoff_date
-            ).all()
-            
-            count = len(old_contexts)
-            
-            for context in old_contexts:
-                db.session.delete(context)
-            
-            db.session.commit()
+            with self._flush_lock:
+                self.flush()
+                
+                cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+                
+                with self._lock:
+                    for session_id in [sid for sid, entry in self._hot.items()
+                                       if entry.last_active < cutoff_date]:
+                        self._drop(session_id)
+                
+                old_sessions = db.select(ConversationContext.session_id).where(
+                    ConversationContext.last_active < cutoff_date
+                )
+                delete_context_messages(old_sessions)
+                count = ConversationContext.query.filter(
+                    ConversationContext.last_active < cutoff_date
+                ).delete(synchronize_session=False)
+                
+                db.session.commit()
             
             print(f"[OK] Cleaned up {count} old contexts")
             return count
@@ -343,8 +853,13 @@ def init_context_manager(app):
         try:
             # Create table if not exists
             db.create_all()
-            print(f"[OK] Context Memory Manager initialized")
-            return context_manager
         except Exception as e:
             print(f"[ERROR] Failed to initialize Context Manager: {e}")
             return None
+    
+    context_manager.hot_capacity = app.config.get('CONTEXT_HOT_CAPACITY', 1000)
+    context_manager.hot_ttl_seconds = app.config.get('CONTEXT_HOT_TTL', 300)
+    context_manager.flush_interval = app.config.get('CONTEXT_FLUSH_INTERVAL', 2.0)
+    context_manager.start_flusher(app)
+    print(f"[OK] Context Memory Manager initialized")
+    return context_manager
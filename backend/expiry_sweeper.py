@@ -0,0 +1,357 @@
+"""
+Expiry Sweeper
+Periodically deletes expired conversation contexts, closes abandoned
+sessions and prunes expired session files and revoked tokens, coordinated
+across workers with a database lease
+"""
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+
+
+class MaintenanceLease(db.Model):
+    """Named lease held by one worker at a time"""
+    __tablename__ = 'maintenance_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class LeaseLock:
+    """Database-backed lease usable as a cross-process advisory lock"""
+
+    def __init__(self, name: str, ttl_seconds: int = 600, owner: Optional[str] = None):
+        """
+        Initialize lease lock
+
+        Args:
+            name: Lease name shared by all competing workers
+            ttl_seconds: Seconds before an unreleased lease can be taken over
+            owner: Unique holder id (defaults to host:pid:random)
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        """
+        Take the lease if it is free, expired or already ours
+
+        Returns:
+            bool: Whether this worker now holds the lease
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+
+        try:
+            result = db.session.execute(
+                db.update(MaintenanceLease)
+                .where(MaintenanceLease.name == self.name)
+                .where(db.or_(MaintenanceLease.expires_at < now,
+                              MaintenanceLease.owner == self.owner))
+                .values(owner=self.owner, expires_at=expires_at)
+            )
+            if result.rowcount == 0:
+                # No row yet, or held by someone else (then the insert fails)
+                db.session.add(MaintenanceLease(
+                    name=self.name, owner=self.owner, expires_at=expires_at
+                ))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def release(self):
+        """Give the lease up early"""
+        db.session.execute(
+            db.update(MaintenanceLease)
+            .where(MaintenanceLease.name == self.name)
+            .where(MaintenanceLease.owner == self.owner)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+
+class ExpirySweeper:
+    """Deletes expired rows and session files in bounded batches"""
+
+    def __init__(self, interval: int = 300, batch_size: int = 500,
+                 max_batches: int = 20, context_window_hours: int = 24,
+                 session_lifetime_seconds: int = 604800,
+                 session_retention_days: int = 30,
+                 session_store=None, revocation_list=None):
+        """
+        Initialize sweeper
+
+        Args:
+            interval: Seconds between sweeps
+            batch_size: Rows or files handled per batch
+            max_batches: Batches per table per sweep (bounds one sweep's work)
+            context_window_hours: Idle hours after which a context expires
+            session_lifetime_seconds: Seconds after which an open session is abandoned
+            session_retention_days: Days ended sessions are kept
+            session_store: SessionStore whose expired sessions are pruned
+            revocation_list: TokenRevocationList whose expired entries are pruned
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.context_window_hours = context_window_hours
+        self.session_lifetime_seconds = session_lifetime_seconds
+        self.session_retention_days = session_retention_days
+        self.session_store = session_store
+        self.revocation_list = revocation_list
+        self.lease = LeaseLock('expiry_sweeper', ttl_seconds=max(interval * 2, 60))
+
+        self._app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.last_report = None
+        self.totals = {
+            'sweeps': 0,
+            'skipped': 0,
+            'contexts_deleted': 0,
+            'messages_deleted': 0,
+            'sessions_closed': 0,
+            'sessions_deleted': 0,
+            'session_files_deleted': 0,
+            'bytes_reclaimed': 0,
+            'revoked_tokens_deleted': 0
+        }
+
+    # ==================== Sweeps ====================
+
+    def sweep_contexts(self) -> Dict[str, int]:
+        """Delete contexts idle longer than the context window, oldest first"""
+        from backend.context_manager import (
+            ConversationContext, delete_context_messages, context_manager
+        )
+
+        # Allow for last_active being persisted lazily by the hot tier
+        cutoff = datetime.utcnow() - timedelta(hours=self.context_window_hours) \
+            - context_manager.last_active_granularity
+        contexts = messages = 0
+
+        for _ in range(self.max_batches):
+            batch = db.session.execute(
+                db.select(ConversationContext.context_id, ConversationContext.session_id)
+                .where(ConversationContext.last_active < cutoff)
+                .order_by(ConversationContext.last_active)
+                .limit(self.batch_size)
+            ).all()
+            if not batch:
+                break
+
+            messages += delete_context_messages([row.session_id for row in batch])
+            contexts += db.session.execute(
+                db.delete(ConversationContext).where(
+                    ConversationContext.context_id.in_([row.context_id for row in batch])
+                )
+            ).rowcount
+            db.session.commit()
+
+            if len(batch) < self.batch_size:
+                break
+
+        return {'contexts_deleted': contexts, 'messages_deleted': messages}
+
+    def sweep_sessions(self) -> Dict[str, int]:
+        """Close abandoned sessions and delete old ended ones without conversations"""
+        from database.models import Session, Conversation
+
+        now = datetime.utcnow()
+        abandoned_before = now - timedelta(seconds=self.session_lifetime_seconds)
+        retention_cutoff = now - timedelta(days=self.session_retention_days)
+        closed = deleted = 0
+
+        for _ in range(self.max_batches):
+            ids = db.session.execute(
+                db.select(Session.session_id)
+                .where(Session.ended_at.is_(None))
+                .where(Session.started_at < abandoned_before)
+                .order_by(Session.started_at)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            closed += db.session.execute(
+                db.update(Session).where(Session.session_id.in_(ids)).values(ended_at=now)
+            ).rowcount
+            db.session.commit()
+            if len(ids) < self.batch_size:
+                break
+
+        # Sessions referenced by conversations are kept for history
+        has_conversations = db.select(Conversation.conversation_id).where(
+            Conversation.session_id == Session.session_id
+        ).exists()
+
+        for _ in range(self.max_batches):
+            ids = db.session.execute(
+                db.select(Session.session_id)
+                .where(Session.ended_at < retention_cutoff)
+                .where(~has_conversations)
+                .order_by(Session.ended_at)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            deleted += db.session.execute(
+                db.delete(Session).where(Session.session_id.in_(ids))
+            ).rowcount
+            db.session.commit()
+            if len(ids) < self.batch_size:
+                break
+
+        return {'sessions_closed': closed, 'sessions_deleted': deleted}
+
+    def prune_session_files(self) -> Dict[str, int]:
+        """Remove expired server-side sessions from the session store"""
+        if self.session_store is None:
+            return {'session_files_deleted': 0, 'bytes_reclaimed': 0}
+
+        return self.session_store.prune(limit=self.batch_size * self.max_batches)
+
+    def prune_revoked_tokens(self) -> Dict[str, int]:
+        """Remove revoked JWT ids whose tokens have expired"""
+        if self.revocation_list is None:
+            return {'revoked_tokens_deleted': 0}
+
+        return self.revocation_list.prune(limit=self.batch_size * self.max_batches)
+
+    def run_once(self) -> Dict:
+        """
+        Run one sweep if this worker can take the lease (requires app context)
+
+        Returns:
+            dict: What was reclaimed, or {'skipped': True} when another
+                  worker holds the lease
+        """
+        started = time.perf_counter()
+
+        if not self.lease.acquire():
+            self.totals['skipped'] += 1
+            return {'skipped': True}
+
+        report = {'skipped': False}
+        try:
+            for step in (self.sweep_contexts, self.sweep_sessions, self.prune_session_files,
+                         self.prune_revoked_tokens):
+                try:
+                    report.update(step())
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[ERROR] Sweep step {step.__name__} failed: {e}")
+        finally:
+            try:
+                self.lease.release()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Failed to release sweeper lease: {e}")
+
+        report['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        report['finished_at'] = datetime.utcnow().isoformat()
+
+        self.totals['sweeps'] += 1
+        for key, value in report.items():
+            if key in self.totals and key not in ('sweeps', 'skipped'):
+                self.totals[key] += value
+        self.last_report = report
+        return report
+
+    # ==================== Scheduling ====================
+
+    def start(self, app):
+        """
+        Start sweeping in a background thread
+
+        Args:
+            app: Flask application providing the database context
+        """
+        if self._thread is not None:
+            return
+
+        self._app = app
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_loop,
+            name='expiry-sweeper',
+            daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background thread"""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _run_loop(self):
+        """Sweep every interval until stopped"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    self.run_once()
+                    db.session.remove()
+            except Exception as e:
+                print(f"[ERROR] Expiry sweep failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get cumulative totals and the last sweep report"""
+        return {
+            'running': self._thread is not None,
+            'interval': self.interval,
+            'totals': dict(self.totals),
+            'last_report': self.last_report
+        }
+
+
+# Global sweeper instance
+expiry_sweeper = ExpirySweeper()
+
+
+def init_expiry_sweeper(app):
+    """
+    Configure and start the expiry sweeper
+
+    Args:
+        app: Flask application
+
+    Returns:
+        ExpirySweeper: Configured sweeper
+    """
+    lifetime = app.config.get('PERMANENT_SESSION_LIFETIME', 604800)
+    if isinstance(lifetime, timedelta):
+        lifetime = lifetime.total_seconds()
+
+    expiry_sweeper.interval = app.config.get('SWEEPER_INTERVAL', 300)
+    expiry_sweeper.batch_size = app.config.get('SWEEPER_BATCH_SIZE', 500)
+    expiry_sweeper.session_lifetime_seconds = int(lifetime)
+    expiry_sweeper.session_retention_days = app.config.get('SESSION_RETENTION_DAYS', 30)
+    expiry_sweeper.session_store = getattr(app.session_interface, 'store', None)
+    expiry_sweeper.lease.ttl_seconds = max(expiry_sweeper.interval * 2, 60)
+
+    from backend.context_manager import context_manager
+    from backend.token_revocation import token_revocations
+    expiry_sweeper.context_window_hours = context_manager.context_window_hours
+    expiry_sweeper.revocation_list = token_revocations
+
+    if app.config.get('SWEEPER_ENABLED', True):
+        expiry_sweeper.start(app)
+    print(f"[OK] Expiry Sweeper initialized (interval={expiry_sweeper.interval}s)")
+    return expiry_sweeper
@@ -4,6 +4,14 @@ Manages user feedback and rating system
 """
 from datetime import datetime, timedelta
 
+from database.replica import read_only
+
+
+FEEDBACK_EXPORT_FIELDS = [
+    'feedback_id', 'conversation_id', 'user_id', 'username', 'rating', 'helpful',
+    'comments', 'message', 'response', 'created_at'
+]
+
 
 class FeedbackCollector:
     """Handles feedback collection and analysis"""
@@ -42,11 +50,12 @@ class FeedbackCollector:
             print(f"Error collecting feedback: {str(e)}")
             return None, f"Error: {str(e)}"
     
+    @read_only()
     def get_feedback_summary(self, days=30):
         """Get feedback summary for specified period"""
         try:
             # Get all feedback
-            all_feedback = self.db_manager.get_all_feedback(page=1, per_page=9999)
+            all_feedback = self.db_manager.get_all_feedback(per_page=9999)
             
             # Filter by date
             since_date = datetime.utcnow() - timedelta(days=days)
@@ -78,11 +87,12 @@ class FeedbackCollector:
             print(f"Error getting feedback summary: {str(e)}")
             return {}
     
+    @read_only()
     def get_top_issues(self, limit=10):
         """Get top issues based on negative feedback"""
         try:
             # Get all bad/improvement feedback with comments
-            all_feedback = self.db_manager.get_all_feedback(page=1, per_page=9999)
+            all_feedback = self.db_manager.get_all_feedback(per_page=9999)
             
             negative_feedback = [
                 f for f in all_feedback.items
@@ -109,10 +119,11 @@ class FeedbackCollector:
             print(f"Error getting top issues: {str(e)}")
             return []
     
+    @read_only()
     def get_positive_examples(self, limit=10):
         """Get examples of positive feedback"""
         try:
-            all_feedback = self.db_manager.get_all_feedback(page=1, per_page=9999)
+            all_feedback = self.db_manager.get_all_feedback(per_page=9999)
             
             positive_feedback = [
                 f for f in all_feedback.items
@@ -137,10 +148,11 @@ class FeedbackCollector:
             print(f"Error getting positive examples: {str(e)}")
             return []
     
+    @read_only()
     def analyze_feedback_trends(self, days=30):
         """Analyze feedback trends over time"""
         try:
-            all_feedback = self.db_manager.get_all_feedback(page=1, per_page=9999)
+            all_feedback = self.db_manager.get_all_feedback(per_page=9999)
             
             since_date = datetime.utcnow() - timedelta(days=days)
             recent_feedback = [
@@ -180,10 +192,11 @@ class FeedbackCollector:
             print(f"Error analyzing feedback trends: {str(e)}")
             return []
     
+    @read_only()
     def get_feedback_by_user(self, user_id):
         """Get all feedback from a specific user"""
         try:
-            conversations = self.db_manager.get_user_conversations(user_id, page=1, per_page=9999)
+            conversations = self.db_manager.get_user_conversations(user_id, per_page=9999)
             
             user_feedback = []
             for conv in conversations.items:
@@ -204,6 +217,7 @@ class FeedbackCollector:
             print(f"Error getting user feedback: {str(e)}")
             return []
     
+    @read_only()
     def get_improvement_suggestions(self, min_occurrences=3):
         """Get suggestions for improvement based on feedback"""
         try:
@@ -243,6 +257,48 @@ class FeedbackCollector:
             print(f"Error getting improvement suggestions: {str(e)}")
             return []
     
+    @read_only()
+    def iter_feedback_rows(self, days=None, rating=None, batch_size=1000):
+        """
+        Stream feedback with its conversation, oldest first, for export
+
+        Args:
+            days: Only feedback from the last N days (None for all)
+            rating: Only this rating (None for all)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            generator: Row dicts (see FEEDBACK_EXPORT_FIELDS)
+        """
+        from database import db
+        from database.models import Feedback, Conversation, User
+        from backend.streaming_export import iter_rows
+
+        statement = db.select(
+            Feedback.feedback_id,
+            Feedback.conversation_id,
+            Conversation.user_id,
+            User.username,
+            Feedback.rating,
+            Feedback.helpful,
+            Feedback.comments,
+            Conversation.message,
+            Conversation.response,
+            Feedback.created_at
+        ).join(
+            Conversation, Feedback.conversation_id == Conversation.conversation_id
+        ).outerjoin(
+            User, Conversation.user_id == User.user_id
+        ).order_by(Feedback.feedback_id)
+
+        if days:
+            statement = statement.where(Feedback.created_at >= datetime.utcnow() - timedelta(days=days))
+        if rating:
+            statement = statement.where(Feedback.rating == rating)
+
+        return iter_rows(statement, batch_size=batch_size)
+    
+    @read_only()
     def export_feedback_report(self, days=30):
         """Export comprehensive feedback report"""
         try:
@@ -0,0 +1,464 @@
+"""
+Background Job Queue
+Jobs tracked in the background_jobs table and run by an in-process
+thread pool, with progress reporting, retries with backoff and a cap on
+outstanding work. Handlers only see the job row and its JSON payload, so
+an external worker can take over by running the same handlers.
+"""
+import atexit
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from database import db
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_pending jobs"""
+
+
+class BackgroundJob(db.Model):
+    """Queued unit of background work and its outcome"""
+    __tablename__ = 'background_jobs'
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, index=True)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, default=0)  # percent
+    message = db.Column(db.String(200))
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+def _holds_sqlite_write_lock() -> bool:
+    """Whether the current session has uncommitted writes on a SQLite connection"""
+    session = db.session()
+    if session.get_transaction() is None:
+        return False
+    connection = session.connection()
+    if connection.dialect.name != 'sqlite':
+        return False
+    # pysqlite only opens a transaction for a write statement
+    return connection.connection.dbapi_connection.in_transaction
+
+
+class JobContext:
+    """Handle passed to job handlers for reporting progress"""
+
+    def __init__(self, job_id: str, attempt: int):
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def progress(self, percent: int, message: Optional[str] = None):
+        """
+        Record progress (written on its own connection, so the handler's
+        pending changes are not committed with it)
+
+        On SQLite a second connection cannot write while the handler's
+        session holds the write lock (it has flushed changes), so the
+        update is skipped then; call progress before flushing where it
+        matters.
+
+        Args:
+            percent: 0-100
+            message: Short description of the current step
+
+        Returns:
+            bool: Whether the progress was written
+        """
+        if _holds_sqlite_write_lock():
+            return False
+        table = BackgroundJob.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(table).where(table.c.job_id == self.job_id).values(
+                    progress=max(0, min(int(percent), 100)),
+                    message=message,
+                    updated_at=datetime.utcnow()
+                )
+            )
+        return True
+
+
+class JobQueue:
+    """Runs registered job handlers off the request thread"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 100,
+                 max_attempts: int = 3, retry_delay: float = 5.0,
+                 stale_after: float = 300.0):
+        """
+        Initialize job queue
+
+        Args:
+            workers: Jobs run concurrently (0 runs jobs inline on submit)
+            max_pending: Jobs queued, running or awaiting retry at most
+            max_attempts: Default attempts per job
+            retry_delay: Seconds before the first retry (doubles per attempt)
+            stale_after: Seconds without an update after which a queued or
+                         running job of another process counts as abandoned;
+                         checked on start() and then every stale_after seconds
+                         (0 takes them all on start and never re-checks)
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.handlers = {}  # kind -> (handler, on_failure)
+
+        self._app = None
+        self._executor = None
+        self._timers = set()
+        self._active = set()  # ids of jobs this process has queued or is running
+        self._idle = threading.Condition()
+        self.pending = 0
+        self.stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'retried': 0, 'rejected': 0}
+
+    def register(self, kind: str, handler: Callable, on_failure: Optional[Callable] = None):
+        """
+        Register a job handler
+
+        Args:
+            kind: Job type name
+            handler: handler(job: JobContext, payload: dict) -> JSON-able result;
+                     its uncommitted database changes are committed together
+                     with the job's success
+            on_failure: on_failure(payload, error) run once attempts are exhausted
+        """
+        self.handlers[kind] = (handler, on_failure)
+
+    # ==================== Submitting ====================
+
+    def submit(self, kind: str, payload: Optional[Dict] = None, user_id: Optional[int] = None,
+               max_attempts: Optional[int] = None) -> str:
+        """
+        Queue a job (requires app context)
+
+        Args:
+            kind: Registered job type
+            payload: JSON-serializable handler arguments
+            user_id: Owner allowed to see the job
+            max_attempts: Override the default attempts
+
+        Returns:
+            str: Job id
+
+        Raises:
+            QueueFullError: max_pending jobs are already outstanding
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        with self._idle:
+            if self.pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise QueueFullError(f'{self.pending} jobs already pending')
+            self.pending += 1
+
+        job = BackgroundJob(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            user_id=user_id,
+            payload=payload or {},
+            status='queued',
+            max_attempts=max_attempts or self.max_attempts
+        )
+        try:
+            db.session.add(job)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._done()
+            raise
+        self.stats['submitted'] += 1
+        with self._idle:
+            self._active.add(job.job_id)
+
+        if self._executor is None:
+            self._run_inline(job.job_id)
+        else:
+            self._executor.submit(self._run, job.job_id)
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a job's status dict (requires app context)"""
+        job = db.session.get(BackgroundJob, job_id)
+        return job.to_dict() if job else None
+
+    # ==================== Running ====================
+
+    def _execute(self, job_id: str) -> Optional[float]:
+        """
+        Run one attempt of a job (requires app context)
+
+        Returns:
+            float: Seconds to wait before retrying, or None when finished
+        """
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None or job.status != 'queued':
+            return None
+
+        handler, on_failure = self.handlers[job.kind]
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = job.started_at or datetime.utcnow()
+        db.session.commit()
+        attempt = job.attempts
+
+        try:
+            result = handler(JobContext(job_id, attempt), dict(job.payload or {}))
+            # The handler's changes commit with the job, so a failing commit
+            # (e.g. a constraint violation) is retried like a handler error
+            job.status = 'succeeded'
+            job.progress = 100
+            job.message = None
+            job.result = result
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(BackgroundJob, job_id)
+            job.error = f'{type(e).__name__}: {e}'
+
+            if attempt < job.max_attempts:
+                job.status = 'queued'
+                job.message = f'Attempt {attempt} failed, retrying'
+                db.session.commit()
+                self.stats['retried'] += 1
+                return self.retry_delay * 2 ** (attempt - 1)
+
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            if on_failure is not None:
+                try:
+                    on_failure(dict(job.payload or {}), e)
+                except Exception as hook_error:
+                    print(f"[ERROR] Failure hook for job {job_id} failed: {hook_error}")
+            db.session.commit()
+            self.stats['failed'] += 1
+            print(f"[ERROR] Job {job.kind}/{job_id} failed after {attempt} attempts: {e}")
+            return None
+
+        self.stats['succeeded'] += 1
+        return None
+
+    def _run_inline(self, job_id: str):
+        """Inline mode: run (and retry) right away in the caller's context"""
+        try:
+            while self._execute(job_id) is not None:
+                pass
+        finally:
+            self._done(job_id)
+
+    def _run(self, job_id: str):
+        """Worker-thread entry point"""
+        delay = None
+        try:
+            with self._app.app_context():
+                try:
+                    delay = self._execute(job_id)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"[ERROR] Job {job_id} crashed: {e}")
+
+        if delay is None:
+            self._done(job_id)
+        else:
+            # Wait outside the pool so retries never hold a worker slot
+            timer = threading.Timer(delay, self._resubmit, (job_id,))
+            timer.daemon = True
+            with self._idle:
+                self._timers.add(timer)
+            timer.start()
+
+    def _resubmit(self, job_id: str):
+        with self._idle:
+            self._timers.discard(threading.current_thread())
+        if self._executor is None:
+            self._done(job_id)
+            return
+        self._executor.submit(self._run, job_id)
+
+    def _done(self, job_id: Optional[str] = None):
+        with self._idle:
+            self.pending -= 1
+            self._active.discard(job_id)
+            self._idle.notify_all()
+
+    def recover(self) -> List[str]:
+        """
+        Requeue jobs abandoned by a stopped or crashed process (requires app context)
+
+        A 'running' job lost its attempt: it is queued again while attempts
+        remain and failed (running its failure hook) otherwise. Jobs this
+        process is still handling, and kinds without a handler here, are
+        left alone.
+
+        Returns:
+            list: Ids of the jobs to run again, oldest first
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        jobs = db.session.execute(
+            db.select(BackgroundJob)
+            .where(BackgroundJob.status.in_(('queued', 'running')),
+                   BackgroundJob.updated_at <= cutoff)
+            .order_by(BackgroundJob.created_at)
+        ).scalars().all()
+
+        requeued = []
+        for job in jobs:
+            if job.kind not in self.handlers or job.job_id in self._active:
+                continue
+            if job.status == 'running' and job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.error = job.error or 'Abandoned while running'
+                job.finished_at = datetime.utcnow()
+                on_failure = self.handlers[job.kind][1]
+                if on_failure is not None:
+                    try:
+                        on_failure(dict(job.payload or {}), RuntimeError(job.error))
+                    except Exception as hook_error:
+                        print(f"[ERROR] Failure hook for job {job.job_id} failed: {hook_error}")
+                self.stats['failed'] += 1
+            else:
+                job.status = 'queued'
+                job.message = 'Requeued after being abandoned'
+                requeued.append(job.job_id)
+        db.session.commit()
+        return requeued
+
+    # ==================== Lifecycle ====================
+
+    def start(self, app):
+        """
+        Start the worker pool
+
+        Args:
+            app: Flask application providing the database context
+        """
+        self._app = app
+        if self.workers > 0 and self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='job-worker'
+            )
+            atexit.register(self.stop)
+        self._recover_abandoned()
+
+    def _recover_abandoned(self):
+        """Run recover() and queue its jobs; repeats every stale_after seconds with a pool"""
+        with self._idle:
+            self._timers.discard(threading.current_thread())
+
+        with self._app.app_context():
+            try:
+                job_ids = self.recover()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Recovering abandoned jobs failed: {e}")
+                job_ids = []
+            finally:
+                db.session.remove()
+
+        for job_id in job_ids:
+            with self._idle:
+                self.pending += 1
+                self._active.add(job_id)
+            executor = self._executor
+            if executor is None:
+                self._run_inline(job_id)
+                continue
+            try:
+                executor.submit(self._run, job_id)
+            except RuntimeError:
+                self._done(job_id)  # stopped meanwhile; picked up after the next start
+        if job_ids:
+            print(f"[OK] Requeued {len(job_ids)} abandoned jobs")
+
+        if self._executor is not None and self.stale_after > 0:
+            timer = threading.Timer(self.stale_after, self._recover_periodically)
+            timer.daemon = True
+            with self._idle:
+                self._timers.add(timer)
+            timer.start()
+
+    def _recover_periodically(self):
+        if self._executor is not None:
+            self._recover_abandoned()
+
+    def stop(self):
+        """Stop the pool; queued jobs stay 'queued' until the next start()"""
+        with self._idle:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no jobs are outstanding
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def get_stats(self) -> Dict:
+        """Get queue counters"""
+        return dict(self.stats, pending=self.pending, workers=self.workers,
+                    max_pending=self.max_pending)
+
+
+# Global job queue instance
+job_queue = JobQueue()
+
+
+def init_job_queue(app):
+    """
+    Configure and start the background job queue
+
+    Args:
+        app: Flask application
+
+    Returns:
+        JobQueue: Started job queue
+    """
+    job_queue.workers = app.config.get('JOB_WORKERS', 2)
+    job_queue.max_pending = app.config.get('JOB_MAX_PENDING', 100)
+    job_queue.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', 3)
+    job_queue.retry_delay = app.config.get('JOB_RETRY_DELAY', 5.0)
+    job_queue.stale_after = app.config.get('JOB_STALE_AFTER', 300.0)
+    job_queue.start(app)
+    print(f"[OK] Job Queue initialized (workers={job_queue.workers})")
+    return job_queue
@@ -5,11 +5,13 @@ JSON Web Token based authentication system
 
 import jwt
 import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from functools import wraps
 from flask import request, jsonify, current_app
-from database.db_manager import DatabaseManager
+from backend.principal_cache import principal_cache
+from backend.token_revocation import token_revocations
 
 class JWTAuth:
     """JWT Authentication manager"""
@@ -18,9 +20,6 @@ class JWTAuth:
     ACCESS_TOKEN_EXPIRY = timedelta(hours=1)
     REFRESH_TOKEN_EXPIRY = timedelta(days=30)
     
-    # Blacklisted tokens (in production, use Redis)
-    _blacklist = set()
-    
     def __init__(self, secret_key: Optional[str] = None):
         """
         Initialize JWT Auth
@@ -107,9 +106,9 @@ class JWTAuth:
             if payload.get('type') != token_type:
                 raise jwt.InvalidTokenError(f'Invalid token type. Expected {token_type}')
             
-            # Check if token is blacklisted
+            # Check if token is revoked (usually answered by the local Bloom filter)
             jti = payload.get('jti')
-            if jti and jti in self._blacklist:
+            if jti and token_revocations.is_revoked(jti):
                 raise jwt.InvalidTokenError('Token has been revoked')
             
             return payload
@@ -123,7 +122,7 @@ class JWTAuth:
     
     def revoke_token(self, token: str) -> bool:
         """
-        Revoke a token (add to blacklist)
+        Revoke a token until it expires (shared across workers)
         
         Args:
             token: Token to revoke
@@ -141,7 +140,10 @@ class JWTAuth:
             
             jti = payload.get('jti')
             if jti:
-                self._blacklist.add(jti)
+                expires_at = payload.get('exp') or \
+                    time.time() + self.REFRESH_TOKEN_EXPIRY.total_seconds()
+                token_revocations.revoke(jti, expires_at)
+                principal_cache.invalidate_token(jti)
                 return True
             
             return False
@@ -162,18 +164,17 @@ class JWTAuth:
         try:
             payload = self.verify_token(refresh_token, token_type='refresh')
             
-            # Get user info from database
-            db = DatabaseManager()
-            user = db.get_user_by_id(payload['user_id'])
+            # Current role and status, not the ones at login
+            user = principal_cache.get_for_token(payload.get('jti'), payload['user_id'])
             
-            if not user or not user.get('is_active'):
+            if not user or not user.is_active:
                 return None
             
             # Generate new access token
             return self.generate_access_token(
-                user['user_id'],
-                user['username'],
-                user['role']
+                user.user_id,
+                user.username,
+                user.role
             )
             
         except Exception:
@@ -210,10 +211,15 @@ def jwt_required(f):
             # Verify token
             payload = jwt_auth.verify_token(token)
             
+            # Role and status may have changed since the token was issued
+            principal = principal_cache.get_for_token(payload.get('jti'), payload['user_id'])
+            if not principal or not principal.is_active:
+                return jsonify({'error': 'User not found or inactive'}), 401
+            
             # Add user info to request context
-            request.user_id = payload['user_id']
-            request.username = payload['username']
-            request.user_role = payload['role']
+            request.user_id = principal.user_id
+            request.username = principal.username
+            request.user_role = principal.role
             
             return f(*args, **kwargs)
             
@@ -2,10 +2,11 @@
 Learning Module for Hybrid Voice Chatbot
 Handles NLP processing and self-learning capabilities
 """
-from textblob import TextBlob
 import re
 from datetime import datetime
 
+from backend.sentiment_analyzer import sentiment_analyzer
+
 
 class LearningModule:
     """Handles learning and NLP operations"""
@@ -17,16 +18,7 @@ class LearningModule:
     def analyze_sentiment(self, text):
         """Analyze sentiment of text"""
         try:
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            
-            if polarity > 0.1:
-                return 'positive', polarity
-            elif polarity < -0.1:
-                return 'negative', polarity
-            else:
-                return 'neutral', polarity
-                
+            return sentiment_analyzer.analyze(text)
         except Exception as e:
             print(f"Error analyzing sentiment: {str(e)}")
             return 'neutral', 0.0
@@ -34,6 +26,7 @@ class LearningModule:
     def extract_keywords(self, text):
         """Extract keywords from text"""
         try:
+            from textblob import TextBlob  # heavy import, kept off the chat path
             blob = TextBlob(text)
             # Get noun phrases
             keywords = list(blob.noun_phrases)
@@ -138,6 +131,7 @@ class LearningModule:
                 score += 0.1
             
             # Grammar check
+            from textblob import TextBlob
             blob = TextBlob(answer)
             if blob.correct() == answer:
                 score += 0.1
@@ -253,7 +247,7 @@ class LearningModule:
     def get_learning_stats(self):
         """Get learning module statistics"""
         try:
-            total_knowledge = len(self.db_manager.get_all_knowledge(page=1, per_page=9999).items)
+            total_knowledge = self.db_manager.get_all_knowledge(per_page=1, with_total=True).total
             approved = len(self.db_manager.get_approved_knowledge())
             pending = len(self.db_manager.get_pending_knowledge())
             
@@ -0,0 +1,296 @@
+"""
+Lecture Content Store
+Content-addressed transcript storage: identical uploads share one stored
+copy and its cached summary, and SimHash fingerprints find near-duplicate
+transcripts whose summary can be reused
+"""
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from database.lecture_notes_model import LectureContent, LectureNote
+
+
+_WORD = re.compile(r'\w+')
+_BAND_BITS = 16
+_BANDS = 64 // _BAND_BITS
+
+
+def normalize_content(text: str) -> str:
+    """Collapse whitespace, which never changes a summary"""
+    return ' '.join(text.split())
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of the normalized text"""
+    return hashlib.sha256(normalize_content(text).encode('utf-8')).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles, weighted by shingle frequency
+
+    Per-bit weights are accumulated per byte value (8 x 256 tables) and
+    expanded to bits once, instead of touching 64 counters per shingle.
+
+    Args:
+        text: Transcript text
+        shingle_size: Words per shingle
+
+    Returns:
+        int: Unsigned 64-bit fingerprint
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = map(' '.join, zip(*(words[i:] for i in range(shingle_size))))
+
+    tables = [[0] * 256 for _ in range(8)]
+    total = 0
+    for shingle, weight in Counter(shingles).items():
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        for position, value in enumerate(digest):
+            tables[position][value] += weight
+        total += weight
+
+    fingerprint = 0
+    for position, table in enumerate(tables):
+        for bit in range(8):
+            ones = sum(weight for value, weight in enumerate(table) if value >> bit & 1)
+            if 2 * ones > total:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value: int) -> int:
+    """Unsigned 64-bit value as a signed BIGINT"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    """Signed BIGINT back to the unsigned 64-bit value"""
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(fingerprint: int):
+    """16-bit slices; fingerprints within 3 bits share at least one"""
+    mask = (1 << _BAND_BITS) - 1
+    return [(fingerprint >> (_BAND_BITS * i)) & mask for i in range(_BANDS)]
+
+
+class LectureContentStore:
+    """Deduplicates transcripts and caches their summaries in lecture_contents"""
+
+    def __init__(self, max_distance: int = 3):
+        """
+        Initialize store
+
+        Args:
+            max_distance: Most differing simhash bits for a near-duplicate
+                          (0 disables near-duplicate reuse; above 3 some
+                          matches are missed by the band lookup)
+        """
+        self.max_distance = max_distance
+
+    def acquire(self, text: str) -> Tuple[LectureContent, bool]:
+        """
+        Get or create the stored content for a transcript and add a reference
+        (requires app context; not committed)
+
+        Args:
+            text: Transcript text
+
+        Returns:
+            tuple: (LectureContent, whether it was newly created)
+        """
+        key = content_hash(text)
+        blob = db.session.get(LectureContent, key)
+        created = False
+
+        if blob is None:
+            blob = LectureContent(
+                content_hash=key,
+                content=text,
+                size_bytes=len(text.encode('utf-8')),
+                ref_count=0
+            )
+            try:
+                if self.max_distance > 0:
+                    # Fingerprint while the text is in memory, so the job
+                    # never has to load it whole
+                    self.fingerprint(blob, text)
+                with db.session.begin_nested():
+                    db.session.add(blob)
+                created = True
+            except IntegrityError:
+                # Stored concurrently by an identical upload
+                blob = db.session.get(LectureContent, key)
+
+        blob.ref_count = LectureContent.ref_count + 1
+        blob.last_used_at = datetime.utcnow()
+        db.session.flush()
+        return blob, created
+
+    def release(self, key: Optional[str], count: int = 1):
+        """
+        Drop references to stored content, deleting it when unused
+        (requires app context; not committed)
+
+        Args:
+            key: content_hash (None is ignored)
+            count: References dropped
+        """
+        if not key:
+            return
+        db.session.execute(
+            db.update(LectureContent)
+            .where(LectureContent.content_hash == key)
+            .values(ref_count=LectureContent.ref_count - count)
+        )
+        db.session.execute(
+            db.delete(LectureContent)
+            .where(LectureContent.content_hash == key)
+            .where(LectureContent.ref_count <= 0)
+        )
+
+    def release_notes(self, notes: Iterable):
+        """Drop the content references of deleted notes (or content_hash rows)"""
+        for key, count in Counter(note.content_hash for note in notes if note.content_hash).items():
+            self.release(key, count)
+
+    def fingerprint(self, blob: LectureContent, text: Optional[str] = None) -> int:
+        """Compute and store the blob's simhash if missing (from text when given)"""
+        if blob.simhash is None:
+            value = simhash(blob.content if text is None else text)
+            blob.simhash = to_signed(value)
+            blob.simhash_band0, blob.simhash_band1, blob.simhash_band2, blob.simhash_band3 = bands(value)
+        return to_unsigned(blob.simhash)
+
+    def find_near_duplicate(self, blob: LectureContent) -> Optional[LectureContent]:
+        """
+        Closest other summarized content within max_distance bits
+
+        Args:
+            blob: Content to match (fingerprinted if needed)
+
+        Returns:
+            LectureContent: Near-duplicate with a cached summary, or None
+        """
+        if self.max_distance <= 0:
+            return None
+
+        value = self.fingerprint(blob)
+        b0, b1, b2, b3 = bands(value)
+        candidates = db.session.execute(
+            db.select(LectureContent.content_hash, LectureContent.simhash)
+            .where(LectureContent.content_hash != blob.content_hash)
+            .where(LectureContent.summary_data.isnot(None))
+            .where(db.or_(
+                LectureContent.simhash_band0 == b0,
+                LectureContent.simhash_band1 == b1,
+                LectureContent.simhash_band2 == b2,
+                LectureContent.simhash_band3 == b3
+            ))
+        ).all()
+
+        best = None
+        for key, other in candidates:
+            distance = hamming(value, to_unsigned(other))
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, key)
+        return db.session.get(LectureContent, best[1]) if best else None
+
+    @staticmethod
+    def iter_content(key: str, chunk_size: int = 65536) -> Iterator[str]:
+        """
+        Read stored content in chunks, one SUBSTR query each, without
+        loading the whole column (requires app context)
+
+        Args:
+            key: content_hash
+            chunk_size: Characters per chunk
+
+        Yields:
+            str: Text chunks, in order
+        """
+        start = 1
+        while True:
+            chunk = db.session.execute(
+                db.select(db.func.substr(LectureContent.content, start, chunk_size))
+                .where(LectureContent.content_hash == key)
+            ).scalar()
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            start += chunk_size
+
+    @staticmethod
+    def summary_for(blob: LectureContent, title: str) -> Dict:
+        """Cached summary retitled for a particular note"""
+        return dict(blob.summary_data, title=title, timestamp=datetime.now().isoformat())
+
+    def get_stats(self) -> Dict:
+        """
+        Deduplication and summary cache statistics (requires app context)
+
+        Returns:
+            dict: Uploads, summary cache hits and bytes saved by sharing content
+        """
+        uploads, logical_bytes = db.session.execute(
+            db.select(db.func.count(LectureNote.note_id), db.func.sum(LectureContent.size_bytes))
+            .join(LectureContent, LectureNote.content_hash == LectureContent.content_hash)
+        ).one()
+        stored, stored_bytes = db.session.execute(
+            db.select(db.func.count(LectureContent.content_hash), db.func.sum(LectureContent.size_bytes))
+        ).one()
+        near_hits = db.session.execute(
+            db.select(db.func.count(LectureContent.content_hash))
+            .where(LectureContent.summary_source == 'near_duplicate')
+        ).scalar()
+
+        exact_hits = uploads - stored
+        logical_bytes = logical_bytes or 0
+        stored_bytes = stored_bytes or 0
+        return {
+            'uploads': uploads,
+            'stored_contents': stored,
+            'exact_duplicate_hits': exact_hits,
+            'near_duplicate_hits': near_hits,
+            'cache_hit_rate': round((exact_hits + near_hits) / uploads * 100, 1) if uploads else 0,
+            'logical_bytes': logical_bytes,
+            'stored_bytes': stored_bytes,
+            'bytes_saved': logical_bytes - stored_bytes,
+            'max_distance': self.max_distance
+        }
+
+
+# Global content store instance
+lecture_store = LectureContentStore()
+
+
+def init_lecture_store(app):
+    """
+    Configure lecture content deduplication
+
+    Args:
+        app: Flask application
+
+    Returns:
+        LectureContentStore: Configured store
+    """
+    lecture_store.max_distance = app.config.get('LECTURE_SIMHASH_DISTANCE', 3)
+    print(f"[OK] Lecture Content Store initialized (near-duplicate distance={lecture_store.max_distance})")
+    return lecture_store
@@ -2,9 +2,16 @@
 Lecture Note Summarizer
 Upload lecture recordings/transcripts and get AI-generated summaries
 """
+import codecs
+import heapq
+import math
+import operator
 import re
+import tempfile
+from array import array
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 
 
 class LectureSummarizer:
@@ -41,20 +48,38 @@ class LectureSummarizer:
         # Clean and preprocess content
         clean_content = self._preprocess_content(content)
         
-        # Extract key sentences
-        key_sentences = self._extract_key_sentences(clean_content)
+        # Extract key sentences and key concepts
+        key_sentences, key_concepts = self._extract(clean_content)
         
+        return self._build_result(title, key_sentences, key_concepts, len(content.split()))
+    
+    def summarize_stream(self, chunks: Iterable[str], title: str = "Lecture Notes") -> Dict:
+        """
+        Summarize a transcript given as text chunks (e.g. read from a file)
+        
+        The keyword engine joins the chunks; TfidfLectureSummarizer
+        processes them incrementally.
+        
+        Args:
+            chunks: Iterable of text chunks, in order
+            title: Title of the lecture
+            
+        Returns:
+            Same dictionary as summarize_lecture
+        """
+        return self.summarize_lecture(''.join(chunks), title)
+    
+    def _build_result(self, title: str, key_sentences: List[str], key_concepts: List[Dict],
+                      original_words: int) -> Dict:
+        """Assemble the summary dictionary from extracted sentences and concepts"""
         # Generate bullet points
         bullet_points = self._generate_bullet_points(key_sentences)
         
-        # Extract key concepts
-        key_concepts = self._extract_key_concepts(clean_content)
-        
         # Generate study questions
-        study_questions = self._generate_study_questions(clean_content, key_concepts)
+        study_questions = self._generate_study_questions(key_concepts)
         
         # Calculate statistics
-        stats = self._calculate_stats(content, bullet_points, key_concepts)
+        stats = self._calculate_stats(original_words, bullet_points, key_concepts)
         
         return {
             'success': True,
@@ -84,6 +109,10 @@ class LectureSummarizer:
         
         return content.strip()
     
+    def _extract(self, content: str) -> Tuple[List[str], List[Dict]]:
+        """Extract key sentences and key concepts from preprocessed content"""
+        return self._extract_key_sentences(content), self._extract_key_concepts(content)
+    
     def _extract_key_sentences(self, content: str, max_sentences: int = 10) -> List[str]:
         """Extract key sentences using keyword scoring"""
         # Split into sentences
@@ -200,8 +229,8 @@ class LectureSummarizer:
         
         return concepts[:max_concepts]
     
-    def _generate_study_questions(self, content: str, key_concepts: List[Dict]) -> List[Dict]:
-        """Generate study questions based on content"""
+    def _generate_study_questions(self, key_concepts: List[Dict]) -> List[Dict]:
+        """Generate study questions from key concepts"""
         questions = []
         
         # Question templates
@@ -272,9 +301,8 @@ class LectureSummarizer:
         
         return questions[:10]  # Return max 10 questions
     
-    def _calculate_stats(self, original: str, bullet_points: List[str], concepts: List[Dict]) -> Dict:
+    def _calculate_stats(self, original_words: int, bullet_points: List[str], concepts: List[Dict]) -> Dict:
         """Calculate summary statistics"""
-        original_words = len(original.split())
         summary_words = sum(len(bp.split()) for bp in bullet_points)
         
         compression_ratio = round((1 - summary_words / original_words) * 100, 1) if original_words > 0 else 0
@@ -450,3 +478,448 @@ class LectureSummarizer:
         )
         
         return html
+
+
+# ==================== TF-IDF Engine ====================
+
+STOPWORDS = frozenset((
+    "a", "about", "above", "after", "again", "all", "also", "am", "an", "and", "any",
+    "are", "as", "at", "be", "because", "been", "before", "being", "below", "between",
+    "both", "but", "by", "can", "could", "did", "do", "does", "doing", "down", "during",
+    "each", "even", "few", "for", "from", "further", "get", "got", "had", "has", "have",
+    "having", "he", "her", "here", "hers", "him", "his", "how", "i", "if", "in", "into",
+    "is", "it", "its", "itself", "just", "let", "like", "lot", "may", "me", "might",
+    "more", "most", "much", "must", "my", "no", "nor", "not", "now", "of", "off", "ok",
+    "okay", "on", "once", "one", "only", "or", "other", "our", "out", "over", "own",
+    "really", "right", "said", "same", "say", "see", "she", "should", "so", "some",
+    "something", "such", "than", "that", "the", "their", "them", "then", "there",
+    "these", "they", "thing", "things", "this", "those", "through", "to", "today",
+    "too", "under", "until", "up", "us", "use", "used", "very", "want", "was", "way",
+    "we", "well", "were", "what", "when", "where", "which", "while", "who", "whom",
+    "why", "will", "with", "would", "yeah", "yes", "you", "your", "going", "know",
+    "think", "look", "make", "two", "three", "first", "second", "next", "another"
+))
+
+_TOKEN = re.compile(r"[a-z][a-z0-9'\-]*[a-z0-9]")
+_SENTENCE_END = re.compile(r'[.!?]+')
+
+# Weights of the keyword engine's cue categories
+CUE_WEIGHTS = {
+    'definition': 3.0, 'important': 2.5, 'formula': 2.0, 'process': 1.5,
+    'example': 1.5, 'comparison': 1.5, 'result': 1.5
+}
+
+
+class SentenceSpool:
+    """Append-only sentence list kept in a temporary file instead of memory"""
+
+    def __init__(self, max_memory: int = 1 << 20):
+        """
+        Initialize spool
+
+        Args:
+            max_memory: Bytes held in memory before spilling to disk
+        """
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._offsets = array('q', [0])
+
+    def append(self, sentence: str):
+        data = sentence.encode('utf-8')
+        self._file.seek(self._offsets[-1])
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        self._file.seek(self._offsets[i])
+        return self._file.read(self._offsets[i + 1] - self._offsets[i]).decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SentenceMatrix:
+    """
+    Sparse sentence x term TF-IDF matrix in CSR layout
+
+    Row i holds the L2-normalized tf-idf weights of sentence i in
+    data[indptr[i]:indptr[i + 1]], with term ids in the same slice of
+    indices. Content is tokenized once; every score is a pass over data.
+    """
+
+    def __init__(self, sentences: Iterable[str], store=None):
+        """
+        Build the matrix
+
+        Args:
+            sentences: Sentences (rows), in document order; may be a generator
+            store: List-like the sentence texts are appended to (e.g. a
+                   SentenceSpool); defaults to a list
+        """
+        self.sentences = [] if store is None else store
+        self.vocabulary = {}  # term -> column id
+        self.indptr = array('i', [0])
+        self.indices = array('i')
+        counts = array('i')
+
+        vocabulary = self.vocabulary
+        for sentence in sentences:
+            self.sentences.append(sentence)
+            row = Counter(t for t in _TOKEN.findall(sentence.lower()) if t not in STOPWORDS)
+            self.indices.extend([vocabulary.setdefault(term, len(vocabulary)) for term in row])
+            counts.extend(row.values())
+            self.indptr.append(len(self.indices))
+
+        self.terms = list(vocabulary)
+        self.df = [0] * len(vocabulary)
+        self.term_counts = [0] * len(vocabulary)
+        for j, count in zip(self.indices, counts):
+            self.df[j] += 1
+            self.term_counts[j] += count
+
+        # Smoothed idf, as in scikit-learn's TfidfVectorizer
+        n = len(self.indptr) - 1
+        self.idf = idf = [math.log((1 + n) / (1 + df)) + 1.0 for df in self.df]
+
+        self.data = array('d')
+        indices, indptr = self.indices, self.indptr
+        for i in range(n):
+            lo, hi = indptr[i], indptr[i + 1]
+            weights = [count * idf[j] for j, count in zip(indices[lo:hi], counts[lo:hi])]
+            norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+            self.data.extend([w / norm for w in weights])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.indptr) - 1, len(self.terms)
+
+    def row(self, i: int) -> Dict[int, float]:
+        """Sentence i as a {term id: weight} dict"""
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return dict(zip(self.indices[lo:hi], self.data[lo:hi]))
+
+    def centroid(self, top_terms: int = 100) -> List[float]:
+        """
+        Mean sentence vector, keeping only its heaviest terms
+
+        Args:
+            top_terms: Terms kept in the centroid (the rest are zeroed)
+
+        Returns:
+            list: Dense centroid of length len(terms)
+        """
+        sums = [0.0] * len(self.terms)
+        for j, x in zip(self.indices, self.data):
+            sums[j] += x
+
+        kept = heapq.nlargest(top_terms, range(len(sums)), key=sums.__getitem__)
+        centroid = [0.0] * len(sums)
+        for j in kept:
+            centroid[j] = sums[j] / (len(self.indptr) - 1)
+        return centroid
+
+    def dot(self, vector: List[float]) -> List[float]:
+        """
+        Matrix-vector product
+
+        Args:
+            vector: Dense vector of length len(terms)
+
+        Returns:
+            list: One value per sentence
+        """
+        data, indices, indptr = self.data, self.indices, self.indptr
+        weight = vector.__getitem__
+        # Row by row, so no nnz-sized temporary is built
+        return [
+            sum(map(operator.mul, data[lo:hi], map(weight, indices[lo:hi])))
+            for lo, hi in zip(indptr, indptr[1:])
+        ]
+
+    def term_weights(self) -> List[float]:
+        """Corpus weight of each term (total count x idf)"""
+        return [count * idf for count, idf in zip(self.term_counts, self.idf)]
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two L2-normalized sparse rows"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(x * b.get(j, 0.0) for j, x in a.items())
+
+
+class TfidfLectureSummarizer(LectureSummarizer):
+    """
+    Extractive summarizer scoring sentences by similarity to the TF-IDF
+    centroid of the lecture; key concepts come from the same matrix
+    """
+
+    def __init__(self, centroid_terms: int = 100, cue_weight: float = 0.02,
+                 redundancy_threshold: float = 0.6, max_sentence_words: int = 60,
+                 max_buffer_chars: int = 100000):
+        """
+        Initialize summarizer
+
+        Args:
+            centroid_terms: Terms kept in the lecture centroid
+            cue_weight: Score added per cue weight (e.g. "is defined as" = 3.0)
+            redundancy_threshold: Cosine above which a sentence repeats a chosen one
+            max_sentence_words: Longer sentences (unpunctuated transcripts) are split
+            max_buffer_chars: Longest unterminated text buffered when streaming
+        """
+        super().__init__()
+        self.centroid_terms = centroid_terms
+        self.cue_weight = cue_weight
+        self.redundancy_threshold = redundancy_threshold
+        self.max_sentence_words = max_sentence_words
+        self.max_buffer_chars = max_buffer_chars
+        # One alternation (longest phrases first) is much faster than a
+        # group per category; the matched phrase maps back to its category
+        self.cue_categories = {
+            keyword: category
+            for category, keywords in self.keywords.items()
+            for keyword in keywords
+        }
+        phrases = sorted(self.cue_categories, key=len, reverse=True)
+        self.cue_pattern = re.compile(
+            r'\b(?:%s)\b' % '|'.join(re.escape(k) for k in phrases if k[0].isalpha())
+            + ''.join('|' + re.escape(k) for k in phrases if not k[0].isalpha())
+        )
+
+    def _chunk_sentence(self, sentence: str) -> List[str]:
+        """The sentence if longer than 20 characters, cut into chunks if very long"""
+        sentence = sentence.strip()
+        if len(sentence) <= 20:
+            return []
+        words = sentence.split()
+        limit = self.max_sentence_words
+        if len(words) <= limit:
+            return [sentence]
+        # Split into even chunks so no fragment is tiny
+        chunks = -(-len(words) // limit)
+        size = -(-len(words) // chunks)
+        return [' '.join(words[k:k + size]) for k in range(0, len(words), size)]
+
+    def _split_sentences(self, content: str) -> List[str]:
+        """Sentences longer than 20 characters, long ones cut into chunks"""
+        sentences = []
+        for sentence in _SENTENCE_END.split(content):
+            sentences.extend(self._chunk_sentence(sentence))
+        return sentences
+
+    def _stream_sentences(self, chunks: Iterable[str], totals: Dict) -> Iterator[str]:
+        """
+        Preprocessed sentences from text chunks, joined across chunk boundaries
+
+        Text is cleaned up to the last whitespace of what has arrived, so a
+        word or URL split between chunks is cleaned whole.
+
+        Args:
+            chunks: Raw text chunks
+            totals: Receives 'words' and 'chars' of the raw text
+        """
+        tail = ''     # raw text after the last whitespace
+        pending = ''  # cleaned text after the last sentence end
+
+        for chunk in chunks:
+            text = tail + chunk
+            cut = max(text.rfind(c) for c in ' \n\t\r')
+            if cut < 0 and len(text) < self.max_buffer_chars:
+                tail = text
+                continue
+            if cut < 0:
+                cut = len(text)
+            raw, tail = text[:cut], text[cut:]
+
+            totals['words'] += len(raw.split())
+            totals['chars'] += len(raw.strip())
+            clean = self._preprocess_content(raw)
+            if not clean:
+                continue
+            parts = _SENTENCE_END.split(f'{pending} {clean}')
+            pending = parts.pop()
+            for sentence in parts:
+                yield from self._chunk_sentence(sentence)
+
+            if len(pending) > self.max_buffer_chars:
+                # An unpunctuated run; cut it rather than buffer it all
+                yield from self._chunk_sentence(pending)
+                pending = ''
+
+        totals['words'] += len(tail.split())
+        totals['chars'] += len(tail.strip())
+        for sentence in _SENTENCE_END.split(f'{pending} {self._preprocess_content(tail)}'):
+            yield from self._chunk_sentence(sentence)
+
+    def summarize_stream(self, chunks: Iterable[str], title: str = "Lecture Notes") -> Dict:
+        """
+        Summarize a transcript given as text chunks without holding it in memory
+
+        Sentences are cleaned and split as chunks arrive, term counts are
+        kept in the sparse matrix and sentence texts are spooled to a
+        temporary file, so memory grows with the matrix rather than the text.
+
+        Args:
+            chunks: Iterable of text chunks, in order (see iter_text_chunks)
+            title: Title of the lecture
+
+        Returns:
+            Same dictionary as summarize_lecture
+        """
+        totals = {'words': 0, 'chars': 0}
+        with SentenceSpool() as spool:
+            matrix = SentenceMatrix(self._stream_sentences(chunks, totals), store=spool)
+            if totals['chars'] < 50:
+                return {
+                    'error': 'Content too short. Please provide at least 50 characters.',
+                    'success': False
+                }
+            if len(spool):
+                key_sentences, key_concepts = self._rank_sentences(matrix), self._matrix_concepts(matrix)
+            else:
+                key_sentences, key_concepts = [], []
+
+        return self._build_result(title, key_sentences, key_concepts, totals['words'])
+
+    def _cue_score(self, sentence: str) -> float:
+        """Sum of cue weights for the categories present in a sentence"""
+        found = {self.cue_categories[k] for k in self.cue_pattern.findall(sentence.lower())}
+        return sum(CUE_WEIGHTS.get(category, 1.5) for category in found)
+
+    def _extract(self, content: str) -> Tuple[List[str], List[Dict]]:
+        sentences = self._split_sentences(content)
+        if not sentences:
+            return [], []
+
+        matrix = SentenceMatrix(sentences)
+        return self._rank_sentences(matrix), self._matrix_concepts(matrix)
+
+    def _rank_sentences(self, matrix: SentenceMatrix, max_sentences: int = 10) -> List[str]:
+        """Top sentences by centroid similarity, skipping near-duplicates"""
+        similarity = matrix.dot(matrix.centroid(self.centroid_terms))
+        scores = [
+            (similarity[i] + self.cue_weight * self._cue_score(sentence), i)
+            for i, sentence in enumerate(matrix.sentences)
+        ]
+        scores.sort(reverse=True)
+
+        chosen = []
+        rows = []
+        for score, i in scores:
+            if score <= 0 or len(chosen) >= max_sentences:
+                break
+            row = matrix.row(i)
+            if any(cosine(row, other) > self.redundancy_threshold for other in rows):
+                continue
+            chosen.append(matrix.sentences[i])
+            rows.append(row)
+        return chosen
+
+    def _matrix_concepts(self, matrix: SentenceMatrix, max_concepts: int = 8) -> List[Dict]:
+        """Definitions found in the sentences, then the heaviest recurring terms"""
+        concepts = []
+        for sentence in matrix.sentences:
+            lower = sentence.lower()
+            for pattern in self.keywords['definition']:
+                if pattern not in lower:
+                    continue
+                before, _, definition = lower.partition(pattern)
+                term = ' '.join(before.split()[-3:]).title()
+                term = re.sub(r'^(the|a|an)\s+', '', term, flags=re.IGNORECASE)
+                definition = definition.strip()
+                if term and definition and len(term) < 50:
+                    concepts.append({
+                        'term': term,
+                        'definition': definition[:150] + ('...' if len(definition) > 150 else ''),
+                        'importance': 'high'
+                    })
+                    break
+            if len(concepts) >= max_concepts:
+                break
+
+        # Terms spread over several sentences and rare in general vocabulary
+        weights = matrix.term_weights()
+        defined = {c['term'].lower() for c in concepts}
+        ranked = sorted(
+            (j for j, df in enumerate(matrix.df) if df >= 2 and len(matrix.terms[j]) > 3),
+            key=weights.__getitem__, reverse=True
+        )
+        for j in ranked[:5]:
+            term = matrix.terms[j]
+            if any(term in d.split() for d in defined):
+                continue
+            count = matrix.term_counts[j]
+            concepts.append({
+                'term': term.title(),
+                'definition': f'Mentioned {count} times - key concept in this lecture',
+                'importance': 'medium' if count < 4 else 'high'
+            })
+
+        return concepts[:max_concepts]
+
+
+def iter_text_chunks(source, chunk_size: int = 65536, encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Read text in chunks from a string or a text/binary file object
+
+    Bytes are decoded incrementally, so multi-byte characters split
+    between reads are decoded correctly.
+
+    Args:
+        source: str, or file-like object with read()
+        chunk_size: Characters (str/text files) or bytes read per chunk
+        encoding: Encoding of binary sources
+
+    Yields:
+        str: Text chunks
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        block = source.read(chunk_size)
+        if not block:
+            break
+        yield decoder.decode(block) if isinstance(block, bytes) else block
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+SUMMARIZER_ENGINES = {
+    'keyword': LectureSummarizer,
+    'tfidf': TfidfLectureSummarizer
+}
+
+
+def create_summarizer(engine: str = 'tfidf') -> LectureSummarizer:
+    """
+    Create a lecture summarizer
+
+    Args:
+        engine: 'tfidf' (centroid TF-IDF) or 'keyword' (cue-phrase scoring)
+
+    Returns:
+        LectureSummarizer: Summarizer instance
+    """
+    if engine not in SUMMARIZER_ENGINES:
+        print(f"[WARNING] Unknown summarizer engine '{engine}', using tfidf")
+        engine = 'tfidf'
+    return SUMMARIZER_ENGINES[engine]()
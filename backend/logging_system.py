@@ -3,11 +3,14 @@ Advanced Logging System
 Structured logging with rotation, levels, and formatting
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
 import json
-from datetime import datetime
+import queue
+import threading
+import time
 from typing import Any, Dict, Optional
 from pathlib import Path
 
@@ -15,13 +18,18 @@ class StructuredLogger:
     """Structured logging with JSON output and file rotation"""
     
     _loggers: Dict[str, logging.Logger] = {}
+    _listeners: Dict[str, 'BatchingQueueListener'] = {}
+    _queue_handlers: Dict[str, 'DroppingQueueHandler'] = {}
     
     @staticmethod
     def get_logger(name: str = 'edubot',
                    log_file: Optional[str] = None,
                    level: str = 'INFO',
                    max_bytes: int = 10485760,  # 10MB
-                   backup_count: int = 5) -> logging.Logger:
+                   backup_count: int = 5,
+                   async_mode: bool = False,
+                   queue_size: int = 10000,
+                   batch_size: int = 100) -> logging.Logger:
         """
         Get or create a structured logger
         
@@ -31,6 +39,9 @@ class StructuredLogger:
             level: Logging level
             max_bytes: Max log file size before rotation
             backup_count: Number of backup files to keep
+            async_mode: Hand records to a background writer thread
+            queue_size: Records buffered in async mode before dropping
+            batch_size: Records written per flush in async mode
             
         Returns:
             logging.Logger: Configured logger
@@ -44,15 +55,22 @@ class StructuredLogger:
         # Clear existing handlers
         logger.handlers.clear()
         
+        # In async mode the handlers run on the listener thread and only
+        # flush once per batch
+        stream_handler_class = BatchStreamHandler if async_mode else logging.StreamHandler
+        file_handler_class = (BatchRotatingFileHandler if async_mode
+                              else logging.handlers.RotatingFileHandler)
+        handlers = []
+        
         # Console handler with color coding
-        console_handler = logging.StreamHandler()
+        console_handler = stream_handler_class()
         console_handler.setLevel(logging.INFO)
         console_formatter = ColoredFormatter(
             '[%(levelname)s] %(asctime)s - %(name)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
         
         # File handler with rotation
         if log_file:
@@ -61,7 +79,7 @@ class StructuredLogger:
             if log_dir:
                 Path(log_dir).mkdir(parents=True, exist_ok=True)
             
-            file_handler = logging.handlers.RotatingFileHandler(
+            file_handler = file_handler_class(
                 log_file,
                 maxBytes=max_bytes,
                 backupCount=backup_count,
@@ -70,12 +88,12 @@ class StructuredLogger:
             file_handler.setLevel(logging.DEBUG)
             file_formatter = JSONFormatter()
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
         
         # Error file handler (separate file for errors)
         if log_file:
             error_file = log_file.replace('.log', '.error.log')
-            error_handler = logging.handlers.RotatingFileHandler(
+            error_handler = file_handler_class(
                 error_file,
                 maxBytes=max_bytes,
                 backupCount=backup_count,
@@ -83,14 +101,59 @@ class StructuredLogger:
             )
             error_handler.setLevel(logging.ERROR)
             error_handler.setFormatter(JSONFormatter())
-            logger.addHandler(error_handler)
+            handlers.append(error_handler)
+        
+        if async_mode:
+            log_queue = queue.Queue(maxsize=queue_size)
+            queue_handler = DroppingQueueHandler(log_queue)
+            listener = BatchingQueueListener(
+                log_queue, *handlers,
+                batch_size=batch_size,
+                respect_handler_level=True
+            )
+            listener.start()
+            logger.addHandler(queue_handler)
+            StructuredLogger._listeners[name] = listener
+            StructuredLogger._queue_handlers[name] = queue_handler
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
         
         StructuredLogger._loggers[name] = logger
         return logger
     
+    @staticmethod
+    def get_async_stats() -> Dict[str, Dict[str, int]]:
+        """
+        Get queue statistics for async loggers
+        
+        Returns:
+            dict: Logger name -> queued records, queue capacity and dropped count
+        """
+        return {
+            name: {
+                'queued': handler.queue.qsize(),
+                'capacity': handler.queue.maxsize,
+                'dropped': handler.dropped
+            }
+            for name, handler in StructuredLogger._queue_handlers.items()
+        }
+    
+    @staticmethod
+    def shutdown():
+        """Drain async loggers and stop their writer threads"""
+        for name, listener in list(StructuredLogger._listeners.items()):
+            try:
+                listener.stop()
+            except Exception as e:
+                print(f"[ERROR] Failed to stop log listener {name}: {e}")
+        StructuredLogger._listeners.clear()
+    
     @staticmethod
     def log_request(logger: logging.Logger, request: Any, response_code: int,
-                   duration_ms: float, user_id: Optional[int] = None):
+                   duration_ms: float, user_id: Optional[int] = None,
+                   query_count: Optional[int] = None,
+                   query_time_ms: Optional[float] = None):
         """
         Log HTTP request with structured data
         
@@ -100,21 +163,66 @@ class StructuredLogger:
             response_code: HTTP response code
             duration_ms: Request duration in milliseconds
             user_id: User ID if authenticated
+            query_count: Number of SQL statements issued by the request
+            query_time_ms: Total time spent in SQL statements
         """
-        extra = {
+        StructuredLogger.log_http_request(
+            logger,
+            request.method,
+            request.path,
+            response_code,
+            duration_ms,
+            user_id=user_id,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string if request.user_agent else None,
+            query_count=query_count,
+            query_time_ms=query_time_ms
+        )
+    
+    @staticmethod
+    def log_http_request(logger: logging.Logger, method: str, path: str,
+                         response_code: int, duration_ms: float,
+                         user_id: Optional[int] = None,
+                         ip_address: Optional[str] = None,
+                         user_agent: Optional[str] = None,
+                         query_count: Optional[int] = None,
+                         query_time_ms: Optional[float] = None):
+        """
+        Log HTTP request from plain values (no request context needed)
+        
+        Args:
+            logger: Logger instance
+            method: HTTP method
+            path: Request path
+            response_code: HTTP response code
+            duration_ms: Request duration in milliseconds
+            user_id: User ID if authenticated
+            ip_address: Client address
+            user_agent: Client user agent string
+            query_count: Number of SQL statements issued by the request
+            query_time_ms: Total time spent in SQL statements
+        """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        fields = {
             'event_type': 'http_request',
-            'method': request.method,
-            'path': request.path,
+            'method': method,
+            'path': path,
             'response_code': response_code,
             'duration_ms': duration_ms,
             'user_id': user_id,
-            'ip_address': request.remote_addr,
-            'user_agent': request.user_agent.string if request.user_agent else None
+            'ip_address': ip_address,
+            'user_agent': user_agent
         }
         
+        if query_count is not None:
+            fields['query_count'] = query_count
+            fields['query_time_ms'] = query_time_ms
+        
         logger.info(
-            f'{request.method} {request.path} - {response_code} - {duration_ms:.2f}ms',
-            extra=extra
+            f'{method} {path} - {response_code} - {duration_ms:.2f}ms',
+            extra={'event_type': 'http_request', STRUCTURED_FIELDS: fields}
         )
     
     @staticmethod
@@ -131,14 +239,6 @@ class StructuredLogger:
             details: Event details
             user_id: User ID if applicable
         """
-        extra = {
-            'event_type': 'security',
-            'security_event': event_type,
-            'severity': severity,
-            'user_id': user_id,
-            **details
-        }
-        
         level = {
             'low': logging.INFO,
             'medium': logging.WARNING,
@@ -146,10 +246,21 @@ class StructuredLogger:
             'critical': logging.CRITICAL
         }.get(severity, logging.WARNING)
         
+        if not logger.isEnabledFor(level):
+            return
+        
+        fields = {
+            'event_type': 'security',
+            'security_event': event_type,
+            'severity': severity,
+            'user_id': user_id,
+            **details
+        }
+        
         logger.log(
             level,
             f'Security Event: {event_type} - {severity.upper()}',
-            extra=extra
+            extra={'event_type': 'security', STRUCTURED_FIELDS: fields}
         )
     
     @staticmethod
@@ -180,13 +291,42 @@ class StructuredLogger:
         )
 
 
+# Record attribute carrying pre-built fields from the StructuredLogger helpers
+STRUCTURED_FIELDS = 'structured_fields'
+
+# Standard LogRecord attributes, excluded when collecting extra fields
+_RESERVED_ATTRS = frozenset([
+    'name', 'msg', 'args', 'created', 'filename', 'funcName', 'levelname',
+    'levelno', 'lineno', 'module', 'msecs', 'message', 'pathname', 'process',
+    'processName', 'relativeCreated', 'thread', 'threadName', 'exc_info',
+    'exc_text', 'stack_info', 'taskName', STRUCTURED_FIELDS
+])
+
+# Shared encoder; json.dumps with keyword arguments builds a new one per call
+_json_encoder = json.JSONEncoder(default=str, check_circular=False,
+                                 separators=(',', ':'))
+
+
 class JSONFormatter(logging.Formatter):
     """JSON log formatter for structured logging"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_second = None
+        self._last_timestamp = ''
+    
+    def _timestamp(self, created: float) -> str:
+        """ISO-8601 UTC timestamp, reusing the formatted second"""
+        second = int(created)
+        if second != self._last_second:
+            self._last_timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            self._last_second = second
+        return '%s.%06dZ' % (self._last_timestamp, (created - second) * 1e6)
+    
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON"""
         log_data = {
-            'timestamp': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'timestamp': self._timestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -195,22 +335,24 @@ class JSONFormatter(logging.Formatter):
             'line': record.lineno
         }
         
+        # Structured helpers hand over their fields ready-made
+        fields = record.__dict__.get(STRUCTURED_FIELDS)
+        if fields is not None:
+            for key, value in fields.items():
+                log_data.setdefault(key, value)
         # Add extra fields if present
-        if hasattr(record, 'event_type'):
+        elif hasattr(record, 'event_type'):
             for key, value in record.__dict__.items():
-                if key not in ['name', 'msg', 'args', 'created', 'filename',
-                              'funcName', 'levelname', 'levelno', 'lineno',
-                              'module', 'msecs', 'message', 'pathname',
-                              'process', 'processName', 'relativeCreated',
-                              'thread', 'threadName', 'exc_info', 'exc_text',
-                              'stack_info']:
+                if key not in _RESERVED_ATTRS:
                     log_data[key] = value
         
         # Add exception info if present
         if record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data['exception'] = record.exc_text
         
-        return json.dumps(log_data, default=str)
+        return _json_encoder.encode(log_data)
 
 
 class ColoredFormatter(logging.Formatter):
@@ -227,9 +369,149 @@ class ColoredFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         """Format log record with color"""
-        color = self.COLORS.get(record.levelname, '')
-        record.levelname = f'{color}{record.levelname}{self.RESET}'
-        return super().format(record)
+        # Color a copy of the level name so other handlers see it unchanged
+        levelname = record.levelname
+        color = self.COLORS.get(levelname, '')
+        record.levelname = f'{color}{levelname}{self.RESET}'
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks; records are dropped when the queue is full"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Resolve message and traceback on the calling thread"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        """Queue the record, counting it as dropped on overflow"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+
+class BatchFlushMixin:
+    """Defers stream flushes until the end of a batch"""
+    
+    _in_batch = False
+    
+    def begin_batch(self):
+        self._in_batch = True
+    
+    def end_batch(self):
+        self._in_batch = False
+        self.flush()
+    
+    def flush(self):
+        if not self._in_batch:
+            super().flush()
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    """Stream handler flushing once per batch"""
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    """Rotating file handler flushing once per batch"""
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that drains records in batches"""
+    
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 100,
+                 respect_handler_level: bool = False):
+        super().__init__(log_queue, *handlers,
+                         respect_handler_level=respect_handler_level)
+        self.batch_size = batch_size
+        self._batch_handlers = [h for h in handlers if isinstance(h, BatchFlushMixin)]
+        self._stop_lock = threading.Lock()
+        self.sentinel_timeout = 5.0
+        atexit.register(self.stop)
+    
+    def enqueue_sentinel(self):
+        """
+        Queue the sentinel, waiting up to sentinel_timeout for room; if the
+        writer thread cannot make room, the oldest records are discarded
+        so stop() never hangs
+        """
+        try:
+            self.queue.put(self._sentinel, timeout=self.sentinel_timeout)
+            return
+        except queue.Full:
+            pass
+        while True:
+            try:
+                self.queue.put_nowait(self._sentinel)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                except queue.Empty:
+                    pass
+    
+    def stop(self):
+        """Write remaining records and stop the writer thread"""
+        with self._stop_lock:
+            if self._thread is not None:
+                super().stop()
+    
+    def _monitor(self):
+        """Write up to batch_size queued records per flush"""
+        q = self.queue
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            
+            for handler in self._batch_handlers:
+                handler.begin_batch()
+            
+            # Errors are reported like a handler's own emit errors; letting
+            # one escape would end the thread and leave the queue to fill up
+            stop = False
+            last = None
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                    continue
+                last = record
+                try:
+                    self.handle(record)
+                except Exception:
+                    if self.handlers:
+                        self.handlers[0].handleError(record)
+            
+            for handler in self._batch_handlers:
+                try:
+                    handler.end_batch()
+                except Exception:
+                    if last is not None:
+                        handler.handleError(last)
+            
+            for _ in batch:
+                q.task_done()
+            
+            if stop:
+                break
 
 
 # Performance monitoring decorator
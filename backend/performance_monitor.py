@@ -4,12 +4,177 @@ CPU, memory, disk usage, database query performance, bottleneck identification
 """
 import psutil
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 from functools import wraps
 import threading
 
 
+class SystemMetricsSampler:
+    """Background thread that samples system/process metrics into a ring buffer"""
+    
+    def __init__(self, interval: float = 5.0, history_size: int = 120):
+        """
+        Initialize sampler
+        
+        Args:
+            interval: Seconds between samples
+            history_size: Number of samples kept in the ring buffer
+        """
+        self.interval = max(0.1, float(interval))
+        self.history = deque(maxlen=max(1, int(history_size)))
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self) -> bool:
+        """Whether the sampling thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the sampling thread (no-op if already running)"""
+        with self._lock:
+            if self.running:
+                return
+            
+            # Prime the CPU counters so the first real sample is meaningful
+            psutil.cpu_percent(interval=None, percpu=True)
+            self._process.cpu_percent(interval=None)
+            
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name='perf-metrics-sampler',
+                daemon=True
+            )
+            self._thread.start()
+    
+    def stop(self, timeout: float = 2.0):
+        """Stop the sampling thread"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+    
+    def _run(self):
+        """Sampling loop"""
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+    
+    def sample(self) -> Dict:
+        """Take one sample and append it to the history"""
+        try:
+            snapshot = {
+                'system': collect_system_metrics(),
+                'process': collect_process_metrics(self._process, detailed=True),
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            print(f"[WARNING] Metrics sampling failed: {e}")
+            return {}
+        
+        self.history.append(snapshot)
+        return snapshot
+    
+    def latest(self) -> Optional[Dict]:
+        """Get most recent sample"""
+        try:
+            return self.history[-1]
+        except IndexError:
+            return None
+    
+    def get_history(self, limit: int = None) -> List[Dict]:
+        """Get up to `limit` most recent samples, oldest first"""
+        samples = list(self.history)
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return samples
+
+
+def collect_system_metrics() -> Dict:
+    """
+    Collect system metrics without blocking
+    
+    CPU percentages are measured since the previous call, so this
+    should be called periodically (see SystemMetricsSampler).
+    """
+    cpu_percent = psutil.cpu_percent(interval=None, percpu=True)
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    cpu_count = psutil.cpu_count() or 1
+    
+    return {
+        'cpu': {
+            'percent': round(sum(cpu_percent) / len(cpu_percent), 2) if cpu_percent else 0.0,
+            'per_core': [round(p, 2) for p in cpu_percent],
+            'cores': cpu_count,
+            'load_average': [round(x / cpu_count * 100, 2) for x in psutil.getloadavg()] if hasattr(psutil, 'getloadavg') else []
+        },
+        'memory': {
+            'total': memory.total,
+            'available': memory.available,
+            'used': memory.used,
+            'percent': round(memory.percent, 2),
+            'total_gb': round(memory.total / (1024**3), 2),
+            'used_gb': round(memory.used / (1024**3), 2)
+        },
+        'disk': {
+            'total': disk.total,
+            'used': disk.used,
+            'free': disk.free,
+            'percent': round(disk.percent, 2),
+            'total_gb': round(disk.total / (1024**3), 2),
+            'free_gb': round(disk.free / (1024**3), 2)
+        },
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def collect_process_metrics(process: psutil.Process = None, detailed: bool = False) -> Dict:
+    """
+    Collect process metrics without blocking
+    
+    Args:
+        process: psutil.Process to inspect (defaults to current process)
+        detailed: Also count open files and connections (slow; meant
+                  for the background sampler, not request threads)
+    """
+    process = process or psutil.Process()
+    
+    with process.oneshot():
+        memory_info = process.memory_info()
+        metrics = {
+            'pid': process.pid,
+            'cpu_percent': round(process.cpu_percent(interval=None), 2),
+            'memory_info': {
+                'rss': memory_info.rss,
+                'vms': memory_info.vms,
+                'rss_mb': round(memory_info.rss / (1024**2), 2)
+            },
+            'memory_percent': round(process.memory_percent(), 2),
+            'threads': process.num_threads(),
+            'create_time': datetime.fromtimestamp(process.create_time()).isoformat()
+        }
+    
+    if detailed:
+        get_connections = getattr(process, 'net_connections', None) or process.connections
+        try:
+            metrics['open_files'] = len(process.open_files())
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            metrics['open_files'] = None
+        try:
+            metrics['connections'] = len(get_connections())
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            metrics['connections'] = None
+    
+    return metrics
+
+
 class PerformanceMonitor:
     """Monitor system and application performance"""
     
@@ -18,62 +183,64 @@ class PerformanceMonitor:
             'requests': [],
             'queries': [],
             'endpoints': {},
-            'errors': []
+            'errors': [],
+            'fingerprints': {},
+            'n_plus_one': {}
         }
         self.start_time = datetime.now()
         self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self.sampler = None
     
-    def get_system_metrics(self) -> Dict:
-        """Get current system metrics"""
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+    def start_sampler(self, interval: float = 5.0, history_size: int = 120) -> SystemMetricsSampler:
+        """
+        Start background sampling of system and process metrics
+        
+        Args:
+            interval: Seconds between samples
+            history_size: Number of samples kept for history
+            
+        Returns:
+            SystemMetricsSampler: The running sampler
+        """
+        if self.sampler is not None:
+            self.sampler.stop()
+        
+        self.sampler = SystemMetricsSampler(interval, history_size)
+        self.sampler.start()
+        return self.sampler
+    
+    def stop_sampler(self):
+        """Stop background sampling"""
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+    
+    def get_latest_snapshot(self) -> Dict:
+        """Get the latest sampled snapshot, collecting one if the sampler has none yet"""
+        snapshot = self.sampler.latest() if self.sampler else None
+        if snapshot:
+            return snapshot
         
         return {
-            'cpu': {
-                'percent': round(psutil.cpu_percent(interval=0.1), 2),
-                'per_core': [round(p, 2) for p in cpu_percent],
-                'cores': psutil.cpu_count(),
-                'load_average': [round(x / psutil.cpu_count() * 100, 2) for x in psutil.getloadavg()] if hasattr(psutil, 'getloadavg') else []
-            },
-            'memory': {
-                'total': memory.total,
-                'available': memory.available,
-                'used': memory.used,
-                'percent': round(memory.percent, 2),
-                'total_gb': round(memory.total / (1024**3), 2),
-                'used_gb': round(memory.used / (1024**3), 2)
-            },
-            'disk': {
-                'total': disk.total,
-                'used': disk.used,
-                'free': disk.free,
-                'percent': round(disk.percent, 2),
-                'total_gb': round(disk.total / (1024**3), 2),
-                'free_gb': round(disk.free / (1024**3), 2)
-            },
+            'system': collect_system_metrics(),
+            'process': collect_process_metrics(self._process),
             'timestamp': datetime.now().isoformat()
         }
     
+    def get_metrics_history(self, limit: int = 60) -> List[Dict]:
+        """Get recent sampled snapshots, oldest first"""
+        if not self.sampler:
+            return []
+        return self.sampler.get_history(limit)
+    
+    def get_system_metrics(self) -> Dict:
+        """Get current system metrics (latest sample, never blocks)"""
+        return self.get_latest_snapshot()['system']
+    
     def get_process_metrics(self) -> Dict:
-        """Get current process metrics"""
-        process = psutil.Process()
-        
-        with process.oneshot():
-            return {
-                'pid': process.pid,
-                'cpu_percent': round(process.cpu_percent(interval=0.1), 2),
-                'memory_info': {
-                    'rss': process.memory_info().rss,
-                    'vms': process.memory_info().vms,
-                    'rss_mb': round(process.memory_info().rss / (1024**2), 2)
-                },
-                'memory_percent': round(process.memory_percent(), 2),
-                'threads': process.num_threads(),
-                'open_files': len(process.open_files()),
-                'connections': len(process.connections()),
-                'create_time': datetime.fromtimestamp(process.create_time()).isoformat()
-            }
+        """Get current process metrics (latest sample, never blocks)"""
+        return self.get_latest_snapshot()['process']
     
     def track_request(self, endpoint: str, method: str, duration: float, 
                      status_code: int, user_id: int = None):
@@ -114,11 +281,13 @@ class PerformanceMonitor:
             if len(self.metrics['requests']) > 1000:
                 self.metrics['requests'] = self.metrics['requests'][-1000:]
     
-    def track_db_query(self, query: str, duration: float, rows_affected: int = 0):
+    def track_db_query(self, query: str, duration: float, rows_affected: int = 0,
+                       fingerprint: str = None):
         """Track database query"""
         with self._lock:
             query_data = {
                 'query': query[:200],  # Truncate long queries
+                'fingerprint': fingerprint,
                 'duration': duration,
                 'rows_affected': rows_affected,
                 'timestamp': datetime.now()
@@ -129,6 +298,41 @@ class PerformanceMonitor:
             # Keep only last 500 queries
             if len(self.metrics['queries']) > 500:
                 self.metrics['queries'] = self.metrics['queries'][-500:]
+            
+            # Aggregate per fingerprint (bounded to 500 distinct statements)
+            if fingerprint:
+                stats = self.metrics['fingerprints'].get(fingerprint)
+                if stats is None:
+                    if len(self.metrics['fingerprints']) >= 500:
+                        return
+                    stats = self.metrics['fingerprints'][fingerprint] = {
+                        'count': 0,
+                        'total_duration': 0.0,
+                        'max_duration': 0.0,
+                        'total_rows': 0
+                    }
+                stats['count'] += 1
+                stats['total_duration'] += duration
+                stats['max_duration'] = max(stats['max_duration'], duration)
+                stats['total_rows'] += rows_affected
+    
+    def track_n_plus_one(self, endpoint: str, fingerprint: str, count: int):
+        """Track a query repeated many times within one request (N+1 pattern)"""
+        with self._lock:
+            key = (endpoint, fingerprint)
+            report = self.metrics['n_plus_one'].get(key)
+            if report is None:
+                if len(self.metrics['n_plus_one']) >= 200:
+                    return
+                report = self.metrics['n_plus_one'][key] = {
+                    'endpoint': endpoint,
+                    'fingerprint': fingerprint[:500],
+                    'occurrences': 0,
+                    'max_repeats': 0
+                }
+            report['occurrences'] += 1
+            report['max_repeats'] = max(report['max_repeats'], count)
+            report['last_seen'] = datetime.now()
     
     def track_error(self, error_type: str, message: str, endpoint: str = None):
         """Track application error"""
@@ -213,6 +417,7 @@ class PerformanceMonitor:
         slow_queries = [
             {
                 'query': q['query'],
+                'fingerprint': q.get('fingerprint'),
                 'duration_ms': round(q['duration'] * 1000, 2),
                 'rows_affected': q['rows_affected'],
                 'timestamp': q['timestamp'].isoformat()
@@ -223,6 +428,35 @@ class PerformanceMonitor:
         
         return sorted(slow_queries, key=lambda x: x['duration_ms'], reverse=True)[:limit]
     
+    def get_query_fingerprints(self, limit: int = 20) -> List[Dict]:
+        """Get query fingerprints ordered by total time spent"""
+        with self._lock:
+            items = list(self.metrics['fingerprints'].items())
+        
+        fingerprints = [
+            {
+                'fingerprint': fingerprint[:500],
+                'count': stats['count'],
+                'total_ms': round(stats['total_duration'] * 1000, 2),
+                'avg_ms': round(stats['total_duration'] / stats['count'] * 1000, 3),
+                'max_ms': round(stats['max_duration'] * 1000, 2),
+                'total_rows': stats['total_rows']
+            }
+            for fingerprint, stats in items
+        ]
+        
+        return sorted(fingerprints, key=lambda x: x['total_ms'], reverse=True)[:limit]
+    
+    def get_n_plus_one_reports(self, limit: int = 20) -> List[Dict]:
+        """Get detected N+1 query patterns, worst first"""
+        with self._lock:
+            reports = [dict(r) for r in self.metrics['n_plus_one'].values()]
+        
+        for report in reports:
+            report['last_seen'] = report['last_seen'].isoformat()
+        
+        return sorted(reports, key=lambda x: x['max_repeats'], reverse=True)[:limit]
+    
     def get_error_summary(self, hours: int = 24) -> Dict:
         """Get error summary"""
         cutoff = datetime.now() - timedelta(hours=hours)
@@ -247,9 +481,9 @@ class PerformanceMonitor:
     def get_bottlenecks(self) -> Dict:
         """Identify performance bottlenecks"""
         system = self.get_system_metrics()
-        process = self.get_process_metrics()
         slow_endpoints = self.get_slow_endpoints(threshold_ms=500)
         slow_queries = self.get_slow_queries(threshold_ms=50)
+        n_plus_one = self.get_n_plus_one_reports(limit=3)
         
         bottlenecks = []
         
@@ -300,6 +534,16 @@ class PerformanceMonitor:
                 'recommendation': 'Add database indexes or optimize queries'
             })
         
+        # N+1 query patterns
+        if n_plus_one:
+            bottlenecks.append({
+                'type': 'N+1 Queries',
+                'severity': 'medium',
+                'message': f"Found {len(n_plus_one)} repeated per-row query patterns",
+                'details': n_plus_one,
+                'recommendation': 'Eager-load relationships or use aggregate queries'
+            })
+        
         return {
             'total_bottlenecks': len(bottlenecks),
             'bottlenecks': bottlenecks,
@@ -326,7 +570,9 @@ class PerformanceMonitor:
                 'requests': [],
                 'queries': [],
                 'endpoints': {},
-                'errors': []
+                'errors': [],
+                'fingerprints': {},
+                'n_plus_one': {}
             }
 
 
@@ -0,0 +1,159 @@
+"""
+Principal Cache
+Short-lived cache of the (user_id, username, role, is_active) tuple that
+authorization checks need, keyed by user id and by token jti, so guarded
+endpoints do not query the users table on every request
+"""
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from database import db
+from database.models import User
+
+
+class Principal(NamedTuple):
+    """Authorization view of a user (never includes the password hash)"""
+    user_id: int
+    username: str
+    role: str
+    is_active: bool
+
+
+class PrincipalCache:
+    """TTL cache of principals, invalidated when a user's role or status changes"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        """
+        Initialize cache
+
+        Invalidation only reaches this process; with several workers a
+        change made elsewhere is picked up within ttl seconds.
+
+        Args:
+            ttl: Seconds a principal is reused (0 disables caching)
+            max_entries: Users (and separately tokens) kept at most,
+                         oldest dropped first
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._users = {}   # user_id -> (expires_at, Principal)
+        self._tokens = {}  # jti -> (expires_at, user_id)
+        self._version = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _load(user_id) -> Optional[Principal]:
+        row = db.session.execute(
+            db.select(User.user_id, User.username, User.role, User.is_active)
+            .where(User.user_id == user_id)
+        ).first()
+        return Principal(*row) if row else None
+
+    def get(self, user_id) -> Optional[Principal]:
+        """
+        Principal for a user id (requires app context)
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Principal: Cached or freshly loaded principal, None if the user does not exist
+        """
+        now = time.monotonic()
+        entry = self._users.get(user_id)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        version = self._version
+        principal = self._load(user_id)
+        if principal is not None and self.ttl > 0:
+            with self._lock:
+                # Skip storing if an invalidation ran while loading
+                if version == self._version:
+                    if len(self._users) >= self.max_entries:
+                        del self._users[next(iter(self._users))]
+                    self._users[user_id] = (now + self.ttl, principal)
+        return principal
+
+    def get_for_token(self, jti: Optional[str], user_id) -> Optional[Principal]:
+        """
+        Principal for a verified token, remembering which user its jti belongs to
+
+        Args:
+            jti: Token ID (None for tokens without one)
+            user_id: user_id claim of the token
+
+        Returns:
+            Principal: As get(); None if the jti is known to belong to another user
+        """
+        if jti and self.ttl > 0:
+            now = time.monotonic()
+            entry = self._tokens.get(jti)
+            if entry is not None and entry[0] > now:
+                if entry[1] != user_id:
+                    return None
+            else:
+                with self._lock:
+                    if len(self._tokens) >= self.max_entries:
+                        del self._tokens[next(iter(self._tokens))]
+                    self._tokens[jti] = (now + self.ttl, user_id)
+        return self.get(user_id)
+
+    def invalidate(self, user_id):
+        """Drop a user's principal and the tokens mapped to it"""
+        with self._lock:
+            self._version += 1
+            self._users.pop(user_id, None)
+            for jti in [j for j, (_, uid) in self._tokens.items() if uid == user_id]:
+                del self._tokens[jti]
+
+    def invalidate_token(self, jti: Optional[str]):
+        """Forget a token (e.g. on logout)"""
+        if jti:
+            with self._lock:
+                self._tokens.pop(jti, None)
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self._version += 1
+            self._users.clear()
+            self._tokens.clear()
+
+    def get_stats(self) -> Dict:
+        """Get hit rate and size"""
+        lookups = self.hits + self.misses
+        return {
+            'users': len(self._users),
+            'tokens': len(self._tokens),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            'ttl': self.ttl
+        }
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
+
+
+def init_principal_cache(app):
+    """
+    Configure the principal cache
+
+    Args:
+        app: Flask application
+
+    Returns:
+        PrincipalCache: Configured cache
+    """
+    principal_cache.ttl = app.config.get('PRINCIPAL_CACHE_TTL', 60)
+    principal_cache.clear()
+    print(f"[OK] Principal Cache initialized (ttl={principal_cache.ttl}s)")
+    return principal_cache
+
@@ -0,0 +1,181 @@
+"""
+Database Query Monitor
+Times every SQL statement via SQLAlchemy cursor events, fingerprints
+statements and detects N+1 query patterns within a request
+"""
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.performance_monitor import performance_monitor
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_NAMED_PARAM = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint_sql(statement: str) -> str:
+    """
+    Normalize a SQL statement into a fingerprint
+
+    Literals and bound parameters become '?', IN lists collapse to a
+    single placeholder and whitespace is squashed, so the same query
+    issued with different values maps to one fingerprint.
+
+    Args:
+        statement: Raw SQL statement
+
+    Returns:
+        str: Normalized statement
+    """
+    fingerprint = _STRING_LITERAL.sub('?', statement)
+    fingerprint = _NAMED_PARAM.sub('?', fingerprint)
+    fingerprint = _NUMBER_LITERAL.sub('?', fingerprint)
+    fingerprint = _IN_LIST.sub('(?)', fingerprint)
+    fingerprint = _WHITESPACE.sub(' ', fingerprint)
+    return fingerprint.strip()
+
+
+class QueryMonitor:
+    """Records SQL timings into the performance monitor"""
+
+    def __init__(self, monitor=None, n_plus_one_threshold: int = 5,
+                 enabled: bool = True):
+        """
+        Initialize query monitor
+
+        Args:
+            monitor: PerformanceMonitor receiving query data
+            n_plus_one_threshold: Repeats of one fingerprint within a
+                request that count as an N+1 pattern
+            enabled: Whether queries are recorded
+        """
+        self.monitor = monitor or performance_monitor
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.enabled = enabled
+        self._installed = False
+
+    def init_app(self, app):
+        """Attach cursor event hooks and per-request bookkeeping"""
+        self.n_plus_one_threshold = app.config.get(
+            'QUERY_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold
+        )
+        self.enabled = app.config.get('QUERY_MONITOR_ENABLED', self.enabled)
+        self.install()
+        app.teardown_request(self._finish_request)
+        return self
+
+    def install(self):
+        """Listen for cursor execution on every engine"""
+        if self._installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._installed = True
+
+    def uninstall(self):
+        """Remove the cursor event hooks"""
+        if not self._installed:
+            return
+        event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._installed = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        """Stamp statement start time on its execution context"""
+        # Not on the connection: a failing statement never reaches
+        # after_cursor_execute, and pooled connections live for the process
+        if context is not None:
+            context._query_start_time = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        """Record statement duration, rows and fingerprint"""
+        started = getattr(context, '_query_start_time', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+
+        if not self.enabled:
+            return
+
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        fingerprint = fingerprint_sql(statement)
+
+        self.monitor.track_db_query(statement, duration, rows, fingerprint=fingerprint)
+
+        if has_request_context():
+            stats = g.get('_query_stats')
+            if stats is None:
+                stats = g._query_stats = {
+                    'count': 0,
+                    'duration': 0.0,
+                    'fingerprints': Counter()
+                }
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['fingerprints'][fingerprint] += 1
+
+    def get_request_stats(self) -> Optional[Dict]:
+        """
+        Get query statistics for the current request
+
+        Returns:
+            dict: query_count, query_time_ms and repeated fingerprints,
+                  or None outside a request / when no queries ran
+        """
+        if not has_request_context():
+            return None
+
+        stats = g.get('_query_stats')
+        if not stats:
+            return {'query_count': 0, 'query_time_ms': 0.0, 'repeated_queries': []}
+
+        return {
+            'query_count': stats['count'],
+            'query_time_ms': round(stats['duration'] * 1000, 2),
+            'repeated_queries': [
+                {'fingerprint': fp, 'count': count}
+                for fp, count in stats['fingerprints'].most_common()
+                if count >= self.n_plus_one_threshold
+            ]
+        }
+
+    def _finish_request(self, exc=None):
+        """Report N+1 patterns seen during the request"""
+        stats = g.get('_query_stats')
+        if not stats:
+            return
+
+        endpoint = request.endpoint or request.path
+        for fingerprint, count in stats['fingerprints'].items():
+            if count >= self.n_plus_one_threshold:
+                self.monitor.track_n_plus_one(endpoint, fingerprint, count)
+
+
+# Global query monitor instance
+query_monitor = QueryMonitor()
+
+
+def init_query_monitor(app):
+    """
+    Initialize query monitoring for the Flask app
+
+    Args:
+        app: Flask application
+
+    Returns:
+        QueryMonitor: Installed monitor
+    """
+    query_monitor.init_app(app)
+    print("[OK] Query Monitor initialized")
+    return query_monitor
@@ -0,0 +1,221 @@
+"""
+Request Middleware
+Single WSGI-level pass for request timing, rate limiting, structured
+request logging and performance metrics
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from flask import request, session
+from werkzeug.http import parse_cookie
+from werkzeug.wsgi import ClosingIterator
+
+from backend.logging_system import StructuredLogger
+
+
+# Key under which the Flask app leaves per-request details for the middleware
+ENVIRON_KEY = 'edubot.request_info'
+
+
+class RequestMiddleware:
+    """Times each request once and feeds the rate limiter, logger and monitor"""
+
+    def __init__(self, wsgi_app, logger=None, monitor=None, rate_limiter=None,
+                 query_monitor=None, skip_paths=('/health',),
+                 skip_prefixes=('/static/',), rate_limit_prefix: str = '/api/',
+                 session_cookie: str = 'session', max_sessions: int = 10000):
+        """
+        Initialize middleware
+
+        Args:
+            wsgi_app: Wrapped WSGI application
+            logger: Logger receiving one structured line per request
+            monitor: PerformanceMonitor receiving request timings
+            rate_limiter: RateLimiter checked for rate-limited paths
+            query_monitor: QueryMonitor providing per-request SQL counts
+            skip_paths: Exact paths passed through untouched
+            skip_prefixes: Path prefixes passed through untouched
+            rate_limit_prefix: Paths under this prefix are rate limited
+            session_cookie: Session cookie name, used to key users
+            max_sessions: Session -> user mappings remembered
+        """
+        self.wsgi_app = wsgi_app
+        self.logger = logger
+        self.monitor = monitor
+        self.rate_limiter = rate_limiter
+        self.query_monitor = query_monitor
+        self.skip_paths = frozenset(skip_paths)
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.rate_limit_prefix = rate_limit_prefix
+        self.session_cookie = session_cookie
+        self.max_sessions = max_sessions
+        # Session cookie -> user_id learned from earlier responses, so user
+        # limits apply without opening the session before dispatch; updated
+        # from every request thread, so writes hold the lock
+        self._session_users = OrderedDict()
+        self._session_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Record endpoint, user and query stats where the middleware can see them"""
+        app.after_request(self._annotate_response)
+        return self
+
+    def _annotate_response(self, response):
+        """Copy request details into the WSGI environ"""
+        info = {
+            'endpoint': request.endpoint,
+            'user_id': getattr(request, 'user_id', None) or session.get('user_id')
+        }
+        if self.query_monitor is not None:
+            stats = self.query_monitor.get_request_stats()
+            if stats:
+                info['query_count'] = stats['query_count']
+                info['query_time_ms'] = stats['query_time_ms']
+        request.environ[ENVIRON_KEY] = info
+        return response
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path in self.skip_paths or path.startswith(self.skip_prefixes):
+            return self.wsgi_app(environ, start_response)
+
+        start = time.perf_counter_ns()
+        status = [500]
+
+        def _start_response(status_line, headers, exc_info=None):
+            status[0] = int(status_line[:3])
+            return start_response(status_line, headers, exc_info)
+
+        sid = self._session_id(environ)
+
+        if self.rate_limiter is not None and path.startswith(self.rate_limit_prefix):
+            rejected = self._check_rate_limit(environ, sid, _start_response)
+            if rejected is not None:
+                self._finish(environ, sid, start, status[0])
+                return rejected
+
+        try:
+            app_iter = self.wsgi_app(environ, _start_response)
+        except Exception:
+            self._finish(environ, sid, start, 500)
+            raise
+
+        return ClosingIterator(
+            app_iter, lambda: self._finish(environ, sid, start, status[0])
+        )
+
+    def _session_id(self, environ) -> Optional[str]:
+        """Get the raw session cookie value, if any"""
+        cookie_header = environ.get('HTTP_COOKIE')
+        if not cookie_header:
+            return None
+        return parse_cookie(cookie_header).get(self.session_cookie)
+
+    def _check_rate_limit(self, environ, sid, start_response):
+        """Return a 429 response body when the client is over its limit"""
+        user_id = self._session_users.get(sid) if sid else None
+        if user_id:
+            identifier, limit_type = f"user_{user_id}", 'user'
+        else:
+            identifier, limit_type = environ.get('REMOTE_ADDR'), 'ip'
+
+        try:
+            result = self.rate_limiter.check_rate_limit(identifier, limit_type)
+        except Exception as e:
+            print(f"[ERROR] Rate limit check failed: {e}")
+            return None  # If rate limiter fails, allow request
+
+        if result['allowed']:
+            return None
+
+        retry_after = result.get('retry_after') or 60
+        body = json.dumps({
+            'error': 'Rate limit exceeded',
+            'reason': result['reason'],
+            'retry_after': result.get('retry_after'),
+            'limit': result.get('limit'),
+            'period': result.get('period')
+        }).encode('utf-8')
+        start_response('429 TOO MANY REQUESTS', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', str(retry_after))
+        ])
+        return [body]
+
+    def _finish(self, environ, sid, start, status_code: int):
+        """Feed one measurement to the monitor and the logger"""
+        duration_ns = time.perf_counter_ns() - start
+        info = environ.get(ENVIRON_KEY) or {}
+        user_id = info.get('user_id')
+
+        if sid:
+            with self._session_lock:
+                if user_id:
+                    self._session_users[sid] = user_id
+                    self._session_users.move_to_end(sid)
+                    while len(self._session_users) > self.max_sessions:
+                        self._session_users.popitem(last=False)
+                elif ENVIRON_KEY in environ:
+                    self._session_users.pop(sid, None)
+
+        path = environ.get('PATH_INFO', '')
+        method = environ.get('REQUEST_METHOD', 'GET')
+
+        try:
+            if self.monitor is not None:
+                self.monitor.track_request(
+                    endpoint=info.get('endpoint') or path,
+                    method=method,
+                    duration=duration_ns / 1e9,
+                    status_code=status_code,
+                    user_id=user_id
+                )
+
+            if self.logger is not None:
+                StructuredLogger.log_http_request(
+                    self.logger,
+                    method,
+                    path,
+                    status_code,
+                    duration_ns / 1e6,
+                    user_id=user_id,
+                    ip_address=environ.get('REMOTE_ADDR'),
+                    user_agent=environ.get('HTTP_USER_AGENT'),
+                    query_count=info.get('query_count'),
+                    query_time_ms=info.get('query_time_ms')
+                )
+        except Exception as e:
+            print(f"[ERROR] Request tracking failed: {e}")
+
+
+def init_request_middleware(app, logger=None, monitor=None, rate_limiter=None,
+                            query_monitor=None):
+    """
+    Wrap the Flask app's WSGI callable with the request middleware
+
+    Args:
+        app: Flask application
+        logger: Request logger
+        monitor: PerformanceMonitor instance
+        rate_limiter: RateLimiter instance
+        query_monitor: QueryMonitor instance
+
+    Returns:
+        RequestMiddleware: Installed middleware
+    """
+    middleware = RequestMiddleware(
+        app.wsgi_app,
+        logger=logger,
+        monitor=monitor,
+        rate_limiter=rate_limiter,
+        query_monitor=query_monitor,
+        session_cookie=app.config.get('SESSION_COOKIE_NAME', 'session')
+    )
+    middleware.init_app(app)
+    app.wsgi_app = middleware
+    print("[OK] Request middleware initialized")
+    return middleware
@@ -0,0 +1,322 @@
+"""
+Sentiment Analyzer
+TextBlob-compatible polarity scoring from a lexicon compiled once into a
+dict, with an LRU cache for repeated messages. Follows the tokenizer and
+scoring rules of TextBlob's PatternAnalyzer without importing TextBlob or NLTK
+"""
+import importlib.util
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+Sentiment = namedtuple('Sentiment', ['polarity', 'subjectivity'])
+
+NEGATIONS = frozenset(('no', 'not', "n't", 'never'))
+
+# Tokenizer tables from pattern/TextBlob, so tokens match theirs
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+_SPLIT_PUNCTUATION = tuple(PUNCTUATION.replace('.', ''))
+ABBREVIATIONS = frozenset((
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.",
+    "ed.", "e.g.", "esp.", "etc.", "ex.", "f.", "fig.", "gen.", "id.", "i.e.",
+    "int.", "l.", "m.", "Med.", "Mil.", "Mr.", "n.", "n.q.", "orig.", "pl.",
+    "pred.", "pres.", "p.m.", "ref.", "v.", "vs.", "w/"
+))
+CONTRACTIONS = {
+    "'d": " 'd", "'m": " 'm", "'s": " 's", "'ll": " 'll",
+    "'re": " 're", "'ve": " 've", "n't": " n't"
+}
+EMOTICONS = (
+    (+1.00, ("<3", "♥")),
+    (+1.00, (">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D")),
+    (+0.75, (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)")),
+    (+0.50, (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)")),
+    (+0.25, (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)")),
+    (+0.05, (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°")),
+    (-0.25, (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>")),
+    (-0.75, (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/")),
+    (-1.00, (":'(", ":'''(", ";'(")),
+)
+
+_EMOTICON_POLARITY = {}
+for _polarity, _faces in EMOTICONS:
+    for _face in _faces:
+        _EMOTICON_POLARITY.setdefault(_face.lower(), _polarity)
+
+_RE_ABBR1 = re.compile(r"^[A-Za-z]\.$")
+_RE_ABBR2 = re.compile(r"^([A-Za-z]\.)+$")
+_RE_ABBR3 = re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")
+_RE_CONTRACTIONS = [(re.compile(a), b) for a, b in CONTRACTIONS.items()]
+_RE_QUOTES = re.compile("([“”‘’'\"])")
+_RE_LINEBREAKS = re.compile(r"\n{2,}")
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_SARCASM = re.compile(r"\( ?\! ?\)")
+_RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(c) for c in face) for _, faces in EMOTICONS for face in faces
+))
+
+
+def _average(values) -> float:
+    values = list(values)
+    return sum(values) / float(len(values) or 1)
+
+
+def find_lexicon_path() -> Optional[str]:
+    """Locate TextBlob's en-sentiment.xml without importing TextBlob"""
+    spec = importlib.util.find_spec('textblob')
+    if spec is None or not spec.origin:
+        return None
+    path = os.path.join(os.path.dirname(spec.origin), 'en', 'en-sentiment.xml')
+    return path if os.path.exists(path) else None
+
+
+def compile_lexicon(path: str) -> Dict[str, Tuple[float, float, float, bool]]:
+    """
+    Read a pattern sentiment XML file into a flat lookup table
+
+    Scores are averaged per part of speech and then across parts of
+    speech, and "-ly" adverbs are derived from adjectives, as TextBlob does.
+
+    Args:
+        path: Path to en-sentiment.xml
+
+    Returns:
+        dict: word -> (polarity, subjectivity, intensity, is_modifier)
+    """
+    senses = {}
+    for node in ElementTree.parse(path).getroot().iter('word'):
+        form = node.get('form')
+        if form:
+            senses.setdefault(form, {}).setdefault(node.get('pos'), []).append((
+                float(node.get('polarity', 0.0)),
+                float(node.get('subjectivity', 0.0)),
+                float(node.get('intensity', 1.0))
+            ))
+
+    words = {}
+    for form, by_pos in senses.items():
+        averaged = {pos: [_average(v) for v in zip(*psi)] for pos, psi in by_pos.items()}
+        averaged[None] = [_average(v) for v in zip(*averaged.values())]
+        words[form] = averaged
+
+    # Map "terrible" to the adverb "terribly"
+    for form, by_pos in list(words.items()):
+        if 'JJ' in by_pos:
+            if form.endswith('y'):
+                form = form[:-1] + 'i'
+            if form.endswith('le'):
+                form = form[:-2]
+            scores = by_pos['JJ']
+            adverb = words.setdefault(form + 'ly', {})
+            adverb['RB'] = adverb[None] = scores
+
+    return {
+        form: (by_pos[None][0], by_pos[None][1], by_pos[None][2], 'RB' in by_pos)
+        for form, by_pos in words.items()
+    }
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase tokens the way TextBlob's sentiment does
+
+    Args:
+        text: Raw text
+
+    Returns:
+        list: Tokens with punctuation split off and emoticons kept whole
+    """
+    for pattern, replacement in _RE_CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    text = _RE_QUOTES.sub(r' \1 ', text)
+    text = _RE_LINEBREAKS.sub(' ', text.replace('\r\n', '\n'))
+    text = _RE_WHITESPACE.sub(' ', text)
+
+    tokens = []
+    for token in text.split(' '):
+        if not token:
+            continue
+        tail = []
+        while token.startswith(_SPLIT_PUNCTUATION) and token not in CONTRACTIONS:
+            tokens.append(token[0])
+            token = token[1:]
+        while token.endswith(_SPLIT_PUNCTUATION + ('.',)) and token not in CONTRACTIONS:
+            if token.endswith(_SPLIT_PUNCTUATION):
+                tail.append(token[-1])
+                token = token[:-1]
+            if token.endswith('...'):
+                tail.append('...')
+                token = token[:-3].rstrip('.')
+            if token.endswith('.'):
+                if token in ABBREVIATIONS or _RE_ABBR1.match(token) or \
+                        _RE_ABBR2.match(token) or _RE_ABBR3.match(token):
+                    break
+                tail.append(token[-1])
+                token = token[:-1]
+        if token:
+            tokens.append(token)
+        tokens.extend(reversed(tail))
+
+    joined = _RE_SARCASM.sub('(!)', ' '.join(tokens))
+    joined = _RE_EMOTICONS.sub(lambda m: m.group(1).replace(' ', '') + m.group(2), joined)
+    return joined.lower().split()
+
+
+class SentimentAnalyzer:
+    """Lexicon sentiment scoring with memoized results"""
+
+    def __init__(self, lexicon_path: Optional[str] = None, cache_size: int = 4096,
+                 threshold: float = 0.1):
+        """
+        Initialize analyzer (the lexicon loads on first use)
+
+        Args:
+            lexicon_path: pattern sentiment XML (defaults to TextBlob's copy)
+            cache_size: Messages whose scores are memoized
+            threshold: |polarity| above which a message is positive/negative
+        """
+        self.lexicon_path = lexicon_path
+        self.threshold = threshold
+        self.lexicon = None
+        self._load_lock = threading.Lock()
+        self._score = lru_cache(maxsize=cache_size)(self._compute)
+
+    def load(self) -> int:
+        """
+        Compile the lexicon if it is not loaded yet
+
+        Returns:
+            int: Number of lexicon entries
+        """
+        if self.lexicon is not None:
+            return len(self.lexicon)
+
+        with self._load_lock:
+            if self.lexicon is None:
+                path = self.lexicon_path or find_lexicon_path()
+                if path:
+                    self.lexicon = compile_lexicon(path)
+                else:
+                    print("[WARNING] Sentiment lexicon not found, all text scores neutral")
+                    self.lexicon = {}
+        return len(self.lexicon)
+
+    def _compute(self, text: str) -> Sentiment:
+        """Score text (uncached)"""
+        lexicon = self.lexicon
+        assessments = []  # [polarity, subjectivity, intensity, negated]
+        modifier = None   # preceding adverb, e.g. "really" good
+        negation = None   # preceding negation, e.g. "not" good
+
+        for word in tokenize(text):
+            entry = lexicon.get(word)
+            if entry is not None:
+                polarity, subjectivity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], 1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], 1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    last = assessments[-1]
+                    last[2] = 1.0 / last[2]
+                    last[3] = True
+                modifier = word if is_modifier else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None  # negation carries over small words only
+            if negation is not None and modifier is not None and modifier.endswith('ly'):
+                assessments[-1][3] = True  # "really not good"
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == '!' and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+            if word == '(!)':
+                assessments.append([0.0, 1.0, 1.0, False])
+            if not word.isalpha() and len(word) <= 5 and word not in PUNCTUATION:
+                face = _EMOTICON_POLARITY.get(word)
+                if face is not None:
+                    assessments.append([face, 1.0, 1.0, False])
+
+        if not assessments:
+            return Sentiment(0.0, 0.0)
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity = _average(p * -0.5 if negated else p for p, _, _, negated in assessments)
+        subjectivity = _average(s for _, s, _, _ in assessments)
+        return Sentiment(polarity, subjectivity)
+
+    def sentiment(self, text: str) -> Sentiment:
+        """
+        Polarity (-1..1) and subjectivity (0..1), like TextBlob(text).sentiment
+
+        Args:
+            text: Text to score
+
+        Returns:
+            Sentiment: (polarity, subjectivity) named tuple
+        """
+        if self.lexicon is None:
+            self.load()
+        return self._score(text or '')
+
+    def analyze(self, text: str) -> Tuple[str, float]:
+        """
+        Classify text
+
+        Args:
+            text: Text to classify
+
+        Returns:
+            tuple: ('positive' | 'negative' | 'neutral', polarity)
+        """
+        polarity = self.sentiment(text).polarity
+        if polarity > self.threshold:
+            return 'positive', polarity
+        elif polarity < -self.threshold:
+            return 'negative', polarity
+        return 'neutral', polarity
+
+    def get_stats(self) -> Dict:
+        """Get lexicon size and cache counters"""
+        info = self._score.cache_info()
+        return {
+            'lexicon_size': len(self.lexicon) if self.lexicon is not None else 0,
+            'cache_hits': info.hits,
+            'cache_misses': info.misses,
+            'cache_size': info.currsize,
+            'cache_capacity': info.maxsize
+        }
+
+
+# Global analyzer instance
+sentiment_analyzer = SentimentAnalyzer()
+
+
+def init_sentiment_analyzer(app):
+    """
+    Load the sentiment lexicon at startup instead of on the first message
+
+    Args:
+        app: Flask application
+
+    Returns:
+        SentimentAnalyzer: Loaded analyzer
+    """
+    path = app.config.get('SENTIMENT_LEXICON_PATH')
+    if path:
+        sentiment_analyzer.lexicon_path = path
+    count = sentiment_analyzer.load()
+    print(f"[OK] Sentiment Analyzer initialized ({count} lexicon entries)")
+    return sentiment_analyzer
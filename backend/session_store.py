@@ -0,0 +1,414 @@
+"""
+Server-Side Session Store
+Session interface backed by a pluggable store (sharded files, SQL table
+or Redis) that only writes sessions whose contents changed
+"""
+import os
+import re
+import secrets
+import struct
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
+
+from database import db
+
+
+# Expiry header shared with cachelib's FileSystemCache files (uint32 epoch)
+_EXPIRY = struct.Struct('I')
+
+# Session ids are secrets.token_urlsafe(32); anything else in the cookie is
+# rejected before it can reach a store (file paths, Redis keys)
+_SID = re.compile(r'^[A-Za-z0-9_-]{43}$')
+_SID_CHARS = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def is_valid_sid(sid: Optional[str]) -> bool:
+    """Whether a cookie value has the shape of a generated session id"""
+    return bool(sid) and _SID.match(sid) is not None
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and the payload it was loaded with"""
+
+    def __init__(self, initial=None, sid: Optional[str] = None,
+                 raw: Optional[bytes] = None, expires_at: int = 0):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.raw = raw
+        self.expires_at = expires_at
+        self.modified = False
+
+
+# ==================== Stores ====================
+
+class SessionStore:
+    """Key/value storage for serialized sessions"""
+
+    def get(self, sid: str) -> Optional[Tuple[bytes, int]]:
+        """
+        Read a session
+
+        Args:
+            sid: Session id
+
+        Returns:
+            tuple: (payload, expiry epoch) or None if missing/expired
+        """
+        raise NotImplementedError
+
+    def set(self, sid: str, payload: bytes, expires_at: int):
+        """Write a session that expires at the given epoch"""
+        raise NotImplementedError
+
+    def delete(self, sid: str):
+        """Remove a session"""
+        raise NotImplementedError
+
+    def prune(self, limit: int = 10000) -> Dict[str, int]:
+        """
+        Remove up to `limit` expired sessions
+
+        Returns:
+            dict: session_files_deleted / bytes_reclaimed
+        """
+        return {'session_files_deleted': 0, 'bytes_reclaimed': 0}
+
+
+class ShardedFileSessionStore(SessionStore):
+    """One file per session under two levels of hashed subdirectories"""
+
+    def __init__(self, directory: str, mode: int = 0o600):
+        """
+        Initialize store
+
+        Args:
+            directory: Root session directory
+            mode: Permissions for session files
+        """
+        self.directory = directory
+        self.mode = mode
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid: str) -> str:
+        if not _SID_CHARS.match(sid):
+            # Never let an id carry path separators or dots into the join
+            raise ValueError('Invalid session id')
+        # Session ids are random, so their leading characters spread evenly
+        return os.path.join(self.directory, sid[:2], sid[2:4], sid)
+
+    def get(self, sid):
+        try:
+            with open(self._path(sid), 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        if len(data) < _EXPIRY.size:
+            return None
+        expires_at = _EXPIRY.unpack_from(data)[0]
+        if expires_at and expires_at < time.time():
+            return None
+        return data[_EXPIRY.size:], expires_at
+
+    def set(self, sid, payload, expires_at):
+        path = self._path(sid)
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+
+        # Write to a temp file and rename so readers never see partial data
+        fd, tmp = tempfile.mkstemp(dir=shard, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_EXPIRY.pack(expires_at))
+                f.write(payload)
+            os.chmod(tmp, self.mode)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+    def prune(self, limit=10000):
+        now = time.time()
+        deleted = reclaimed = 0
+        # Root-level files are left over from the old flat Flask-Session layout,
+        # which uses the same expiry header
+        stack = [self.directory]
+
+        while stack and deleted < limit:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if deleted >= limit:
+                        break
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        # Skip cachelib's count file and in-flight temp files
+                        if entry.name.startswith('__wz_cache') or \
+                                entry.name.endswith(('.__wz_cache', '.tmp')):
+                            continue
+                        with open(entry.path, 'rb') as f:
+                            expires_at = _EXPIRY.unpack(f.read(_EXPIRY.size))[0]
+                        if expires_at and expires_at < now:
+                            size = entry.stat().st_size
+                            os.remove(entry.path)
+                            deleted += 1
+                            reclaimed += size
+                    except (OSError, struct.error):
+                        continue
+
+        return {'session_files_deleted': deleted, 'bytes_reclaimed': reclaimed}
+
+
+class ServerSession(db.Model):
+    """Serialized session stored in the database"""
+    __tablename__ = 'server_sessions'
+
+    session_id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
+
+
+class SQLSessionStore(SessionStore):
+    """Sessions in the server_sessions table (requires an app context)"""
+
+    def __init__(self):
+        # Own connections, so session saves never commit the request's ORM work
+        self.table = ServerSession.__table__
+
+    def get(self, sid):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                db.select(self.table.c.data, self.table.c.expires_at)
+                .where(self.table.c.session_id == sid)
+            ).first()
+        if row is None or row.expires_at < time.time():
+            return None
+        return row.data, row.expires_at
+
+    def set(self, sid, payload, expires_at):
+        update = db.update(self.table).where(self.table.c.session_id == sid) \
+            .values(data=payload, expires_at=expires_at)
+        try:
+            with db.engine.begin() as conn:
+                if conn.execute(update).rowcount == 0:
+                    conn.execute(db.insert(self.table).values(
+                        session_id=sid, data=payload, expires_at=expires_at
+                    ))
+        except IntegrityError:
+            # Inserted concurrently by another request for the same session
+            with db.engine.begin() as conn:
+                conn.execute(update)
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(db.delete(self.table).where(self.table.c.session_id == sid))
+
+    def prune(self, limit=10000):
+        now = int(time.time())
+        with db.engine.begin() as conn:
+            expired = conn.execute(
+                db.select(self.table.c.session_id)
+                .where(self.table.c.expires_at < now).limit(limit)
+            ).scalars().all()
+            deleted = conn.execute(
+                db.delete(self.table).where(self.table.c.session_id.in_(expired))
+            ).rowcount if expired else 0
+        return {'session_files_deleted': deleted, 'bytes_reclaimed': 0}
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions as Redis strings with native expiry"""
+
+    def __init__(self, client, prefix: str = 'session:'):
+        """
+        Initialize store
+
+        Args:
+            client: redis.Redis (or compatible) client
+            prefix: Key prefix for session entries
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, sid):
+        payload = self.client.get(self.prefix + sid)
+        if payload is None:
+            return None
+        # Redis enforces the expiry; its remaining TTL gives the epoch the
+        # interface needs to decide when to extend it
+        ttl = self.client.ttl(self.prefix + sid)
+        return payload, int(time.time()) + ttl if ttl and ttl > 0 else 0
+
+    def set(self, sid, payload, expires_at):
+        ttl = max(int(expires_at - time.time()), 1)
+        self.client.setex(self.prefix + sid, ttl, payload)
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+# ==================== Session Interface ====================
+
+class StoreSessionInterface(SessionInterface):
+    """Flask session interface that loads and saves through a SessionStore"""
+
+    serializer = session_json_serializer
+
+    def __init__(self, store: SessionStore, permanent: bool = True):
+        """
+        Initialize interface
+
+        Args:
+            store: Backing session store
+            permanent: Default for session.permanent on new sessions
+        """
+        self.store = store
+        self.permanent = permanent
+        self.stats = {'reads': 0, 'writes': 0, 'skipped_writes': 0, 'deletes': 0}
+
+    def _new_sid(self) -> str:
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if is_valid_sid(sid):
+            self.stats['reads'] += 1
+            try:
+                stored = self.store.get(sid)
+            except Exception as e:
+                print(f"[ERROR] Session read failed: {e}")
+                stored = None
+
+            if stored is not None:
+                raw, expires_at = stored
+                try:
+                    data = self.serializer.loads(raw.decode('utf-8'))
+                    return ServerSideSession(data, sid=sid, raw=raw, expires_at=expires_at)
+                except ValueError:
+                    pass
+
+        session = ServerSideSession(sid=self._new_sid())
+        if self.permanent:
+            session.permanent = True
+            session.modified = False
+        return session
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session.keys() - {'_permanent'}:
+            # Nothing worth storing; never create files for anonymous visits
+            if session.raw is not None:
+                self.stats['deletes'] += 1
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        expires_at = int(now + lifetime)
+        payload = None
+
+        if session.modified or session.raw is None:
+            payload = self.serializer.dumps(dict(session)).encode('utf-8')
+            if payload == session.raw:
+                # e.g. session.permanent = True or re-assigning an equal value
+                payload = None
+                self.stats['skipped_writes'] += 1
+
+        if payload is None and session.expires_at and \
+                session.expires_at - now < lifetime / 2:
+            # Extend the stored expiry at most once per half lifetime
+            payload = session.raw
+
+        if payload is not None:
+            try:
+                self.store.set(session.sid, payload, expires_at)
+                self.stats['writes'] += 1
+            except Exception as e:
+                print(f"[ERROR] Session write failed: {e}")
+                return
+
+        if payload is not None or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+    def get_stats(self) -> Dict:
+        """Get read/write counters"""
+        return dict(self.stats, backend=type(self.store).__name__)
+
+
+def create_session_store(app) -> SessionStore:
+    """
+    Build the store selected by SESSION_TYPE
+
+    Args:
+        app: Flask application
+
+    Returns:
+        SessionStore: filesystem, sqlalchemy or redis store
+    """
+    session_type = app.config.get('SESSION_TYPE', 'filesystem')
+
+    if session_type == 'redis':
+        import redis
+        client = app.config.get('SESSION_REDIS') or \
+            redis.Redis.from_url(app.config.get('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+        return RedisSessionStore(client, prefix=app.config.get('SESSION_KEY_PREFIX', 'session:'))
+
+    if session_type == 'sqlalchemy':
+        with app.app_context():
+            ServerSession.__table__.create(db.engine, checkfirst=True)
+        return SQLSessionStore()
+
+    if session_type != 'filesystem':
+        print(f"[WARNING] Unknown SESSION_TYPE '{session_type}', using filesystem")
+    return ShardedFileSessionStore(
+        app.config.get('SESSION_FILE_DIR') or os.path.join(os.getcwd(), 'flask_session')
+    )
+
+
+def init_session_store(app):
+    """
+    Install the server-side session interface
+
+    Args:
+        app: Flask application
+
+    Returns:
+        StoreSessionInterface: Installed session interface
+    """
+    interface = StoreSessionInterface(
+        create_session_store(app),
+        permanent=app.config.get('SESSION_PERMANENT', True)
+    )
+    app.session_interface = interface
+    print(f"[OK] Session store initialized ({type(interface.store).__name__})")
+    return interface
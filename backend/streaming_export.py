@@ -0,0 +1,244 @@
+"""
+Streaming Export
+Exports rows straight from a server-side cursor to a chunked HTTP
+response as CSV, NDJSON or a JSON array, optionally gzipped on the fly,
+so memory stays flat however many rows are exported
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from flask import Response, stream_with_context
+
+from database import db
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json')
+}
+
+
+def iter_rows(statement, batch_size: int = 1000,
+              transform: Optional[Callable[[Dict], Dict]] = None) -> Iterator[Dict]:
+    """
+    Stream a select as dicts (requires app context)
+
+    yield_per fetches batch_size rows at a time through a server-side
+    cursor where the driver has one. Rows are read on the session's
+    connection as plain tuples, so nothing enters the identity map. The
+    connection is chosen when this is called, so rows streamed after a
+    read_only() block has exited still come from the replica.
+
+    Args:
+        statement: SQLAlchemy select of labeled columns
+        batch_size: Rows fetched per round trip
+        transform: Optional row dict -> output dict
+
+    Returns:
+        generator: One dict per row
+    """
+    connection = db.session.connection()
+    return _iter_result(connection, statement.execution_options(yield_per=batch_size), transform)
+
+
+def _iter_result(connection, statement, transform):
+    result = connection.execute(statement)
+    try:
+        keys = list(result.keys())
+        for row in result:
+            yield transform(dict(zip(keys, row))) if transform else dict(zip(keys, row))
+    finally:
+        result.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+# Written by csv.writer as is (None becomes an empty field)
+_CSV_NATIVE = frozenset((str, int, float, bool, type(None)))
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(v) for v in value)
+    return value
+
+
+class _LineBuffer:
+    """Write target for csv.writer that hands back what was written"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self) -> str:
+        text = ''.join(self.parts)
+        self.parts.clear()
+        return text
+
+
+def _batched(lines: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """Join small strings into chunks of about chunk_size characters"""
+    parts, size = [], 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def csv_chunks(rows: Iterable[Dict], fieldnames: List[str],
+               chunk_size: int = 65536) -> Iterator[str]:
+    """
+    Encode rows as CSV text chunks
+
+    Args:
+        rows: Row dicts (missing fields are empty, lists are comma-joined)
+        fieldnames: Column order, written as the header
+        chunk_size: Approximate characters per chunk
+
+    Yields:
+        str: CSV text
+    """
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    size = 0
+    for row in rows:
+        writer.writerow([
+            value if type(value) in _CSV_NATIVE else _csv_value(value)
+            for value in map(row.get, fieldnames)
+        ])
+        size += len(buffer.parts[-1])
+        if size >= chunk_size:
+            yield buffer.take()
+            size = 0
+    yield buffer.take()
+
+
+def ndjson_chunks(rows: Iterable[Dict], chunk_size: int = 65536) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON text chunks"""
+    return _batched(
+        (json.dumps(row, default=_json_default) + '\n' for row in rows),
+        chunk_size
+    )
+
+
+def json_chunks(rows: Iterable[Dict], chunk_size: int = 65536) -> Iterator[str]:
+    """Encode rows as one JSON array, written incrementally"""
+    def lines():
+        yield '['
+        for i, row in enumerate(rows):
+            yield (',\n' if i else '\n') + json.dumps(row, default=_json_default)
+        yield '\n]\n'
+
+    return _batched(lines(), chunk_size)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip a byte stream incrementally
+
+    Args:
+        chunks: Uncompressed bytes
+        level: zlib compression level (1 fastest - 9 smallest)
+
+    Yields:
+        bytes: Gzip member data
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_rows(rows: Iterable[Dict], fieldnames: List[str], format_type: str = 'csv',
+                compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode rows for download
+
+    Args:
+        rows: Row dicts
+        fieldnames: CSV columns (other formats write each row dict as is)
+        format_type: csv, ndjson or json
+        compress: Gzip the output
+
+    Yields:
+        bytes: Encoded output
+    """
+    if format_type == 'csv':
+        text = csv_chunks(rows, fieldnames)
+    elif format_type == 'ndjson':
+        text = ndjson_chunks(rows)
+    elif format_type == 'json':
+        text = json_chunks(rows)
+    else:
+        raise ValueError(f"Unknown export format '{format_type}'")
+
+    data = (chunk.encode('utf-8') for chunk in text)
+    return gzip_chunks(data) if compress else data
+
+
+def export_response(rows: Iterable[Dict], fieldnames: List[str], format_type: str = 'csv',
+                    filename: str = 'export', compress: bool = False) -> Response:
+    """
+    Chunked download response for streamed rows
+
+    The request context stays open while the body streams, so rows can be
+    read from the database lazily.
+
+    Args:
+        rows: Row dicts, usually from iter_rows()
+        fieldnames: CSV columns
+        format_type: csv, ndjson or json
+        filename: Download name without extension
+        compress: Gzip on the fly (adds .gz)
+
+    Returns:
+        Response: Streaming attachment
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{format_type}'")
+
+    mimetype, extension = EXPORT_FORMATS[format_type]
+    filename = f'{filename}.{extension}'
+    if compress:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    response = Response(
+        stream_with_context(encode_rows(rows, fieldnames, format_type, compress)),
+        mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks through
+    return response
+
+
+def export_args(request, default_format: str = 'csv'):
+    """
+    Read ?format= and ?gzip= from a request
+
+    Returns:
+        tuple: (format, compress), format None if unsupported
+    """
+    format_type = request.args.get('format', default_format).lower()
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    return (format_type if format_type in EXPORT_FORMATS else None), compress
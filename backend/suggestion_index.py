@@ -0,0 +1,310 @@
+"""
+Suggestion Index
+Compiled index over autocomplete candidates: prefix lookup by binary
+search over sorted keys, top-k by precomputed popularity through a
+range-maximum table, SymSpell-style typo correction of query words and
+per-word posting lists for matches in the middle of a suggestion
+"""
+import bisect
+import heapq
+import re
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(_PUNCTUATION.sub('', text.lower()).split())
+
+
+def _deletes(word: str) -> List[str]:
+    """All strings one deletion away from word"""
+    return [word[:i] + word[i + 1:] for i in range(len(word))]
+
+
+class SuggestionIndex:
+    """Immutable index of suggestion candidates, rebuilt when the corpus changes"""
+
+    def __init__(self, candidates: Iterable[Tuple[str, str, float]] = (),
+                 min_word_length: int = 3):
+        """
+        Build the index
+
+        Args:
+            candidates: (text, source, popularity) tuples; for texts that
+                        normalize to the same key the most popular wins
+            min_word_length: Shorter words are never typo-corrected
+        """
+        started = time.perf_counter()
+        self.min_word_length = min_word_length
+
+        best = {}
+        for text, source, popularity in candidates:
+            key = normalize(text)
+            if key and (key not in best or popularity > best[key][2]):
+                best[key] = (text, source, popularity)
+
+        self.keys = sorted(best)
+        self.texts = [best[key][0] for key in self.keys]
+        self.sources = [best[key][1] for key in self.keys]
+        self.popularity = [best[key][2] for key in self.keys]
+
+        # Unique integer rank per entry (popularity, then shorter text) so
+        # range maxima never tie
+        order = sorted(range(len(self.keys)),
+                       key=lambda i: (self.popularity[i], -len(self.keys[i])))
+        self.rank = array('i', bytes(4 * len(order)))
+        for position, i in enumerate(order):
+            self.rank[i] = position
+
+        self._build_range_table()
+        self._build_vocabulary()
+        self.build_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ==================== Build ====================
+
+    def _build_range_table(self):
+        """Sparse table: table[j][i] = best entry in keys[i:i + 2**j]"""
+        rank = self.rank
+        level = array('i', range(len(rank)))
+        self.table = [level]
+        width = 1
+        while width * 2 <= len(rank):
+            prev = level
+            level = array('i', (
+                a if rank[a] > rank[b] else b
+                for a, b in zip(prev, prev[width:])
+            ))
+            self.table.append(level)
+            width *= 2
+
+    def _build_vocabulary(self):
+        """Word postings plus a one-deletion map for typo correction"""
+        postings = {}
+        for i, key in enumerate(self.keys):
+            for word in set(key.split()):
+                postings.setdefault(word, []).append(i)
+
+        rank = self.rank
+        self.postings = {
+            word: array('i', sorted(ids, key=lambda i: -rank[i]))
+            for word, ids in postings.items()
+        }
+        counts = {word: len(ids) for word, ids in postings.items()}
+
+        self.word_counts = counts
+        self.vocabulary = sorted(counts)
+        self.word_deletes = {}
+        for word in counts:
+            if len(word) >= self.min_word_length:
+                for variant in _deletes(word):
+                    self.word_deletes.setdefault(variant, []).append(word)
+
+    # ==================== Lookup ====================
+
+    def _best(self, lo: int, hi: int) -> int:
+        """Index of the highest-ranked entry in keys[lo:hi]"""
+        level = (hi - lo).bit_length() - 1
+        row = self.table[level]
+        a, b = row[lo], row[hi - (1 << level)]
+        return a if self.rank[a] > self.rank[b] else b
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Slice of keys starting with prefix"""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def top_prefix(self, prefix: str, k: int) -> List[int]:
+        """
+        Most popular entries starting with prefix
+
+        Args:
+            prefix: Normalized prefix
+            k: Number of entries
+
+        Returns:
+            list: Entry indexes, most popular first
+        """
+        lo, hi = self.prefix_range(prefix)
+        if lo >= hi or k <= 0:
+            return []
+
+        # Best of a range, then split the range around it: O(k log k)
+        best = self._best(lo, hi)
+        heap = [(-self.rank[best], best, lo, hi)]
+        result = []
+        while heap and len(result) < k:
+            _, i, lo, hi = heapq.heappop(heap)
+            result.append(i)
+            for a, b in ((lo, i), (i + 1, hi)):
+                if a < b:
+                    j = self._best(a, b)
+                    heapq.heappush(heap, (-self.rank[j], j, a, b))
+        return result
+
+    def has_word_prefix(self, prefix: str) -> bool:
+        """Whether any indexed word starts with prefix"""
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        return i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix)
+
+    def correct_word(self, word: str) -> Optional[str]:
+        """
+        Most frequent indexed word within one edit of word
+
+        Returns:
+            str: Correction, the word itself if known, or None
+        """
+        if word in self.word_counts or len(word) < self.min_word_length:
+            return word if word in self.word_counts else None
+
+        candidates = set(self.word_deletes.get(word, ()))  # one insertion
+        for variant in _deletes(word):
+            if variant in self.word_counts:                  # one deletion
+                candidates.add(variant)
+            candidates.update(self.word_deletes.get(variant, ()))  # substitution
+
+        if not candidates:
+            return None
+        return max(candidates, key=lambda w: (self.word_counts[w], w))
+
+    def correct_query(self, query: str) -> Optional[str]:
+        """
+        Query with misspelled words replaced by indexed words
+
+        The last word is treated as a prefix still being typed and only
+        corrected when no indexed word starts with it.
+
+        Returns:
+            str: Corrected normalized query, or None if nothing changed
+        """
+        words = query.split()
+        if not words:
+            return None
+
+        corrected = []
+        for position, word in enumerate(words):
+            is_partial = position == len(words) - 1 and not query.endswith(' ')
+            if is_partial and self.has_word_prefix(word):
+                corrected.append(word)
+                continue
+            corrected.append(self.correct_word(word) or word)
+
+        result = ' '.join(corrected)
+        return result if result != ' '.join(words) else None
+
+    def top_containing(self, words: List[str], k: int, exclude=(),
+                       max_scan: int = 250) -> List[int]:
+        """
+        Most popular entries containing every word (the last as a prefix)
+
+        Args:
+            words: Normalized query words
+            k: Number of entries
+            exclude: Entry indexes to skip
+            max_scan: Posting entries examined at most
+
+        Returns:
+            list: Entry indexes, most popular first
+        """
+        *complete, last = words
+        if len(last) >= self.min_word_length and last not in self.postings:
+            # Expand a partial last word to its most common completion
+            i = bisect.bisect_left(self.vocabulary, last)
+            completions = []
+            for word in self.vocabulary[i:i + 50]:
+                if not word.startswith(last):
+                    break
+                completions.append(word)
+            if completions:
+                complete.append(max(completions, key=self.word_counts.get))
+                last = ''
+        elif last in self.postings:
+            complete.append(last)
+            last = ''
+
+        known = [w for w in complete if w in self.postings]
+        if not known or len(known) < len(complete):
+            return []
+
+        # Walk the shortest posting list; plain substring checks filter
+        # cheaply before the word-boundary check
+        anchor = min(known, key=lambda w: len(self.postings[w]))
+        others = [w for w in known if w != anchor]
+        if last:
+            others.append(last)
+        bounded = [f' {w} ' for w in known if w != anchor]
+        result = []
+        for i in self.postings[anchor][:max_scan]:
+            key = self.keys[i]
+            if i in exclude or not all(w in key for w in others):
+                continue
+            padded = f' {key} '
+            if all(w in padded for w in bounded) and (not last or f' {last}' in padded):
+                result.append(i)
+                if len(result) >= k:
+                    break
+        return result
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Prefix matches, then prefix matches of the typo-corrected query,
+        then entries containing the query words anywhere
+
+        Args:
+            query: Raw user input
+            k: Maximum results
+
+        Returns:
+            list: (entry index, score) pairs; exact prefix hits score 1.0
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        if query.endswith(' '):
+            key += ' '
+
+        results = [(i, 1.0) for i in self.top_prefix(key, k)]
+
+        if len(results) < k:
+            corrected = self.correct_query(key)
+            if corrected:
+                seen = {i for i, _ in results}
+                # Score by how much of the query survived correction
+                same = sum(a == b for a, b in zip(key, corrected))
+                score = round(same / max(len(key), len(corrected)), 3)
+                for i in self.top_prefix(corrected, k):
+                    if i not in seen and len(results) < k:
+                        results.append((i, score))
+            key = corrected or key
+
+        if len(results) < k:
+            seen = {i for i, _ in results}
+            for i in self.top_containing(key.split(), k - len(results), exclude=seen):
+                # Share of the suggestion covered by the query
+                results.append((i, round(min(len(key) / len(self.keys[i]), 0.9), 3)))
+
+        return results
+
+    def entry(self, i: int, score: float) -> Dict:
+        """Public suggestion dict for an entry"""
+        return {
+            'text': self.texts[i],
+            'score': score,
+            'source': self.sources[i]
+        }
+
+    def get_stats(self) -> Dict:
+        """Get index size and build time"""
+        return {
+            'entries': len(self.keys),
+            'vocabulary': len(self.vocabulary),
+            'build_ms': self.build_ms
+        }
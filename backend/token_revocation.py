@@ -0,0 +1,407 @@
+"""
+Token Revocation
+Revoked JWT ids kept until the token's own expiry in SQL or Redis, with an
+in-process Bloom filter in front so checking a token that was never
+revoked (nearly every request) does no I/O
+"""
+import hashlib
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+
+
+# Revocations are re-read this far back on each sync, covering clock skew
+# between workers and transactions that commit out of order
+SYNC_OVERLAP = 60
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        """
+        Initialize filter
+
+        Args:
+            capacity: Entries the filter is sized for
+            error_rate: False positive rate at capacity
+        """
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        """Add a key"""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+
+# ==================== Stores ====================
+
+class RevocationStore:
+    """Shared storage of revoked token ids"""
+
+    def add(self, jti: str, expires_at: int):
+        """Revoke a token id until the epoch its token expires"""
+        raise NotImplementedError
+
+    def contains(self, jti: str) -> bool:
+        """Whether a token id is revoked and not yet expired"""
+        raise NotImplementedError
+
+    def revoked_since(self, since: int) -> Iterable[str]:
+        """Unexpired token ids revoked at or after the epoch `since` (0 for all)"""
+        raise NotImplementedError
+
+    def prune(self, limit: int = 10000) -> Dict[str, int]:
+        """
+        Remove up to `limit` expired entries
+
+        Returns:
+            dict: revoked_tokens_deleted
+        """
+        return {'revoked_tokens_deleted': 0}
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Revocations in this process only (tests and single-worker setups)"""
+
+    def __init__(self):
+        self._entries = {}  # jti -> (expires_at, revoked_at)
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._entries[jti] = (expires_at, int(time.time()))
+
+    def contains(self, jti):
+        entry = self._entries.get(jti)
+        return entry is not None and entry[0] >= time.time()
+
+    def revoked_since(self, since):
+        now = time.time()
+        return [jti for jti, (expires_at, revoked_at) in list(self._entries.items())
+                if revoked_at >= since and expires_at >= now]
+
+    def prune(self, limit=10000):
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, (expires_at, _) in self._entries.items() if expires_at < now][:limit]
+            for jti in expired:
+                del self._entries[jti]
+        return {'revoked_tokens_deleted': len(expired)}
+
+
+class RevokedToken(db.Model):
+    """Revoked token id, kept until the token would have expired"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(64), primary_key=True)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
+    revoked_at = db.Column(db.Integer, nullable=False, index=True)
+
+
+class SQLRevocationStore(RevocationStore):
+    """Revocations in the revoked_tokens table (requires an app context)"""
+
+    def __init__(self):
+        # Own connections, so a revocation commits even if the request rolls back
+        self.table = RevokedToken.__table__
+
+    def add(self, jti, expires_at):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.insert(self.table).values(
+                    jti=jti, expires_at=expires_at, revoked_at=int(time.time())
+                ))
+        except IntegrityError:
+            pass  # Already revoked
+
+    def contains(self, jti):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                db.select(self.table.c.jti)
+                .where(self.table.c.jti == jti)
+                .where(self.table.c.expires_at >= int(time.time()))
+            ).first() is not None
+
+    def revoked_since(self, since):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                db.select(self.table.c.jti)
+                .where(self.table.c.revoked_at >= since)
+                .where(self.table.c.expires_at >= int(time.time()))
+            ).scalars().all()
+
+    def prune(self, limit=10000):
+        now = int(time.time())
+        with db.engine.begin() as conn:
+            expired = conn.execute(
+                db.select(self.table.c.jti)
+                .where(self.table.c.expires_at < now).limit(limit)
+            ).scalars().all()
+            deleted = conn.execute(
+                db.delete(self.table).where(self.table.c.jti.in_(expired))
+            ).rowcount if expired else 0
+        return {'revoked_tokens_deleted': deleted}
+
+
+class RedisRevocationStore(RevocationStore):
+    """Revocations as expiring Redis keys plus a sorted-set log for syncing"""
+
+    def __init__(self, client, prefix: str = 'revoked:', max_token_lifetime: int = 2592000):
+        """
+        Initialize store
+
+        Args:
+            client: redis.Redis (or compatible) client
+            prefix: Key prefix for revocation entries
+            max_token_lifetime: Longest token lifetime in seconds; log
+                                entries older than this are pruned
+        """
+        self.client = client
+        self.prefix = prefix
+        self.log_key = prefix + 'log'
+        self.max_token_lifetime = max_token_lifetime
+
+    def add(self, jti, expires_at):
+        now = time.time()
+        self.client.setex(self.prefix + jti, max(int(expires_at - now), 1), expires_at)
+        # Log member "jti expires_at" scored by revocation time
+        self.client.zadd(self.log_key, {f'{jti} {int(expires_at)}': int(now)})
+
+    def contains(self, jti):
+        # Redis drops the key when the token expires
+        return bool(self.client.exists(self.prefix + jti))
+
+    def revoked_since(self, since):
+        now = time.time()
+        revoked = []
+        for member in self.client.zrangebyscore(self.log_key, since, '+inf'):
+            if isinstance(member, bytes):
+                member = member.decode('utf-8')
+            jti, expires_at = member.rsplit(' ', 1)
+            if int(expires_at) >= now:
+                revoked.append(jti)
+        return revoked
+
+    def prune(self, limit=10000):
+        # Keys expire natively; only log entries older than any token can be trimmed
+        deleted = self.client.zremrangebyscore(
+            self.log_key, '-inf', f'({int(time.time()) - self.max_token_lifetime}'
+        )
+        return {'revoked_tokens_deleted': deleted}
+
+
+# ==================== Revocation List ====================
+
+class TokenRevocationList:
+    """Bloom-filtered view of a RevocationStore, kept in sync periodically"""
+
+    def __init__(self, store: Optional[RevocationStore] = None, capacity: int = 100000,
+                 error_rate: float = 0.001, sync_interval: float = 5.0,
+                 rebuild_interval: float = 3600.0):
+        """
+        Initialize revocation list
+
+        Args:
+            store: Shared store (defaults to in-process memory)
+            capacity: Revocations the Bloom filter is sized for
+            error_rate: Bloom false positive rate (each costs one store lookup)
+            sync_interval: Seconds between pulls of other workers'
+                           revocations (how long those take to apply here)
+            rebuild_interval: Seconds between rebuilds that drop expired
+                              ids from the filter
+        """
+        self.store = store or MemoryRevocationStore()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom = None
+        self._synced_at = 0
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            'checks': 0,
+            'bloom_negatives': 0,
+            'store_lookups': 0,
+            'false_positives': 0,
+            'revoked_hits': 0,
+            'syncs': 0,
+            'rebuilds': 0
+        }
+
+    def configure(self, store: RevocationStore, **settings):
+        """Swap the store (and settings) and rebuild on next use"""
+        with self._lock:
+            self.store = store
+            for name, value in settings.items():
+                setattr(self, name, value)
+            self._bloom = None
+
+    def rebuild(self):
+        """Reload the filter from every unexpired revocation in the store"""
+        started = int(time.time())
+        revoked = list(self.store.revoked_since(0))
+        bloom = BloomFilter(max(self.capacity, 2 * len(revoked)), self.error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+
+        self._bloom = bloom
+        self._synced_at = started
+        now = time.monotonic()
+        self._next_sync = now + self.sync_interval
+        self._next_rebuild = now + self.rebuild_interval
+        self.stats['rebuilds'] += 1
+
+    def sync(self):
+        """Add revocations made by other workers since the last sync"""
+        started = int(time.time())
+        for jti in self.store.revoked_since(self._synced_at - SYNC_OVERLAP):
+            self._bloom.add(jti)
+
+        self._synced_at = started
+        self._next_sync = time.monotonic() + self.sync_interval
+        self.stats['syncs'] += 1
+        if self._bloom.count > self._bloom.capacity:
+            self._next_rebuild = 0.0  # Resize before false positives pile up
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._bloom is not None and now < self._next_sync and now < self._next_rebuild:
+            return
+        # The first caller refreshes; the others keep using the current filter
+        blocking = self._bloom is None
+        if not self._lock.acquire(blocking=blocking):
+            return
+        try:
+            if self._bloom is None or time.monotonic() >= self._next_rebuild:
+                self.rebuild()
+            elif time.monotonic() >= self._next_sync:
+                self.sync()
+        finally:
+            self._lock.release()
+
+    def revoke(self, jti: str, expires_at: int):
+        """
+        Revoke a token id (requires app context for the SQL store)
+
+        Args:
+            jti: Token ID
+            expires_at: Token's exp claim (epoch seconds)
+        """
+        self.store.add(jti, int(expires_at))
+        self._refresh()
+        self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Whether a token id was revoked (requires app context for the SQL store)
+
+        Args:
+            jti: Token ID
+
+        Returns:
+            bool: True if revoked and not yet expired
+        """
+        self._refresh()
+        self.stats['checks'] += 1
+        if jti not in self._bloom:
+            self.stats['bloom_negatives'] += 1
+            return False
+
+        self.stats['store_lookups'] += 1
+        revoked = self.store.contains(jti)
+        self.stats['revoked_hits' if revoked else 'false_positives'] += 1
+        return revoked
+
+    def prune(self, limit: int = 10000) -> Dict[str, int]:
+        """Remove expired revocations from the store"""
+        return self.store.prune(limit=limit)
+
+    def get_stats(self) -> Dict:
+        """Get check counters and filter size"""
+        return dict(
+            self.stats,
+            backend=type(self.store).__name__,
+            bloom_entries=self._bloom.count if self._bloom else 0,
+            bloom_bits=self._bloom.size if self._bloom else 0,
+            sync_interval=self.sync_interval
+        )
+
+
+# Global revocation list instance
+token_revocations = TokenRevocationList()
+
+
+def create_revocation_store(app) -> RevocationStore:
+    """
+    Build the store selected by JWT_REVOCATION_BACKEND
+
+    Args:
+        app: Flask application
+
+    Returns:
+        RevocationStore: sqlalchemy, redis or memory store
+    """
+    backend = app.config.get('JWT_REVOCATION_BACKEND', 'sqlalchemy')
+
+    if backend == 'redis':
+        import redis
+        from backend.jwt_auth import JWTAuth
+        client = redis.Redis.from_url(
+            app.config.get('JWT_REVOCATION_REDIS_URL') or
+            app.config.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+        )
+        return RedisRevocationStore(
+            client, max_token_lifetime=int(JWTAuth.REFRESH_TOKEN_EXPIRY.total_seconds())
+        )
+
+    if backend == 'memory':
+        return MemoryRevocationStore()
+
+    if backend != 'sqlalchemy':
+        print(f"[WARNING] Unknown JWT_REVOCATION_BACKEND '{backend}', using sqlalchemy")
+    with app.app_context():
+        RevokedToken.__table__.create(db.engine, checkfirst=True)
+    return SQLRevocationStore()
+
+
+def init_token_revocation(app):
+    """
+    Configure the JWT revocation list
+
+    Args:
+        app: Flask application
+
+    Returns:
+        TokenRevocationList: Configured revocation list
+    """
+    token_revocations.configure(
+        create_revocation_store(app),
+        capacity=app.config.get('JWT_REVOCATION_CAPACITY', 100000),
+        sync_interval=app.config.get('JWT_REVOCATION_SYNC_INTERVAL', 5.0)
+    )
+    print(f"[OK] Token revocation list initialized ({type(token_revocations.store).__name__})")
+    return token_revocations
@@ -0,0 +1,410 @@
+"""
+Request Tracing
+Lightweight in-process spans for timing pipeline stages, exportable
+as OpenTelemetry-compatible JSON
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+
+_current_span: ContextVar = ContextVar('edubot_current_span', default=None)
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+class Span:
+    """A timed unit of work within a trace"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'start_time_ns', 'duration_ns', 'status', 'status_message',
+                 '_start_counter', '_trace_spans')
+
+    def __init__(self, name: str, trace_id: str, parent: Optional['Span'] = None,
+                 attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_time_ns = time.time_ns()
+        self.duration_ns = None
+        self.status = STATUS_UNSET
+        self.status_message = None
+        self._start_counter = time.perf_counter_ns()
+        # Every span of a trace shares the root's list
+        self._trace_spans = parent._trace_spans if parent else []
+        self._trace_spans.append(self)
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent_id is None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.duration_ns or 0) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException):
+        """Mark the span as failed"""
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)[:200]
+        self.attributes['exception.type'] = type(exc).__name__
+
+    def end(self):
+        """Stop the span clock"""
+        if self.duration_ns is None:
+            self.duration_ns = time.perf_counter_ns() - self._start_counter
+            if self.status == STATUS_UNSET:
+                self.status = STATUS_OK
+
+    def to_otel(self) -> Dict:
+        """Convert span to OpenTelemetry JSON (OTLP) span format"""
+        otel = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_SERVER if self.is_root else SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_time_ns),
+            'endTimeUnixNano': str(self.start_time_ns + (self.duration_ns or 0)),
+            'attributes': [_otel_attribute(k, v) for k, v in self.attributes.items()],
+            'status': {'code': self.status}
+        }
+        if self.parent_id:
+            otel['parentSpanId'] = self.parent_id
+        if self.status_message:
+            otel['status']['message'] = self.status_message
+        return otel
+
+
+class _NoopSpan:
+    """Span stand-in handed out when tracing is off or not sampled"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_error(self, exc: BaseException):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _NoopScope:
+    """Context manager doing nothing, shared by all disabled spans"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class _UnsampledScope:
+    """Marks the current context as belonging to an unsampled trace"""
+
+    __slots__ = ('_token',)
+
+    def __enter__(self):
+        self._token = _current_span.set(_NOOP_SPAN)
+        return _NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+class _SpanScope:
+    """Activates a span for the duration of a with-block"""
+
+    __slots__ = ('_tracer', '_span', '_token')
+
+    def __init__(self, tracer: 'Tracer', span: Span):
+        self._tracer = tracer
+        self._span = span
+
+    def __enter__(self):
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self._span.set_error(exc)
+        self._span.end()
+        _current_span.reset(self._token)
+        if self._span.is_root:
+            self._tracer._finish_trace(self._span)
+        return False
+
+
+class FileSpanExporter:
+    """Append finished traces to a file, one OTLP JSON document per line"""
+
+    def __init__(self, path: str, service_name: str = 'edubot'):
+        """
+        Initialize file exporter
+
+        Args:
+            path: File receiving the traces
+            service_name: service.name resource attribute
+        """
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        """Write one trace"""
+        line = json.dumps(to_otlp_json(spans, self.service_name), separators=(',', ':'))
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class InMemorySpanExporter:
+    """Keep finished traces in memory (collector stand-in for tests)"""
+
+    def __init__(self, max_traces: int = 100):
+        self.traces = deque(maxlen=max_traces)
+
+    def export(self, spans: List[Span]):
+        self.traces.append(list(spans))
+
+
+def _otel_attribute(key: str, value: Any) -> Dict:
+    """Encode an attribute as an OTLP AnyValue"""
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+def to_otlp_json(spans: List[Span], service_name: str = 'edubot') -> Dict:
+    """
+    Build an OTLP/JSON export request for a set of spans
+
+    Args:
+        spans: Finished spans
+        service_name: service.name resource attribute
+
+    Returns:
+        dict: Document in the ExportTraceServiceRequest JSON shape
+    """
+    return {
+        'resourceSpans': [{
+            'resource': {
+                'attributes': [_otel_attribute('service.name', service_name)]
+            },
+            'scopeSpans': [{
+                'scope': {'name': 'backend.tracing'},
+                'spans': [span.to_otel() for span in spans]
+            }]
+        }]
+    }
+
+
+class Tracer:
+    """Creates spans, samples traces and aggregates stage timings"""
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0,
+                 max_traces: int = 50):
+        """
+        Initialize tracer
+
+        Args:
+            enabled: Whether spans are recorded at all
+            sample_rate: Fraction of root spans (traces) recorded
+            max_traces: Recent traces kept for the admin dashboard
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporters = []
+        self._recent = deque(maxlen=max_traces)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = None, sample_rate: float = None,
+                  exporter=None):
+        """Change tracer settings at runtime"""
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        if exporter is not None:
+            self.exporters.append(exporter)
+
+    def span(self, name: str, **attributes):
+        """
+        Start a span as a context manager
+
+        A span started with no active parent begins a new trace, subject
+        to sampling. Inside an unsampled trace, or with tracing disabled,
+        a shared no-op scope is returned.
+
+        Args:
+            name: Span name
+            **attributes: Initial span attributes
+
+        Returns:
+            Context manager yielding the span
+        """
+        if not self.enabled:
+            return _NOOP_SCOPE
+
+        parent = _current_span.get()
+        if parent is _NOOP_SPAN:
+            return _NOOP_SCOPE
+
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledScope()
+            return _SpanScope(self, Span(name, '%032x' % random.getrandbits(128),
+                                         attributes=attributes))
+
+        return _SpanScope(self, Span(name, parent.trace_id, parent, attributes))
+
+    def traced(self, name: str = None):
+        """Decorator running the wrapped function inside a span"""
+        def decorator(f):
+            span_name = name or f.__name__
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                with self.span(span_name):
+                    return f(*args, **kwargs)
+
+            return decorated_function
+        return decorator
+
+    def current_span(self):
+        """Get the active span (no-op span when none is recording)"""
+        span = _current_span.get()
+        return span if span is not None else _NOOP_SPAN
+
+    def _finish_trace(self, root: Span):
+        """Aggregate stage timings and export a completed trace"""
+        spans = root._trace_spans
+
+        with self._lock:
+            self._recent.append(spans)
+            for span in spans:
+                if span.duration_ns is None:
+                    continue
+                key = (root.name, span.name)
+                stats = self._stages.get(key)
+                if stats is None:
+                    if len(self._stages) >= 500:
+                        continue
+                    stats = self._stages[key] = {
+                        'count': 0, 'total_ns': 0, 'max_ns': 0, 'errors': 0
+                    }
+                stats['count'] += 1
+                stats['total_ns'] += span.duration_ns
+                stats['max_ns'] = max(stats['max_ns'], span.duration_ns)
+                if span.status == STATUS_ERROR:
+                    stats['errors'] += 1
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"[ERROR] Trace export failed: {e}")
+
+    def get_stage_breakdown(self) -> Dict[str, List[Dict]]:
+        """
+        Get per-stage timing for each traced operation
+
+        Returns:
+            dict: Root span name -> stages ordered by total time, with
+                  each stage's share of the root span's time
+        """
+        with self._lock:
+            items = [(key, dict(stats)) for key, stats in self._stages.items()]
+
+        roots = {root: stats for (root, name), stats in items if root == name}
+        breakdown = {}
+
+        for (root, name), stats in items:
+            root_total = roots.get(root, {}).get('total_ns') or 0
+            breakdown.setdefault(root, []).append({
+                'stage': name,
+                'count': stats['count'],
+                'avg_ms': round(stats['total_ns'] / stats['count'] / 1e6, 3),
+                'max_ms': round(stats['max_ns'] / 1e6, 3),
+                'total_ms': round(stats['total_ns'] / 1e6, 2),
+                'share_percent': round(stats['total_ns'] / root_total * 100, 1)
+                                 if root_total else None,
+                'errors': stats['errors']
+            })
+
+        for stages in breakdown.values():
+            stages.sort(key=lambda x: x['total_ms'], reverse=True)
+
+        return breakdown
+
+    def get_recent_traces(self, limit: int = 10) -> List[Dict]:
+        """Get the most recent traces in OTLP JSON form"""
+        with self._lock:
+            traces = list(self._recent)[-limit:]
+        return [to_otlp_json(spans) for spans in reversed(traces)]
+
+    def reset(self):
+        """Clear collected traces and stage statistics"""
+        with self._lock:
+            self._recent.clear()
+            self._stages = {}
+
+
+# Global tracer instance
+tracer = Tracer()
+
+
+def init_tracing(app):
+    """
+    Configure tracing for the Flask app
+
+    Args:
+        app: Flask application
+
+    Returns:
+        Tracer: Configured tracer
+    """
+    export_path = app.config.get('TRACING_EXPORT_PATH')
+    tracer.configure(
+        enabled=app.config.get('TRACING_ENABLED', False),
+        sample_rate=app.config.get('TRACING_SAMPLE_RATE', 1.0),
+        exporter=FileSpanExporter(export_path) if export_path else None
+    )
+    print(f"[OK] Tracing initialized (enabled={tracer.enabled}, "
+          f"sample_rate={tracer.sample_rate})")
+    return tracer
@@ -0,0 +1,237 @@
+"""
+Trending Query Tracker
+Heavy-hitter tracking of user queries with Space-Saving sketches under
+forward exponential decay, plus bounded per-user recent-query rings
+"""
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from backend.suggestion_index import normalize
+
+
+class DecayedSpaceSaving:
+    """
+    Space-Saving top-k sketch whose counts decay with time constant `tau`
+
+    Forward decay: an event at time t adds exp((t - landmark) / tau), so
+    older weights never need touching. Estimates overcount by at most
+    the total decayed weight divided by `capacity`.
+    """
+
+    def __init__(self, capacity: int = 1000, tau: float = 3600.0):
+        """
+        Initialize sketch
+
+        Args:
+            capacity: Counters kept (more = more accurate tail)
+            tau: Decay time constant in seconds (~ the window length)
+        """
+        self.capacity = capacity
+        self.tau = tau
+        self.landmark = time.time()
+        self.counters = {}  # key -> [weight, error, text]
+        self._heap = []     # (weight, key) min-heap, lazily invalidated
+        self.total = 0.0
+
+    def _rescale(self, now: float):
+        """Move the landmark forward before weights overflow"""
+        factor = math.exp(-(now - self.landmark) / self.tau)
+        for counter in self.counters.values():
+            counter[0] *= factor
+            counter[1] *= factor
+        self.total *= factor
+        self.landmark = now
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(counter[0], key) for key, counter in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def add(self, key: str, text: str, now: Optional[float] = None):
+        """
+        Count one occurrence
+
+        Args:
+            key: Normalized query
+            text: Display text for the query
+            now: Event time (defaults to the current time)
+        """
+        now = time.time() if now is None else now
+        if now - self.landmark > 500 * self.tau:
+            self._rescale(now)
+
+        weight = math.exp((now - self.landmark) / self.tau)
+        self.total += weight
+        counter = self.counters.get(key)
+
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [0.0, 0.0, text]
+            else:
+                # Replace the smallest counter; its weight becomes our error bound
+                while True:
+                    smallest, victim = heapq.heappop(self._heap)
+                    if victim in self.counters and self.counters[victim][0] == smallest:
+                        break
+                del self.counters[victim]
+                counter = self.counters[key] = [smallest, smallest, text]
+
+        counter[0] += weight
+        heapq.heappush(self._heap, (counter[0], key))
+
+        # Stale heap entries accumulate on every increment
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Dict]:
+        """
+        Heaviest keys with decayed count estimates
+
+        Args:
+            k: Number of keys
+            now: Time the counts are decayed to
+
+        Returns:
+            list: {'query', 'count', 'error'} dicts, heaviest first
+        """
+        now = time.time() if now is None else now
+        scale = math.exp(-(now - self.landmark) / self.tau)
+        best = heapq.nlargest(k, self.counters.items(), key=lambda item: item[1][0])
+        return [
+            {
+                'query': counter[2],
+                'count': round(counter[0] * scale, 3),
+                'error': round(counter[1] * scale, 3)
+            }
+            for _, counter in best
+        ]
+
+
+class TrendingTracker:
+    """Trending queries per time window and recent queries per user"""
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None,
+                 capacity: int = 1000, refresh_seconds: float = 5.0,
+                 max_top: int = 50, history_size: int = 20,
+                 max_users: int = 10000):
+        """
+        Initialize tracker
+
+        Args:
+            windows: Window name -> decay time constant in seconds
+            capacity: Space-Saving counters per window
+            refresh_seconds: How long a computed ranking is served from cache
+            max_top: Longest ranking kept per window
+            history_size: Recent queries remembered per user
+            max_users: Users with history kept (least recently active dropped)
+        """
+        self.windows = windows or {'hour': 3600.0, 'day': 86400.0}
+        self.sketches = {
+            name: DecayedSpaceSaving(capacity, tau)
+            for name, tau in self.windows.items()
+        }
+        self.refresh_seconds = refresh_seconds
+        self.max_top = max_top
+        self.history_size = history_size
+        self.max_users = max_users
+        self.user_history = OrderedDict()
+        self.total_queries = 0
+        self._rankings = {}  # window -> (computed_at, ranking)
+        self._lock = threading.Lock()
+
+    def record(self, query: str, user_id=None, now: Optional[float] = None):
+        """
+        Count a query and append it to the user's recent queries
+
+        Anonymous queries count towards trending only; a shared history
+        would show one visitor's messages to every other visitor.
+
+        Args:
+            query: Raw query text
+            user_id: User who sent it (None for anonymous visitors)
+            now: Event time (defaults to the current time)
+        """
+        text = ' '.join(query.split())
+        key = normalize(text)
+        if not key:
+            return
+
+        now = time.time() if now is None else now
+        with self._lock:
+            self.total_queries += 1
+            for sketch in self.sketches.values():
+                sketch.add(key, text, now)
+            if user_id is None:
+                return
+
+            history = self.user_history.get(user_id)
+            if history is None:
+                history = self.user_history[user_id] = deque(maxlen=self.history_size)
+                if len(self.user_history) > self.max_users:
+                    self.user_history.popitem(last=False)
+            else:
+                self.user_history.move_to_end(user_id)
+            if not history or history[-1] != text:
+                history.append(text)
+
+    def top(self, window: str = 'hour', k: int = 5) -> List[Dict]:
+        """
+        Trending queries in a window
+
+        The ranking is recomputed at most every refresh_seconds, so a
+        request costs O(k).
+
+        Args:
+            window: Window name
+            k: Number of queries
+
+        Returns:
+            list: {'query', 'count', 'error'} dicts, most frequent first
+        """
+        if window not in self.sketches:
+            raise ValueError(f"Unknown window '{window}'")
+
+        now = time.time()
+        cached = self._rankings.get(window)
+        if cached is None or now - cached[0] > self.refresh_seconds:
+            with self._lock:
+                ranking = self.sketches[window].top(self.max_top, now)
+            cached = self._rankings[window] = (now, ranking)
+        return cached[1][:k]
+
+    def recent(self, user_id=None, limit: Optional[int] = None) -> List[str]:
+        """
+        A user's recent queries, newest first
+
+        Args:
+            user_id: User id (None returns nothing)
+            limit: Maximum queries
+
+        Returns:
+            list: Query texts
+        """
+        history = self.user_history.get(user_id) if user_id is not None else None
+        if not history:
+            return []
+        queries = list(reversed(history))
+        return queries[:limit] if limit else queries
+
+    def clear_user(self, user_id=None):
+        """Forget a user's recent queries"""
+        with self._lock:
+            self.user_history.pop(user_id, None)
+
+    def get_stats(self) -> Dict:
+        """Get tracker sizes"""
+        return {
+            'total_queries': self.total_queries,
+            'tracked_users': len(self.user_history),
+            'windows': {
+                name: {'tau_seconds': sketch.tau, 'counters': len(sketch.counters)}
+                for name, sketch in self.sketches.items()
+            }
+        }
@@ -68,38 +68,33 @@ def time_ago(dt):
 
 
 def login_required(f):
-    """Decorator to require login"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return error_response('Authentication required', 401)
-        return f(*args, **kwargs)
-    return decorated_function
-
-
-def admin_required(f):
-    """Decorator to require admin role"""
+    """Decorator to require login by an existing, active user"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return error_response('Authentication required', 401)
         
-        from database.models import User
-        user = User.query.get(session['user_id'])
-        if not user or user.role != 'admin':
-            return error_response('Admin access required', 403)
+        from backend.principal_cache import principal_cache
+        principal = principal_cache.get(session['user_id'])
+        if not principal or not principal.is_active:
+            return error_response('Authentication required', 401)
         
         return f(*args, **kwargs)
     return decorated_function
 
 
 def admin_required(f):
-    """Decorator to require admin role"""
+    """Decorator to require admin role (checked against the user's current role)"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required', 'status': 401}), 401
-        if session.get('role') != 'admin':
+        
+        from backend.principal_cache import principal_cache
+        principal = principal_cache.get(session['user_id'])
+        if not principal or not principal.is_active:
+            return jsonify({'error': 'Authentication required', 'status': 401}), 401
+        if principal.role != 'admin':
             return jsonify({'error': 'Admin access required', 'status': 403}), 403
         return f(*args, **kwargs)
     return decorated_function
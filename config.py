@@ -25,17 +25,40 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = DEBUG
     
+    # Connection Pool (MySQL/PostgreSQL; file SQLite uses size/overflow/timeout)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Below the server's idle timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'True').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 30))  # Seconds a writer waits for the lock
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+    
+    # Read Replica (admin and analytics reads inside read_only())
+    REPLICA_DATABASE_URL = os.getenv('REPLICA_DATABASE_URL', '')  # Empty reads from the primary
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 0))  # Seconds; 0 skips the lag check
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5.0))
+    
     # MongoDB Configuration (Optional)
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/chatbot')
     
     # Session Configuration
-    SESSION_TYPE = 'filesystem'
+    SESSION_TYPE = os.getenv('SESSION_TYPE', 'filesystem')  # filesystem, sqlalchemy or redis
+    SESSION_FILE_DIR = os.getenv('SESSION_FILE_DIR', 'flask_session')
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_PERMANENT = True
     PERMANENT_SESSION_LIFETIME = timedelta(
         seconds=int(os.getenv('PERMANENT_SESSION_LIFETIME', 604800))
     )
     SESSION_COOKIE_SECURE = False  # Set True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', 60))  # Seconds auth checks reuse a user's role/status
+    JWT_REVOCATION_BACKEND = os.getenv('JWT_REVOCATION_BACKEND', 'sqlalchemy')  # sqlalchemy, redis or memory
+    JWT_REVOCATION_REDIS_URL = os.getenv('JWT_REVOCATION_REDIS_URL', '')  # Defaults to SESSION_REDIS_URL
+    JWT_REVOCATION_SYNC_INTERVAL = float(os.getenv('JWT_REVOCATION_SYNC_INTERVAL', 5.0))
+    JWT_REVOCATION_CAPACITY = int(os.getenv('JWT_REVOCATION_CAPACITY', 100000))  # Bloom filter size
     
     # Upload Configuration
     UPLOAD_FOLDER = os.path.join(
@@ -79,6 +102,41 @@ class Config:
     # Analytics Configuration
     ANALYTICS_ENABLED = True
     ANALYTICS_RETENTION_DAYS = 90
+    
+    # Performance Monitoring
+    PERFORMANCE_SAMPLE_INTERVAL = float(os.getenv('PERFORMANCE_SAMPLE_INTERVAL', 5))
+    PERFORMANCE_HISTORY_SIZE = int(os.getenv('PERFORMANCE_HISTORY_SIZE', 120))
+    QUERY_MONITOR_ENABLED = os.getenv('QUERY_MONITOR_ENABLED', 'True').lower() == 'true'
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'False').lower() == 'true'
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0.1))
+    TRACING_EXPORT_PATH = os.getenv('TRACING_EXPORT_PATH', '')
+    
+    # Conversation Context Hot Tier
+    CONTEXT_HOT_CAPACITY = int(os.getenv('CONTEXT_HOT_CAPACITY', 1000))
+    CONTEXT_HOT_TTL = int(os.getenv('CONTEXT_HOT_TTL', 300))
+    CONTEXT_FLUSH_INTERVAL = float(os.getenv('CONTEXT_FLUSH_INTERVAL', 2.0))
+    
+    # Expiry Sweeper
+    SWEEPER_ENABLED = os.getenv('SWEEPER_ENABLED', 'True').lower() == 'true'
+    SWEEPER_INTERVAL = int(os.getenv('SWEEPER_INTERVAL', 300))
+    SWEEPER_BATCH_SIZE = int(os.getenv('SWEEPER_BATCH_SIZE', 500))
+    SESSION_RETENTION_DAYS = int(os.getenv('SESSION_RETENTION_DAYS', 30))
+    
+    # Sentiment Analysis
+    SENTIMENT_LEXICON_PATH = os.getenv('SENTIMENT_LEXICON_PATH', '')  # Defaults to TextBlob's en-sentiment.xml
+    
+    # Lecture Summarizer
+    LECTURE_SUMMARIZER_ENGINE = os.getenv('LECTURE_SUMMARIZER_ENGINE', 'tfidf')  # tfidf or keyword
+    LECTURE_SIMHASH_DISTANCE = int(os.getenv('LECTURE_SIMHASH_DISTANCE', 3))  # 0 disables near-duplicate reuse
+    LECTURE_MAX_TRANSCRIPT_BYTES = int(os.getenv('LECTURE_MAX_TRANSCRIPT_BYTES', 2 * 1024 * 1024))  # Uploads are held in memory up to this size
+    
+    # Background Jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # 0 runs jobs inline
+    JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 100))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', 5.0))
+    JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', 300))  # Seconds without progress before another process's job is requeued
 
 
 class DevelopmentConfig(Config):
@@ -1,4 +1,6 @@
 """Database package initialization"""
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from database.replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
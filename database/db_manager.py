@@ -6,6 +6,8 @@ from datetime import datetime
 from sqlalchemy import func, desc
 from database import db
 from database.models import User, Conversation, Feedback, KnowledgeBase, Session, Analytics
+from database.pagination import keyset_paginate
+from backend.principal_cache import principal_cache
 
 
 class DatabaseManager:
@@ -96,13 +98,14 @@ class DatabaseManager:
         """Get user by email"""
         return User.query.filter_by(email=email).first()
     
-    def get_all_users(self, page=1, per_page=20):
-        """Get all users with pagination"""
-        return User.query.paginate(page=page, per_page=per_page, error_out=False)
+    def get_all_users(self, cursor=None, per_page=20, with_total=False):
+        """Get all users, newest first, one keyset page at a time"""
+        return keyset_paginate(User.query, User.created_at, User.user_id,
+                               cursor, per_page, with_total, count_key='users')
     
     def update_user(self, user_id, **kwargs):
         """Update user information"""
-        user = self.get_user_by_id(user_id)
+        user = self.db.session.get(User, user_id)
         if not user:
             return None
         
@@ -112,14 +115,16 @@ class DatabaseManager:
         
         user.updated_at = datetime.utcnow()
         self.db.session.commit()
+        principal_cache.invalidate(user_id)
         return user
     
     def delete_user(self, user_id):
         """Delete a user"""
-        user = self.get_user_by_id(user_id)
+        user = self.db.session.get(User, user_id)
         if user:
             self.db.session.delete(user)
             self.db.session.commit()
+            principal_cache.invalidate(user_id)
             return True
         return False
     
@@ -150,11 +155,12 @@ class DatabaseManager:
         """Get conversation by ID"""
         return Conversation.query.get(conversation_id)
     
-    def get_user_conversations(self, user_id, page=1, per_page=20):
-        """Get all conversations for a user"""
-        return Conversation.query.filter_by(user_id=user_id)\
-            .order_by(desc(Conversation.timestamp))\
-            .paginate(page=page, per_page=per_page, error_out=False)
+    def get_user_conversations(self, user_id, cursor=None, per_page=20, with_total=False):
+        """Get all conversations for a user, newest first, one keyset page at a time"""
+        return keyset_paginate(Conversation.query.filter_by(user_id=user_id),
+                               Conversation.timestamp, Conversation.conversation_id,
+                               cursor, per_page, with_total,
+                               count_key=f'conversations:{user_id}')
     
     def get_recent_conversations(self, limit=10):
         """Get recent conversations across all users"""
@@ -207,10 +213,10 @@ class DatabaseManager:
         """Get feedback by ID"""
         return Feedback.query.get(feedback_id)
     
-    def get_all_feedback(self, page=1, per_page=20):
-        """Get all feedback with pagination"""
-        return Feedback.query.order_by(desc(Feedback.created_at))\
-            .paginate(page=page, per_page=per_page, error_out=False)
+    def get_all_feedback(self, cursor=None, per_page=20, with_total=False):
+        """Get all feedback, newest first, one keyset page at a time"""
+        return keyset_paginate(Feedback.query, Feedback.created_at, Feedback.feedback_id,
+                               cursor, per_page, with_total, count_key='feedback')
     
     def get_feedback_stats(self):
         """Get feedback statistics"""
@@ -250,15 +256,16 @@ class DatabaseManager:
         """Get knowledge base entry by ID"""
         return KnowledgeBase.query.get(kb_id)
     
-    def get_all_knowledge(self, status=None, page=1, per_page=20):
-        """Get all knowledge base entries"""
+    def get_all_knowledge(self, status=None, cursor=None, per_page=20, with_total=False):
+        """Get all knowledge base entries, newest first, one keyset page at a time"""
         query = KnowledgeBase.query
         
         if status:
             query = query.filter_by(status=status)
         
-        return query.order_by(desc(KnowledgeBase.created_at))\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        return keyset_paginate(query, KnowledgeBase.created_at, KnowledgeBase.kb_id,
+                               cursor, per_page, with_total,
+                               count_key=f'knowledge:{status or "all"}')
     
     def get_approved_knowledge(self):
         """Get all approved knowledge"""
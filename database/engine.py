@@ -0,0 +1,197 @@
+"""
+Database Engine Configuration
+Per-dialect connection pool settings, SQLite WAL pragmas and pool
+checkout metrics, applied before and right after db.init_app(app)
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Checkout counters shared by every TimedQueuePool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pools = []
+        self.reset()
+
+    def reset(self):
+        """Zero the counters"""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        """Count one checkout and how long it waited for a connection"""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def get_stats(self) -> Dict:
+        """Get checkout wait times and current pool occupancy"""
+        in_use = size = overflow = idle = 0
+        for pool in self.pools:
+            in_use += pool.checkedout()
+            size += pool.size()
+            overflow += max(pool.overflow(), 0)
+            idle += pool.checkedin()
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+            'max_wait_ms': round(self.wait_max * 1000, 3),
+            'in_use': in_use,
+            'idle': idle,
+            'pool_size': size,
+            'overflow': overflow
+        }
+
+
+# Global pool metrics instance
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_metrics.pools.append(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        if self in pool_metrics.pools:
+            pool_metrics.pools.remove(self)
+        return pool
+
+
+def is_memory_sqlite(url) -> bool:
+    """Whether a URL points at an in-memory SQLite database"""
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(uri: str, config) -> Dict:
+    """
+    Engine keyword arguments for a database URL
+
+    Args:
+        uri: SQLALCHEMY_DATABASE_URI
+        config: Mapping with the DB_POOL_* and SQLITE_* settings
+
+    Returns:
+        dict: Options for create_engine (empty for in-memory SQLite,
+              which Flask-SQLAlchemy gives a single static connection)
+    """
+    url = make_url(uri)
+    if is_memory_sqlite(url):
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+    }
+    if url.get_backend_name() == 'sqlite':
+        # Local file: connections never go stale, but writers wait on the
+        # lock instead of failing with "database is locked"
+        options['pool_pre_ping'] = False
+        options['connect_args'] = {
+            'timeout': config.get('SQLITE_BUSY_TIMEOUT', 30),
+            'check_same_thread': False
+        }
+    else:
+        # Recycle before server-side idle timeouts (MySQL wait_timeout) drop connections
+        options['pool_recycle'] = config.get('DB_POOL_RECYCLE', 1800)
+    return options
+
+
+def sqlite_pragmas(config) -> Dict:
+    """PRAGMA name -> value run on every new SQLite connection"""
+    pragmas = {
+        'synchronous': 'NORMAL',
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', 268435456),
+        'busy_timeout': int(config.get('SQLITE_BUSY_TIMEOUT', 30) * 1000)
+    }
+    if config.get('SQLITE_WAL', True):
+        # WAL lets readers run alongside the single writer
+        pragmas = dict(journal_mode='WAL', **pragmas)
+    return pragmas
+
+
+def configure_engine_options(app):
+    """
+    Fill in SQLALCHEMY_ENGINE_OPTIONS before db.init_app(app);
+    options already set in the config take precedence
+
+    Args:
+        app: Flask application
+    """
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def apply_sqlite_pragmas(engine, config):
+    """
+    Run sqlite_pragmas() on every new connection of a file SQLite engine
+    (other engines are left as they are)
+
+    Args:
+        engine: SQLAlchemy engine
+        config: Mapping with the SQLITE_* settings
+    """
+    if engine.dialect.name != 'sqlite' or is_memory_sqlite(engine.url):
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def init_engine(app, db):
+    """
+    Attach SQLite pragmas to the engine created by db.init_app(app)
+
+    Args:
+        app: Flask application
+        db: Flask-SQLAlchemy extension
+
+    Returns:
+        Engine: Configured engine
+    """
+    with app.app_context():
+        engine = db.engine
+    apply_sqlite_pragmas(engine, app.config)
+
+    pool = engine.pool
+    print(f"[OK] Database engine configured ({engine.dialect.name}, "
+          f"{type(pool).__name__} size={pool.size() if hasattr(pool, 'size') else 1})")
+    return engine
@@ -5,6 +5,37 @@ from database import db
 from datetime import datetime
 
 
+PREVIEW_LENGTH = 500
+
+
+def make_preview(content):
+    """Truncated transcript shown in note lists"""
+    content = content or ''
+    return content[:PREVIEW_LENGTH] + '...' if len(content) > PREVIEW_LENGTH else content
+
+
+class LectureContent(db.Model):
+    """Transcript stored once and shared by every identical upload"""
+    __tablename__ = 'lecture_contents'
+    
+    content_hash = db.Column(db.String(64), primary_key=True)  # sha256 of normalized content
+    # Read in chunks by LectureContentStore.iter_content; loads only on access
+    content = db.deferred(db.Column(db.Text, nullable=False))
+    size_bytes = db.Column(db.Integer, nullable=False)
+    simhash = db.Column(db.BigInteger)  # 64-bit fingerprint, stored signed
+    # 16-bit slices of the simhash; near-duplicates share at least one
+    simhash_band0 = db.Column(db.Integer, index=True)
+    simhash_band1 = db.Column(db.Integer, index=True)
+    simhash_band2 = db.Column(db.Integer, index=True)
+    simhash_band3 = db.Column(db.Integer, index=True)
+    summary_data = db.Column(db.JSON)  # Cached summarizer output
+    summary_source = db.Column(db.String(20))  # summarized, near_duplicate
+    duplicate_of = db.Column(db.String(64))  # content_hash the summary was reused from
+    ref_count = db.Column(db.Integer, default=0)  # LectureNotes using this content
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class LectureNote(db.Model):
     """Model for storing lecture notes and summaries"""
     __tablename__ = 'lecture_notes'
@@ -12,8 +43,13 @@ class LectureNote(db.Model):
     note_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
-    original_content = db.Column(db.Text, nullable=False)
-    summary_data = db.Column(db.JSON)  # Stores full summary JSON
+    # Large columns load on first access (or with undefer_group('body')), not in list queries
+    original_content = db.deferred(db.Column(db.Text, nullable=False), group='body')  # Empty when stored in lecture_contents
+    content_hash = db.Column(db.String(64), db.ForeignKey('lecture_contents.content_hash'), index=True)
+    summary_data = db.deferred(db.Column(db.JSON), group='body')  # Stores full summary JSON
+    preview = db.Column(db.String(PREVIEW_LENGTH + 3))  # make_preview() of the content
+    question_count = db.Column(db.Integer, default=0)
+    concept_count = db.Column(db.Integer, default=0)
     subject = db.Column(db.String(100))
     tags = db.Column(db.String(500))  # Comma-separated tags
     word_count = db.Column(db.Integer)
@@ -23,27 +59,47 @@ class LectureNote(db.Model):
     
     # Relationships
     user = db.relationship('User', backref='lecture_notes')
+    content_blob = db.relationship('LectureContent')
     
-    def to_dict(self):
-        """Convert to dictionary"""
+    # Per-user lists, newest first
+    __table_args__ = (
+        db.Index('ix_lecture_notes_user_created_at', 'user_id', 'created_at'),
+    )
+    
+    @property
+    def content(self):
+        """Transcript text, from the shared content blob when deduplicated"""
+        if self.content_hash and self.content_blob is not None:
+            return self.content_blob.content
+        return self.original_content
+    
+    def to_list_dict(self):
+        """Convert to dictionary for list views (never loads the deferred columns)"""
         return {
             'note_id': self.note_id,
             'user_id': self.user_id,
             'title': self.title,
-            'original_content': self.original_content[:500] + '...' if len(self.original_content) > 500 else self.original_content,
-            'summary_data': self.summary_data,
+            'original_content': self.preview if self.preview is not None else make_preview(self.content),
             'subject': self.subject,
             'tags': self.tags.split(',') if self.tags else [],
             'word_count': self.word_count,
+            'question_count': self.question_count or 0,
+            'concept_count': self.concept_count or 0,
             'status': self.status,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
     
+    def to_dict(self):
+        """Convert to dictionary"""
+        data = self.to_list_dict()
+        data['summary_data'] = self.summary_data
+        return data
+    
     def to_dict_full(self):
         """Convert to dictionary with full content"""
         data = self.to_dict()
-        data['original_content'] = self.original_content
+        data['original_content'] = self.content
         return data
 
 
@@ -0,0 +1,197 @@
+"""
+Schema Migrations
+Ordered, idempotent data/schema migrations recorded in schema_migrations
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from database import db
+
+
+class SchemaMigration(db.Model):
+    """Applied migration record"""
+    __tablename__ = 'schema_migrations'
+
+    migration_id = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# (migration_id, function) in the order they must run
+MIGRATIONS: List[Tuple[str, Callable]] = []
+
+
+def migration(migration_id: str):
+    """Register a migration function under an ordered id"""
+    def decorator(f):
+        MIGRATIONS.append((migration_id, f))
+        return f
+    return decorator
+
+
+def run_migrations() -> List[str]:
+    """
+    Apply pending migrations (requires an app context)
+
+    Tables are created with db.create_all() beforehand; migrations only
+    move data or add what create_all cannot (columns, indexes).
+
+    Returns:
+        list: Ids of migrations applied in this run
+    """
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = {row.migration_id for row in SchemaMigration.query.all()}
+    ran = []
+
+    for migration_id, func in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        try:
+            func()
+            db.session.add(SchemaMigration(migration_id=migration_id))
+            db.session.commit()
+            ran.append(migration_id)
+            print(f"[OK] Applied migration {migration_id}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Migration {migration_id} failed: {e}")
+            break
+
+    return ran
+
+
+# ==================== Migrations ====================
+
+@migration('0001_context_messages_from_blob')
+def migrate_context_blobs(batch_size: int = 500):
+    """Move conversation_contexts.context_data JSON arrays into context_messages"""
+    import json
+    from backend.context_manager import (
+        ConversationContext, ContextMessage, message_to_row
+    )
+
+    ContextMessage.__table__.create(db.engine, checkfirst=True)
+
+    while True:
+        contexts = ConversationContext.query.filter(
+            ConversationContext.context_data.notin_(['', '[]'])
+        ).limit(batch_size).all()
+
+        if not contexts:
+            break
+
+        rows = []
+        for context in contexts:
+            try:
+                messages = json.loads(context.context_data) or []
+            except ValueError:
+                messages = []
+            rows.extend(
+                message_to_row(context.session_id, seq, message)
+                for seq, message in enumerate(messages, start=1)
+                if isinstance(message, dict)
+            )
+            context.message_count = len(messages)
+            context.context_data = '[]'
+
+        if rows:
+            db.session.execute(db.insert(ContextMessage), rows)
+        # Each batch moves its messages and clears the blobs atomically
+        db.session.commit()
+
+
+@migration('0002_expiry_indexes')
+def add_expiry_indexes():
+    """Index the timestamps the expiry sweeper filters and orders by"""
+    from backend.context_manager import ConversationContext
+    from database.models import Session
+
+    for column in (ConversationContext.last_active, Session.started_at, Session.ended_at):
+        for index in column.table.indexes:
+            if list(index.columns) == [column]:
+                index.create(db.engine, checkfirst=True)
+
+
+@migration('0003_lecture_content_hash')
+def add_lecture_content_hash():
+    """Add lecture_notes.content_hash for notes sharing deduplicated content"""
+    from database.lecture_notes_model import LectureNote
+
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns('lecture_notes')}
+    if 'content_hash' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ALTER TABLE lecture_notes ADD COLUMN content_hash VARCHAR(64)'))
+
+    for index in LectureNote.__table__.indexes:
+        if list(index.columns) == [LectureNote.content_hash]:
+            index.create(db.engine, checkfirst=True)
+
+
+@migration('0004_lecture_note_list_columns')
+def add_lecture_note_list_columns(batch_size: int = 500):
+    """Add and backfill the preview and counter columns note lists read"""
+    from database.lecture_notes_model import (
+        LectureContent, LectureNote, StudyQuestion, KeyConcept, make_preview
+    )
+
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns('lecture_notes')}
+    with db.engine.begin() as conn:
+        for name, ddl in (('preview', 'VARCHAR(503)'),
+                          ('question_count', 'INTEGER DEFAULT 0'),
+                          ('concept_count', 'INTEGER DEFAULT 0')):
+            if name not in columns:
+                conn.execute(db.text(f'ALTER TABLE lecture_notes ADD COLUMN {name} {ddl}'))
+
+    for column, child in ((LectureNote.question_count, StudyQuestion),
+                          (LectureNote.concept_count, KeyConcept)):
+        counts = db.select(db.func.count()).where(child.note_id == LectureNote.note_id)
+        db.session.execute(db.update(LectureNote).values({column: counts.scalar_subquery()}))
+    db.session.commit()
+
+    # Previews need the transcript, so read it a batch of notes at a time
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(LectureNote.note_id,
+                      db.func.coalesce(LectureContent.content, LectureNote.original_content))
+            .outerjoin(LectureContent, LectureNote.content_hash == LectureContent.content_hash)
+            .where(LectureNote.note_id > last_id, LectureNote.preview.is_(None))
+            .order_by(LectureNote.note_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(
+            db.update(LectureNote.__table__)
+            .where(LectureNote.__table__.c.note_id == db.bindparam('b_note_id'))
+            .values(preview=db.bindparam('b_preview')),
+            [{'b_note_id': note_id, 'b_preview': make_preview(content)} for note_id, content in rows]
+        )
+        db.session.commit()
+        last_id = rows[-1][0]
+
+
+@migration('0005_keyset_pagination_indexes')
+def add_keyset_indexes():
+    """Composite indexes for the newest-first keyset listings"""
+    from database.models import User, Conversation, Feedback, KnowledgeBase
+
+    names = ('ix_users_created_at', 'ix_conversations_user_timestamp',
+             'ix_feedback_created_at', 'ix_knowledge_base_status_created_at')
+    for model in (User, Conversation, Feedback, KnowledgeBase):
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(db.engine, checkfirst=True)
+
+
+@migration('0006_hot_path_indexes')
+def add_hot_path_indexes():
+    """Index conversation sessions, feedback ratings and per-user lecture lists"""
+    from database.models import Conversation, Feedback
+    from database.lecture_notes_model import LectureNote
+
+    names = ('ix_conversations_session_id', 'ix_feedback_rating_created_at',
+             'ix_lecture_notes_user_created_at')
+    for model in (Conversation, Feedback, LectureNote):
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(db.engine, checkfirst=True)
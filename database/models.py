@@ -50,6 +50,9 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 
+db.Index('ix_users_created_at', User.created_at.desc(), User.user_id.desc())
+
+
 class Conversation(db.Model):
     """Conversation model for storing chat history"""
     __tablename__ = 'conversations'
@@ -62,7 +65,7 @@ class Conversation(db.Model):
     sentiment = db.Column(db.Enum('positive', 'negative', 'neutral', name='sentiment_types'), default='neutral')
     confidence_score = db.Column(db.Float, default=0.0)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    session_id = db.Column(db.String(100), db.ForeignKey('sessions.session_id'))
+    session_id = db.Column(db.String(100), db.ForeignKey('sessions.session_id'), index=True)
     
     # Relationships
     feedback = db.relationship('Feedback', backref='conversation', uselist=False, cascade='all, delete-orphan')
@@ -85,6 +88,11 @@ class Conversation(db.Model):
         return f'<Conversation {self.conversation_id}>'
 
 
+# Keyset pagination indexes: equality filters first, then (sort column, id)
+db.Index('ix_conversations_user_timestamp', Conversation.user_id,
+         Conversation.timestamp.desc(), Conversation.conversation_id.desc())
+
+
 class Feedback(db.Model):
     """Feedback model for user ratings"""
     __tablename__ = 'feedback'
@@ -111,6 +119,10 @@ class Feedback(db.Model):
         return f'<Feedback {self.feedback_id} - {self.rating}>'
 
 
+db.Index('ix_feedback_created_at', Feedback.created_at.desc(), Feedback.feedback_id.desc())
+db.Index('ix_feedback_rating_created_at', Feedback.rating, Feedback.created_at)
+
+
 class KnowledgeBase(db.Model):
     """Knowledge base model for learning system"""
     __tablename__ = 'knowledge_base'
@@ -147,6 +159,10 @@ class KnowledgeBase(db.Model):
         return f'<KnowledgeBase {self.kb_id} - {self.status}>'
 
 
+db.Index('ix_knowledge_base_status_created_at', KnowledgeBase.status,
+         KnowledgeBase.created_at.desc(), KnowledgeBase.kb_id.desc())
+
+
 class Session(db.Model):
     """Session model for tracking user sessions"""
     __tablename__ = 'sessions'
@@ -155,8 +171,8 @@ class Session(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.Text)
-    started_at = db.Column(db.DateTime, default=datetime.utcnow)
-    ended_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    ended_at = db.Column(db.DateTime, index=True)
     
     # Relationships
     conversations = db.relationship('Conversation', backref='session', lazy='dynamic')
@@ -201,3 +217,14 @@ class Analytics(db.Model):
     
     def __repr__(self):
         return f'<Analytics User:{self.user_id}>'
+
+
+class ReplicaHeartbeat(db.Model):
+    """Single-row timestamp written on the primary to measure replica lag"""
+    __tablename__ = 'replica_heartbeat'
+    
+    heartbeat_id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReplicaHeartbeat {self.beat_at}>'
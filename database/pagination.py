@@ -0,0 +1,199 @@
+"""
+Keyset Pagination
+Seek-method pages ordered by (sort column, id) with opaque cursors: each
+page is one indexed range scan, however deep, and the total count is only
+computed on request and then cached briefly
+"""
+import base64
+import json
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import db
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor"""
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    """
+    Opaque cursor for the position after a row
+
+    Args:
+        sort_value: Row's sort column value (datetime, number or string)
+        row_id: Row's primary key
+
+    Returns:
+        str: URL-safe token
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = {'t': sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    """
+    Position encoded by encode_cursor
+
+    Raises:
+        InvalidCursorError: Malformed cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if isinstance(sort_value, dict) and list(sort_value) == ['t']:
+            sort_value = datetime.fromisoformat(sort_value['t'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError('Invalid pagination cursor') from e
+
+    # Anything else would reach the SQL comparison and fail there
+    valid_sort = isinstance(sort_value, (datetime, str, int, float)) and \
+        not isinstance(sort_value, bool) and \
+        not (isinstance(sort_value, float) and not math.isfinite(sort_value))
+    valid_id = isinstance(row_id, int) and not isinstance(row_id, bool)
+    if not (valid_sort and valid_id):
+        raise InvalidCursorError('Invalid pagination cursor')
+    return sort_value, row_id
+
+
+class KeysetPage:
+    """One page of results and the cursor for the next"""
+
+    def __init__(self, items: List, per_page: int, next_cursor: Optional[str],
+                 total: Optional[int] = None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+    def to_dict(self) -> Dict:
+        """Pagination block for API responses (total only when counted)"""
+        data = {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more
+        }
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+class CountCache:
+    """Short-lived cache of COUNT(*) results per listing"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds a count is reused
+            max_entries: Counts kept at most (oldest dropped first)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts = {}  # key -> (expires_at, count)
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], int]) -> int:
+        """Cached count for key, computing it when missing or expired"""
+        now = time.monotonic()
+        entry = self._counts.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        count = compute()
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                del self._counts[next(iter(self._counts))]
+            self._counts[key] = (now + self.ttl, count)
+        return count
+
+    def invalidate(self, prefix: str = ''):
+        """Drop cached counts whose key starts with prefix (all by default)"""
+        with self._lock:
+            for key in [k for k in self._counts if k.startswith(prefix)]:
+                del self._counts[key]
+
+
+# Global count cache instance
+count_cache = CountCache()
+
+
+def keyset_paginate(query, sort_column, id_column, cursor: Optional[str] = None,
+                    per_page: int = 20, with_total: bool = False,
+                    count_key: Optional[str] = None,
+                    key: Optional[Callable] = None) -> KeysetPage:
+    """
+    Newest-first page of a query, after the row a cursor points at
+
+    Rows are ordered by (sort_column DESC, id_column DESC); an index on
+    the query's equality filters followed by those two columns makes the
+    seek a single range scan.
+
+    Args:
+        query: Filtered ORM query (not yet ordered or limited)
+        sort_column: Non-null column to order by, e.g. a timestamp
+        id_column: Unique tiebreaker, usually the primary key
+        cursor: next_cursor of the previous page (None for the first page)
+        per_page: Rows per page
+        with_total: Also count all matching rows
+        count_key: Cache the count under this key in count_cache
+        key: item -> (sort value, id), for queries returning tuples
+
+    Returns:
+        KeysetPage: Items, next cursor and optional total
+
+    Raises:
+        InvalidCursorError: Malformed cursor
+    """
+    per_page = max(1, per_page)
+    key = key or (lambda item: (getattr(item, sort_column.key), getattr(item, id_column.key)))
+
+    total = None
+    if with_total:
+        def count():
+            return query.order_by(None).count()
+        total = count_cache.get(count_key, count) if count_key else count()
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            sort_column < sort_value,
+            db.and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    items = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(*key(items[-1]))
+
+    return KeysetPage(items, per_page, next_cursor, total)
+
+
+def pagination_args(request, default_per_page: int = 20,
+                    max_per_page: int = 100) -> Tuple[Optional[str], int, bool]:
+    """
+    Read ?cursor=, ?per_page= and ?include_total= from a request
+
+    Args:
+        request: Flask request
+        default_per_page: per_page when not given
+        max_per_page: Largest per_page allowed (larger values are clamped)
+
+    Returns:
+        tuple: (cursor, per_page, with_total)
+    """
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    return (
+        request.args.get('cursor') or None,
+        min(max(per_page, 1), max_per_page),
+        request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+    )
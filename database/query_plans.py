@@ -0,0 +1,114 @@
+"""
+Query Plan Audit
+Captures the SQL a block of code runs and EXPLAINs it on the current
+database (SQLite, PostgreSQL or MySQL) to find statements that read a
+whole table instead of using an index
+"""
+import re
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+
+from database import db
+
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+@contextmanager
+def capture_queries():
+    """
+    Record SELECT statements executed inside the block (requires app context)
+
+    Yields:
+        list: (sql, parameters) tuples, appended as statements run
+    """
+    captured = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            captured.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
+
+
+def explain(statement: str, parameters=()) -> List[str]:
+    """
+    Query plan for a SQL statement as text lines
+
+    Args:
+        statement: SQL with driver-style placeholders
+        parameters: Bound parameters
+
+    Returns:
+        list: Plan lines (MySQL rows are rendered as "table type key")
+    """
+    conn = db.session.connection()
+    dialect = conn.dialect.name
+
+    if dialect == 'sqlite':
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return [str(row[-1]) for row in rows]
+    if dialect == 'mysql':
+        rows = conn.exec_driver_sql(f'EXPLAIN {statement}', parameters).mappings()
+        return [f"{row['table']} {row['type']} {row['key']}" for row in rows]
+    rows = conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+    return [str(row[0]) for row in rows]
+
+
+def full_scans(plan: List[str], dialect: str) -> List[str]:
+    """
+    Tables a plan reads in full without an index
+
+    Index-ordered scans ("SCAN t USING INDEX") do not count: with a LIMIT
+    they stop early, and without one they at least avoid a sort.
+
+    Args:
+        plan: Lines from explain()
+        dialect: Database dialect name
+
+    Returns:
+        list: Table names
+    """
+    tables = []
+    for line in plan:
+        if dialect == 'sqlite':
+            match = _SQLITE_SCAN.match(line.strip())
+            if match and 'USING' not in line and match.group(1) != 'CONSTANT':
+                tables.append(match.group(1))
+        elif dialect == 'mysql':
+            table, scan_type, _ = line.split(' ', 2)
+            if scan_type == 'ALL':
+                tables.append(table)
+        else:
+            tables.extend(_POSTGRES_SCAN.findall(line))
+    return tables
+
+
+def audit(statements: List[Tuple]) -> List[Dict]:
+    """
+    EXPLAIN captured statements (requires app context)
+
+    Args:
+        statements: (sql, parameters) tuples from capture_queries()
+
+    Returns:
+        list: {'sql', 'plan', 'full_scans'} per statement
+    """
+    dialect = db.session.connection().dialect.name
+    report = []
+    for statement, parameters in statements:
+        plan = explain(statement, parameters)
+        report.append({
+            'sql': ' '.join(statement.split()),
+            'plan': plan,
+            'full_scans': full_scans(plan, dialect)
+        })
+    return report
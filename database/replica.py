@@ -0,0 +1,211 @@
+"""
+Read-Replica Routing
+Queries issued inside read_only() go to the REPLICA_DATABASE_URL engine
+while it is reachable and within the replication-lag tolerance, and to
+the primary otherwise; flushes and INSERT/UPDATE/DELETE statements always
+use the primary
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+
+_read_only: ContextVar[bool] = ContextVar('read_only', default=False)
+
+
+@contextmanager
+def read_only(enabled: bool = True):
+    """
+    Route reads in the block (or decorated function) to the replica
+
+    Reads here may trail the primary by up to REPLICA_MAX_LAG seconds and
+    do not see this session's uncommitted changes.
+
+    Args:
+        enabled: False runs the block against the primary
+    """
+    token = _read_only.set(enabled)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def in_read_only() -> bool:
+    """Whether the current context routes reads to the replica"""
+    return _read_only.get()
+
+
+class ReplicaRouter:
+    """Decides whether the replica may serve reads"""
+
+    def __init__(self, max_lag: float = 0, check_interval: float = 5.0):
+        """
+        Initialize router
+
+        Args:
+            max_lag: Seconds the replica may trail the primary (0 skips the
+                     lag check and only tests the connection)
+            check_interval: Seconds between health checks
+        """
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the last health check"""
+        self.healthy = True
+        self.lag = None
+        self.last_error = None
+        self.checks = 0
+        self.failed_checks = 0
+        self._next_check = 0.0
+
+    def engine(self, primary, replica) -> Optional[object]:
+        """
+        Replica engine to read from, or None to use the primary
+
+        Args:
+            primary: Primary engine
+            replica: Replica engine (None when not configured)
+        """
+        if replica is None:
+            return None
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            # One request re-checks; the others use the previous result meanwhile
+            try:
+                self.check(primary, replica)
+            finally:
+                self._lock.release()
+        return replica if self.healthy else None
+
+    def check(self, primary, replica) -> bool:
+        """
+        Test the replica and measure its lag
+
+        The primary's heartbeat row is read, compared with the replica's
+        copy and then advanced, so lag is measured to within one check
+        interval.
+
+        Args:
+            primary: Primary engine
+            replica: Replica engine
+
+        Returns:
+            bool: Whether the replica may serve reads
+        """
+        from database import db
+        from database.models import ReplicaHeartbeat
+
+        table = ReplicaHeartbeat.__table__
+        select_beat = db.select(table.c.beat_at).where(table.c.heartbeat_id == 1)
+        self.checks += 1
+        self._next_check = time.monotonic() + self.check_interval
+
+        try:
+            if not self.max_lag:
+                with replica.connect() as conn:
+                    conn.exec_driver_sql('SELECT 1')
+                self.healthy, self.lag, self.last_error = True, None, None
+                return True
+
+            with replica.connect() as conn:
+                replica_beat = conn.execute(select_beat).scalar()
+            with primary.begin() as conn:
+                primary_beat = conn.execute(select_beat).scalar()
+                now = datetime.utcnow()
+                if primary_beat is None:
+                    conn.execute(db.insert(table).values(heartbeat_id=1, beat_at=now))
+                else:
+                    conn.execute(db.update(table).where(table.c.heartbeat_id == 1).values(beat_at=now))
+        except Exception as e:
+            self.healthy, self.lag, self.last_error = False, None, str(e)
+            self.failed_checks += 1
+            return False
+
+        if primary_beat is None:
+            lag = 0.0  # First heartbeat; nothing to compare yet
+        elif replica_beat is None:
+            lag = None  # The replica has not received any heartbeat
+        else:
+            lag = max((primary_beat - replica_beat).total_seconds(), 0.0)
+
+        self.lag = lag
+        self.healthy = lag is not None and lag <= self.max_lag
+        self.last_error = None if self.healthy else 'Replica lag exceeds tolerance'
+        if not self.healthy:
+            self.failed_checks += 1
+        return self.healthy
+
+    def get_stats(self) -> Dict:
+        """Get replica health and lag"""
+        return {
+            'healthy': self.healthy,
+            'lag_seconds': self.lag,
+            'max_lag': self.max_lag,
+            'checks': self.checks,
+            'failed_checks': self.failed_checks,
+            'last_error': self.last_error
+        }
+
+
+# Global replica router instance
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends read_only() reads to the replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _read_only.get() and not self._flushing
+                and not getattr(clause, 'is_dml', False)):
+            replica = replica_router.engine(
+                self._db.engine, current_app.extensions.get('replica_engine'))
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_replica(app):
+    """
+    Create the replica engine from REPLICA_DATABASE_URL (same pool options
+    and SQLite pragmas as the primary) and configure routing
+
+    Args:
+        app: Flask application
+
+    Returns:
+        ReplicaRouter: Configured router
+    """
+    from database.engine import apply_sqlite_pragmas, engine_options
+
+    replica_router.max_lag = app.config.get('REPLICA_MAX_LAG', 0)
+    replica_router.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', 5.0)
+    replica_router.reset()
+
+    url = app.config.get('REPLICA_DATABASE_URL')
+    if not url:
+        app.extensions['replica_engine'] = None
+        print("[OK] No read replica configured; read_only() uses the primary")
+        return replica_router
+
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database and not os.path.isabs(url.database):
+        # Relative SQLite paths resolve like the primary's, to the instance folder
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    engine = create_engine(url, **engine_options(url.render_as_string(hide_password=False), app.config))
+    apply_sqlite_pragmas(engine, app.config)
+    app.extensions['replica_engine'] = engine
+
+    print(f"[OK] Read replica routing enabled (max lag={replica_router.max_lag or 'unchecked'})")
+    return replica_router
@@ -5,7 +5,10 @@ Real-time monitoring, analytics visualization, pattern management, and system co
 from flask import Blueprint, render_template, request, session, jsonify, redirect, url_for, current_app
 from database import db
 from database.db_manager import DatabaseManager
+from database.pagination import InvalidCursorError, keyset_paginate, pagination_args
+from database.replica import read_only
 from backend.utils import login_required, admin_required, success_response, error_response
+from backend.principal_cache import principal_cache
 from datetime import datetime, timedelta
 from sqlalchemy import func, desc
 import json
@@ -26,6 +29,7 @@ def dashboard():
 @admin_bp.route('/stats/overview', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_overview_stats():
     """Get overview statistics for dashboard"""
     try:
@@ -61,12 +65,12 @@ def get_overview_stats():
         # Feedback stats
         positive_feedback = db.session.query(func.count(Feedback.feedback_id)).filter(
             Feedback.rating == 'good',
-            Feedback.timestamp >= start_date
+            Feedback.created_at >= start_date
         ).scalar()
         
         negative_feedback = db.session.query(func.count(Feedback.feedback_id)).filter(
             Feedback.rating.in_(['bad', 'improvement']),
-            Feedback.timestamp >= start_date
+            Feedback.created_at >= start_date
         ).scalar()
         
         satisfaction_rate = 0
@@ -101,6 +105,7 @@ def get_overview_stats():
 @admin_bp.route('/stats/conversations-timeline', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_conversations_timeline():
     """Get conversations timeline for chart"""
     try:
@@ -134,6 +139,7 @@ def get_conversations_timeline():
 @admin_bp.route('/stats/sentiment-distribution', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_sentiment_distribution():
     """Get sentiment distribution for pie chart"""
     try:
@@ -169,6 +175,7 @@ def get_sentiment_distribution():
 @admin_bp.route('/stats/category-breakdown', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_category_breakdown():
     """Get conversation category breakdown"""
     try:
@@ -199,6 +206,7 @@ def get_category_breakdown():
 @admin_bp.route('/stats/top-users', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_top_users():
     """Get most active users"""
     try:
@@ -238,13 +246,13 @@ def get_top_users():
 @admin_bp.route('/users', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def manage_users():
     """User management page"""
     try:
         from database.models import User
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor, per_page, with_total = pagination_args(request)
         search = request.args.get('search', '').strip()
         
         query = User.query
@@ -255,9 +263,8 @@ def manage_users():
                 (User.email.ilike(f'%{search}%'))
             )
         
-        users = query.order_by(desc(User.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        users = keyset_paginate(query, User.created_at, User.user_id, cursor, per_page,
+                                with_total, count_key=None if search else 'users')
         
         users_data = [{
             'user_id': user.user_id,
@@ -271,14 +278,11 @@ def manage_users():
         
         return success_response({
             'users': users_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': users.total,
-                'pages': users.pages
-            }
+            'pagination': users.to_dict()
         })
         
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"Error managing users: {str(e)}")
         return error_response('Failed to get users', 500)
@@ -303,6 +307,7 @@ def toggle_user_status(user_id):
         user.is_active = not user.is_active
         user.updated_at = datetime.now()
         db.session.commit()
+        principal_cache.invalidate(user_id)
         
         return success_response({
             'message': f"User {'activated' if user.is_active else 'deactivated'} successfully",
@@ -340,6 +345,7 @@ def update_user_role(user_id):
         user.role = new_role
         user.updated_at = datetime.now()
         db.session.commit()
+        principal_cache.invalidate(user_id)
         
         return success_response({
             'message': f"User role updated to {new_role}",
@@ -355,24 +361,21 @@ def update_user_role(user_id):
 @admin_bp.route('/knowledge/pending', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_pending_knowledge():
     """Get pending knowledge base entries for review"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor, per_page, with_total = pagination_args(request)
         
-        knowledge = db_manager.get_all_knowledge('pending', page, per_page)
+        knowledge = db_manager.get_all_knowledge('pending', cursor, per_page, with_total)
         
         return success_response({
             'knowledge': [k.to_dict() for k in knowledge.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': knowledge.total,
-                'pages': knowledge.pages
-            }
+            'pagination': knowledge.to_dict()
         })
         
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"Error getting pending knowledge: {str(e)}")
         return error_response('Failed to get pending knowledge', 500)
@@ -607,13 +610,13 @@ def clear_system_cache():
 @admin_bp.route('/feedback/all', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_all_feedback():
     """Get all feedback with filters"""
     try:
         from database.models import Feedback, User, Conversation
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor, per_page, with_total = pagination_args(request)
         rating_filter = request.args.get('rating', None)
         
         query = db.session.query(
@@ -629,8 +632,10 @@ def get_all_feedback():
         if rating_filter:
             query = query.filter(Feedback.rating == rating_filter)
         
-        feedback_list = query.order_by(desc(Feedback.timestamp)).paginate(
-            page=page, per_page=per_page, error_out=False
+        feedback_list = keyset_paginate(
+            query, Feedback.created_at, Feedback.feedback_id, cursor, per_page, with_total,
+            count_key=f'feedback:{rating_filter or "all"}:joined',
+            key=lambda item: (item.Feedback.created_at, item.Feedback.feedback_id)
         )
         
         feedback_data = [{
@@ -638,21 +643,18 @@ def get_all_feedback():
             'conversation_id': item.Feedback.conversation_id,
             'rating': item.Feedback.rating,
             'comments': item.Feedback.comments,
-            'timestamp': item.Feedback.timestamp.isoformat(),
+            'timestamp': item.Feedback.created_at.isoformat(),
             'username': item.username,
             'message': item.message[:100] + '...' if len(item.message) > 100 else item.message
         } for item in feedback_list.items]
         
         return success_response({
             'feedback': feedback_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': feedback_list.total,
-                'pages': feedback_list.pages
-            }
+            'pagination': feedback_list.to_dict()
         })
         
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"Error getting feedback: {str(e)}")
         return error_response('Failed to get feedback', 500)
@@ -661,6 +663,7 @@ def get_all_feedback():
 @admin_bp.route('/conversations/recent', methods=['GET'])
 @login_required
 @admin_required
+@read_only()
 def get_recent_conversations():
     """Get recent conversations for monitoring"""
     try:
@@ -695,3 +698,61 @@ def get_recent_conversations():
     except Exception as e:
         print(f"Error getting recent conversations: {str(e)}")
         return error_response('Failed to get conversations', 500)
+
+
+@admin_bp.route('/conversations/export', methods=['GET'])
+@login_required
+@admin_required
+@read_only()
+def export_conversations():
+    """Stream conversations (?format=csv|ndjson|json, ?gzip=1, ?user_id=, ?days=)"""
+    try:
+        from backend.analytics import Analytics, CONVERSATION_EXPORT_FIELDS
+        from backend.streaming_export import export_args, export_response
+        
+        format_type, compress = export_args(request)
+        if format_type is None:
+            return error_response('Format must be csv, ndjson or json', 400)
+        
+        rows = Analytics(db_manager).iter_conversation_rows(
+            user_id=request.args.get('user_id', None, type=int),
+            days=request.args.get('days', None, type=int)
+        )
+        return export_response(
+            rows, CONVERSATION_EXPORT_FIELDS, format_type,
+            filename=f"conversations_{datetime.utcnow().strftime('%Y%m%d')}",
+            compress=compress
+        )
+        
+    except Exception as e:
+        print(f"Error exporting conversations: {str(e)}")
+        return error_response('Export failed', 500)
+
+
+@admin_bp.route('/feedback/export', methods=['GET'])
+@login_required
+@admin_required
+@read_only()
+def export_feedback():
+    """Stream feedback with its conversation (?format=csv|ndjson|json, ?gzip=1, ?rating=, ?days=)"""
+    try:
+        from backend.feedback_collector import FeedbackCollector, FEEDBACK_EXPORT_FIELDS
+        from backend.streaming_export import export_args, export_response
+        
+        format_type, compress = export_args(request)
+        if format_type is None:
+            return error_response('Format must be csv, ndjson or json', 400)
+        
+        rows = FeedbackCollector(db_manager).iter_feedback_rows(
+            days=request.args.get('days', None, type=int),
+            rating=request.args.get('rating', None)
+        )
+        return export_response(
+            rows, FEEDBACK_EXPORT_FIELDS, format_type,
+            filename=f"feedback_{datetime.utcnow().strftime('%Y%m%d')}",
+            compress=compress
+        )
+        
+    except Exception as e:
+        print(f"Error exporting feedback: {str(e)}")
+        return error_response('Export failed', 500)
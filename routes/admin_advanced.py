@@ -9,7 +9,14 @@ from backend.bulk_aiml_editor import BulkAIMLEditor
 from backend.pattern_testing_sandbox import PatternTestingSandbox
 from backend.performance_monitor import performance_monitor
 from backend.rate_limiter import rate_limiter
+from backend.tracing import tracer
+from backend.expiry_sweeper import expiry_sweeper
+from backend.logging_system import StructuredLogger
 from database import db
+from database.engine import pool_metrics
+from database.replica import replica_router
+from backend.principal_cache import principal_cache
+from backend.token_revocation import token_revocations
 from datetime import datetime, timedelta
 import os
 
@@ -513,16 +520,32 @@ def deploy_from_sandbox():
 @login_required
 @admin_required
 def get_performance_metrics():
-    """Get current system performance metrics"""
+    """Get latest sampled system performance metrics and short history"""
     try:
-        system_metrics = performance_monitor.get_system_metrics()
-        process_metrics = performance_monitor.get_process_metrics()
+        history_limit = request.args.get('history', 60, type=int)
+        
+        snapshot = performance_monitor.get_latest_snapshot()
+        history = performance_monitor.get_metrics_history(history_limit)
         uptime = performance_monitor.get_uptime()
+        sampler = performance_monitor.sampler
         
         return success_response({
-            'system': system_metrics,
-            'process': process_metrics,
-            'uptime': uptime
+            'system': snapshot['system'],
+            'process': snapshot['process'],
+            'sampled_at': snapshot['timestamp'],
+            'sample_interval': sampler.interval if sampler else None,
+            'history': history,
+            'uptime': uptime,
+            'logging': StructuredLogger.get_async_stats(),
+            'sessions': current_app.session_interface.get_stats()
+                if hasattr(current_app.session_interface, 'get_stats') else None,
+            'jobs': current_app.job_queue.get_stats()
+                if getattr(current_app, 'job_queue', None) else None,
+            'db_pool': pool_metrics.get_stats(),
+            'db_replica': replica_router.get_stats()
+                if current_app.extensions.get('replica_engine') else None,
+            'principals': principal_cache.get_stats(),
+            'token_revocations': token_revocations.get_stats()
         })
     except Exception as e:
         return error_response(f"Failed to get metrics: {str(e)}", 500)
@@ -583,6 +606,42 @@ def get_slow_queries():
         return error_response(f"Failed to get slow queries: {str(e)}", 500)
 
 
+@admin_advanced_bp.route('/performance/query-fingerprints', methods=['GET'])
+@login_required
+@admin_required
+def get_query_fingerprints():
+    """Get normalized queries ranked by total time"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+
+        fingerprints = performance_monitor.get_query_fingerprints(limit)
+
+        return success_response({
+            'fingerprints': fingerprints,
+            'count': len(fingerprints)
+        })
+    except Exception as e:
+        return error_response(f"Failed to get query fingerprints: {str(e)}", 500)
+
+
+@admin_advanced_bp.route('/performance/n-plus-one', methods=['GET'])
+@login_required
+@admin_required
+def get_n_plus_one():
+    """Get detected N+1 query patterns"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+
+        reports = performance_monitor.get_n_plus_one_reports(limit)
+
+        return success_response({
+            'reports': reports,
+            'count': len(reports)
+        })
+    except Exception as e:
+        return error_response(f"Failed to get N+1 reports: {str(e)}", 500)
+
+
 @admin_advanced_bp.route('/performance/errors', methods=['GET'])
 @login_required
 @admin_required
@@ -605,12 +664,62 @@ def identify_bottlenecks():
     """Identify performance bottlenecks"""
     try:
         bottlenecks = performance_monitor.get_bottlenecks()
+        bottlenecks['stage_breakdown'] = tracer.get_stage_breakdown()
+        bottlenecks['tracing_enabled'] = tracer.enabled
         
         return success_response(bottlenecks)
     except Exception as e:
         return error_response(f"Failed to identify bottlenecks: {str(e)}", 500)
 
 
+@admin_advanced_bp.route('/performance/traces', methods=['GET'])
+@login_required
+@admin_required
+def get_recent_traces():
+    """Get recent traces in OpenTelemetry JSON format"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        
+        traces = tracer.get_recent_traces(limit)
+        
+        return success_response({
+            'traces': traces,
+            'count': len(traces),
+            'sample_rate': tracer.sample_rate
+        })
+    except Exception as e:
+        return error_response(f"Failed to get traces: {str(e)}", 500)
+
+
+# ==================== MAINTENANCE ====================
+
+@admin_advanced_bp.route('/maintenance/sweeper', methods=['GET'])
+@login_required
+@admin_required
+def get_sweeper_stats():
+    """Get expiry sweeper totals and the last sweep report"""
+    try:
+        return success_response(expiry_sweeper.get_stats())
+    except Exception as e:
+        return error_response(f"Failed to get sweeper stats: {str(e)}", 500)
+
+
+@admin_advanced_bp.route('/maintenance/sweeper/run', methods=['POST'])
+@login_required
+@admin_required
+def run_sweeper():
+    """Run an expiry sweep now"""
+    try:
+        report = expiry_sweeper.run_once()
+        
+        if report.get('skipped'):
+            return error_response("Another worker is sweeping, try again shortly", 409)
+        
+        return success_response(report, "Sweep completed")
+    except Exception as e:
+        return error_response(f"Failed to run sweep: {str(e)}", 500)
+
+
 # ==================== RATE LIMITING ====================
 
 @admin_advanced_bp.route('/rate-limit/stats', methods=['GET'])
@@ -4,12 +4,21 @@ Admin routes for Lecture Note Summarizer Management
 from flask import Blueprint, request, jsonify, render_template
 from database import db
 from database.lecture_notes_model import LectureNote, StudyQuestion, KeyConcept
+from database.replica import read_only
 from backend.utils import admin_required, success_response, error_response
+from backend.lecture_store import lecture_store
+from backend.streaming_export import export_args, export_response, iter_rows
+from database.models import User
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 
 admin_lecture_bp = Blueprint('admin_lecture', __name__)
 
+NOTE_EXPORT_FIELDS = [
+    'note_id', 'user_id', 'username', 'title', 'subject', 'word_count', 'status',
+    'question_count', 'concept_count', 'created_at', 'tags'
+]
+
 
 @admin_lecture_bp.route('/', methods=['GET'])
 @admin_required
@@ -20,6 +29,7 @@ def lecture_dashboard():
 
 @admin_lecture_bp.route('/overview', methods=['GET'])
 @admin_required
+@read_only()
 def get_lecture_overview():
     """Get overview statistics for lecture notes"""
     try:
@@ -89,7 +99,8 @@ def get_lecture_overview():
             'subject_breakdown': [
                 {'subject': subject or 'Uncategorized', 'count': count}
                 for subject, count in subject_breakdown
-            ]
+            ],
+            'deduplication': lecture_store.get_stats()
         })
         
     except Exception as e:
@@ -99,6 +110,7 @@ def get_lecture_overview():
 
 @admin_lecture_bp.route('/notes', methods=['GET'])
 @admin_required
+@read_only()
 def get_all_notes():
     """Get all lecture notes with filters"""
     try:
@@ -134,7 +146,7 @@ def get_all_notes():
         )
         
         return success_response({
-            'notes': [note.to_dict() for note in notes.items],
+            'notes': [note.to_list_dict() for note in notes.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -150,10 +162,11 @@ def get_all_notes():
 
 @admin_lecture_bp.route('/notes/<int:note_id>', methods=['GET'])
 @admin_required
+@read_only()
 def get_note_detail(note_id):
     """Get detailed note information"""
     try:
-        note = LectureNote.query.get(note_id)
+        note = db.session.get(LectureNote, note_id, options=[db.undefer_group('body')])
         
         if not note:
             return error_response('Note not found', 404)
@@ -186,6 +199,8 @@ def delete_note(note_id):
         
         title = note.title
         db.session.delete(note)
+        db.session.flush()
+        lecture_store.release_notes([note])
         db.session.commit()
         
         return success_response({
@@ -231,6 +246,7 @@ def update_note_status(note_id):
 
 @admin_lecture_bp.route('/users/<int:user_id>/notes', methods=['GET'])
 @admin_required
+@read_only()
 def get_user_notes(user_id):
     """Get all notes for a specific user"""
     try:
@@ -252,7 +268,7 @@ def get_user_notes(user_id):
         ).count()
         
         return success_response({
-            'notes': [note.to_dict() for note in notes.items],
+            'notes': [note.to_list_dict() for note in notes.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -273,6 +289,7 @@ def get_user_notes(user_id):
 
 @admin_lecture_bp.route('/analytics/timeline', methods=['GET'])
 @admin_required
+@read_only()
 def get_notes_timeline():
     """Get timeline of note creation"""
     try:
@@ -307,6 +324,7 @@ def get_notes_timeline():
 
 @admin_lecture_bp.route('/analytics/popular-subjects', methods=['GET'])
 @admin_required
+@read_only()
 def get_popular_subjects():
     """Get most popular subjects"""
     try:
@@ -342,6 +360,7 @@ def get_popular_subjects():
 
 @admin_lecture_bp.route('/analytics/top-users', methods=['GET'])
 @admin_required
+@read_only()
 def get_top_users():
     """Get users with most notes"""
     try:
@@ -404,7 +423,11 @@ def bulk_delete_notes():
             return error_response('Must provide note_ids or status criteria', 400)
         
         count = query.count()
+        shared = query.with_entities(LectureNote.content_hash).filter(
+            LectureNote.content_hash.isnot(None)
+        ).all()
         query.delete(synchronize_session=False)
+        lecture_store.release_notes(shared)
         db.session.commit()
         
         return success_response({
@@ -420,50 +443,41 @@ def bulk_delete_notes():
 
 @admin_lecture_bp.route('/export', methods=['GET'])
 @admin_required
+@read_only()
 def export_notes_data():
-    """Export notes data for analysis"""
+    """Stream notes data for analysis (?format=csv|ndjson|json, ?gzip=1)"""
     try:
-        format_type = request.args.get('format', 'json')
-        
-        notes = LectureNote.query.all()
-        
-        export_data = []
-        for note in notes:
-            export_data.append({
-                'note_id': note.note_id,
-                'user_id': note.user_id,
-                'username': note.user.username if note.user else None,
-                'title': note.title,
-                'subject': note.subject,
-                'word_count': note.word_count,
-                'status': note.status,
-                'question_count': len(note.questions),
-                'concept_count': len(note.concepts),
-                'created_at': note.created_at.isoformat(),
-                'tags': note.tags.split(',') if note.tags else []
-            })
-        
-        if format_type == 'csv':
-            # Convert to CSV format
-            import csv
-            from io import StringIO
-            
-            output = StringIO()
-            if export_data:
-                writer = csv.DictWriter(output, fieldnames=export_data[0].keys())
-                writer.writeheader()
-                writer.writerows(export_data)
-            
-            return success_response({
-                'format': 'csv',
-                'data': output.getvalue()
-            })
-        else:
-            return success_response({
-                'format': 'json',
-                'data': export_data,
-                'total_records': len(export_data)
-            })
+        format_type, compress = export_args(request, default_format='json')
+        if format_type is None:
+            return error_response('Format must be csv, ndjson or json', 400)
+        
+        statement = db.select(
+            LectureNote.note_id,
+            LectureNote.user_id,
+            User.username,
+            LectureNote.title,
+            LectureNote.subject,
+            LectureNote.word_count,
+            LectureNote.status,
+            LectureNote.question_count,
+            LectureNote.concept_count,
+            LectureNote.created_at,
+            LectureNote.tags
+        ).outerjoin(User, LectureNote.user_id == User.user_id).order_by(LectureNote.note_id)
+        
+        def note_row(row):
+            row['question_count'] = row['question_count'] or 0
+            row['concept_count'] = row['concept_count'] or 0
+            row['tags'] = row['tags'].split(',') if row['tags'] else []
+            return row
+        
+        return export_response(
+            iter_rows(statement, transform=note_row),
+            NOTE_EXPORT_FIELDS,
+            format_type,
+            filename=f"lecture_notes_{datetime.utcnow().strftime('%Y%m%d')}",
+            compress=compress
+        )
         
     except Exception as e:
         print(f"Error exporting data: {str(e)}")
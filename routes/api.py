@@ -5,6 +5,7 @@ Main REST API endpoints
 from flask import Blueprint, request, session, jsonify, current_app
 from database import db
 from database.db_manager import DatabaseManager
+from database.pagination import InvalidCursorError, pagination_args
 from backend.utils import login_required, success_response, error_response
 from backend.smart_features import smart_features
 from backend.extended_features import extended_features
@@ -15,6 +16,7 @@ from backend.student_tools import student_tools
 from backend.intelligent_response_system import IntelligentResponseSystem
 from backend.text_formatter import TextFormatter
 from backend.html_formatter import HTMLFormatter
+from backend.tracing import tracer
 from datetime import datetime
 import re
 
@@ -23,6 +25,7 @@ db_manager = DatabaseManager(db)
 
 
 @api_bp.route('/chat', methods=['POST'])
+@tracer.traced('POST /api/chat')
 def chat():
     """Process chat message"""
     try:
@@ -35,6 +38,10 @@ def chat():
         # Get user_id from session or use guest
         user_id = session.get('user_id', 0)  # 0 for guest users
         
+        # Feed trending queries and the user's autocomplete history
+        if getattr(current_app, 'autocomplete', None):
+            current_app.autocomplete.add_to_history(message, session.get('user_id'))
+        
         # Get AIML engine from app
         aiml_engine = current_app.aiml_engine
         
@@ -42,17 +49,19 @@ def chat():
         intelligent_system = IntelligentResponseSystem()
         
         # Check for smart features first
-        smart_response = handle_smart_features(message)
+        with tracer.span('chat.smart_features'):
+            smart_response = handle_smart_features(message)
         if smart_response:
             response = smart_response
             quick_actions = []
             category = 'smart_feature'
         else:
             # Try Intelligent Response System for deep analysis
-            analysis_result = intelligent_system.analyze_and_respond(message, {
-                'user_id': user_id,
-                'session_id': session.get('session_id', 'default')
-            })
+            with tracer.span('chat.intelligent_response'):
+                analysis_result = intelligent_system.analyze_and_respond(message, {
+                    'user_id': user_id,
+                    'session_id': session.get('session_id', 'default')
+                })
             
             if analysis_result:
                 response = analysis_result
@@ -62,8 +71,9 @@ def chat():
             else:
                 # Try Student Helpdesk for educational queries
                 from backend.student_helpdesk import StudentHelpdeskBot
-                helpdesk = StudentHelpdeskBot()
-                helpdesk_response = helpdesk.process_query(message, user_id)
+                with tracer.span('chat.helpdesk'):
+                    helpdesk = StudentHelpdeskBot()
+                    helpdesk_response = helpdesk.process_query(message, user_id)
                 
                 # If helpdesk handled it, use that response
                 if helpdesk_response and 'response' in helpdesk_response:
@@ -72,14 +82,18 @@ def chat():
                     category = helpdesk_response.get('category', 'general')
                 else:
                     # Fall back to AIML engine
-                    response = aiml_engine.get_response(message, session.get('session_id', 'default'))
+                    with tracer.span('chat.aiml'):
+                        response = aiml_engine.get_response(message, session.get('session_id', 'default'))
                     quick_actions = []
                     category = 'general'
         
+        tracer.current_span().set_attribute('chat.category', category)
+        
         # Analyze sentiment
         from backend.learning_module import LearningModule
-        learning = LearningModule(db_manager, aiml_engine)
-        sentiment, confidence = learning.analyze_sentiment(message)
+        with tracer.span('chat.sentiment'):
+            learning = LearningModule(db_manager, aiml_engine)
+            sentiment, confidence = learning.analyze_sentiment(message)
         
         # Track knowledge gaps for failed queries
         is_successful = True
@@ -90,27 +104,29 @@ def chat():
             is_successful = False
             # Track in knowledge gap analyzer
             try:
-                knowledge_gap = current_app.knowledge_gap
-                knowledge_gap.analyze_failed_query(
-                    query=message,
-                    user_id=user_id,
-                    sentiment=sentiment,
-                    confidence=confidence
-                )
+                with tracer.span('chat.knowledge_gap'):
+                    knowledge_gap = current_app.knowledge_gap
+                    knowledge_gap.analyze_failed_query(
+                        query=message,
+                        user_id=user_id,
+                        sentiment=sentiment,
+                        confidence=confidence
+                    )
             except Exception as e:
                 print(f"Knowledge gap tracking error: {e}")
         
         # Save conversation only if user is logged in
         if user_id > 0:
-            conversation = db_manager.create_conversation(
-                user_id=user_id,
-                message=message,
-                response=response,
-                message_type='text',
-                sentiment=sentiment,
-                confidence_score=confidence,
-                session_id=session.get('session_id')
-            )
+            with tracer.span('chat.db_write'):
+                conversation = db_manager.create_conversation(
+                    user_id=user_id,
+                    message=message,
+                    response=response,
+                    message_type='text',
+                    sentiment=sentiment,
+                    confidence_score=confidence,
+                    session_id=session.get('session_id')
+                )
             conversation_id = conversation.conversation_id
         else:
             conversation_id = 0  # Guest conversation
@@ -127,6 +143,7 @@ def chat():
         
     except Exception as e:
         print(f"Error in chat: {str(e)}")
+        tracer.current_span().set_error(e)
         return error_response('Chat failed', 500)
 
 
@@ -241,23 +258,19 @@ def submit_feedback():
 def get_chat_history():
     """Get user's chat history"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor, per_page, with_total = pagination_args(request)
         
         conversations = db_manager.get_user_conversations(
-            session['user_id'], page, per_page
+            session['user_id'], cursor, per_page, with_total
         )
         
         return success_response({
             'conversations': [c.to_dict() for c in conversations.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': conversations.total,
-                'pages': conversations.pages
-            }
+            'pagination': conversations.to_dict()
         })
         
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"Error getting chat history: {str(e)}")
         return error_response('Failed to get chat history', 500)
@@ -267,21 +280,17 @@ def get_chat_history():
 def get_knowledge():
     """Get approved knowledge base entries"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor, per_page, with_total = pagination_args(request)
         
-        knowledge = db_manager.get_all_knowledge('approved', page, per_page)
+        knowledge = db_manager.get_all_knowledge('approved', cursor, per_page, with_total)
         
         return success_response({
             'knowledge': [k.to_dict() for k in knowledge.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': knowledge.total,
-                'pages': knowledge.pages
-            }
+            'pagination': knowledge.to_dict()
         })
         
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"Error getting knowledge: {str(e)}")
         return error_response('Failed to get knowledge', 500)
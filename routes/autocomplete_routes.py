@@ -3,8 +3,7 @@ Autocomplete API Routes
 Provides endpoints for smart autocomplete suggestions
 """
 
-from flask import Blueprint, request, jsonify
-from backend.autocomplete_engine import autocomplete_engine
+from flask import Blueprint, request, jsonify, current_app, session
 
 autocomplete_bp = Blueprint('autocomplete', __name__)
 
@@ -49,7 +48,9 @@ def get_suggestions():
         # Ensure limit is reasonable
         limit = min(max(1, limit), 20)
         
-        suggestions = autocomplete_engine.get_suggestions(query, limit)
+        suggestions = current_app.autocomplete.get_suggestions(
+            query, limit, user_id=session.get('user_id')
+        )
         
         return jsonify({
             'status': 'success',
@@ -90,7 +91,7 @@ def add_to_history():
             }), 400
         
         query = data['query']
-        autocomplete_engine.add_to_history(query)
+        current_app.autocomplete.add_to_history(query, session.get('user_id'))
         
         return jsonify({
             'status': 'success',
@@ -127,7 +128,7 @@ def get_category_suggestions(category):
         limit = request.args.get('limit', 5, type=int)
         limit = min(max(1, limit), 20)
         
-        suggestions = autocomplete_engine.get_category_suggestions(category, limit)
+        suggestions = current_app.autocomplete.get_category_suggestions(category, limit)
         
         return jsonify({
             'status': 'success',
@@ -146,28 +147,40 @@ def get_category_suggestions(category):
 @autocomplete_bp.route('/trending', methods=['GET'])
 def get_trending():
     """
-    Get trending queries from recent history
+    Get trending queries across all users
     
     Query params:
         limit: Number of queries (default: 5)
+        window: hour or day (default: hour)
     
     Returns:
         {
             "status": "success",
             "trending": ["query1", "query2", ...],
+            "counts": [{"query": "query1", "count": 12.5, "error": 0.0}, ...],
+            "window": "hour",
             "count": 5
         }
     """
     try:
         limit = request.args.get('limit', 5, type=int)
         limit = min(max(1, limit), 20)
+        window = request.args.get('window', 'hour')
         
-        trending = autocomplete_engine.get_trending_queries(limit)
+        if window not in current_app.autocomplete.trending.windows:
+            return jsonify({
+                'status': 'error',
+                'message': f'Unknown window: {window}'
+            }), 400
+        
+        counts = current_app.autocomplete.trending.top(window, limit)
         
         return jsonify({
             'status': 'success',
-            'trending': trending,
-            'count': len(trending)
+            'trending': [item['query'] for item in counts],
+            'counts': counts,
+            'window': window,
+            'count': len(counts)
         })
         
     except Exception as e:
@@ -189,7 +202,7 @@ def clear_history():
         }
     """
     try:
-        autocomplete_engine.clear_history()
+        current_app.autocomplete.clear_history(session.get('user_id'))
         
         return jsonify({
             'status': 'success',
@@ -214,14 +227,13 @@ def get_stats():
             "stats": {
                 "total_patterns": 100,
                 "popular_questions": 40,
-                "user_history_size": 25,
-                "max_history": 100,
-                "min_similarity": 0.6
+                "max_history": 20,
+                "trending": {"total_queries": 1200, ...}
             }
         }
     """
     try:
-        stats = autocomplete_engine.get_stats()
+        stats = current_app.autocomplete.get_stats()
         
         return jsonify({
             'status': 'success',
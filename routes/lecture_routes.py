@@ -1,26 +1,149 @@
 """
 Routes for Lecture Note Summarizer
 """
-from flask import Blueprint, request, session, jsonify
+from flask import Blueprint, request, session, jsonify, current_app, url_for
 from database import db
-from database.lecture_notes_model import LectureNote, StudyQuestion, KeyConcept
+from database.lecture_notes_model import LectureNote, StudyQuestion, KeyConcept, make_preview
 from backend.utils import login_required, success_response, error_response
-from backend.lecture_summarizer import LectureSummarizer
+from backend.lecture_summarizer import LectureSummarizer, create_summarizer, iter_text_chunks
+from backend.job_queue import job_queue, BackgroundJob, QueueFullError
+from backend.lecture_store import lecture_store
 from datetime import datetime
+from typing import Optional
 
 lecture_bp = Blueprint('lecture', __name__)
-summarizer = LectureSummarizer()
+_summarizers = {}
+
+TRANSCRIPT_EXTENSIONS = ('.txt', '.md')
+
+
+def get_summarizer() -> LectureSummarizer:
+    """Summarizer for the configured LECTURE_SUMMARIZER_ENGINE"""
+    engine = current_app.config.get('LECTURE_SUMMARIZER_ENGINE', 'tfidf')
+    if engine not in _summarizers:
+        _summarizers[engine] = create_summarizer(engine)
+    return _summarizers[engine]
+
+
+def read_transcript(stream, max_bytes: int) -> Optional[str]:
+    """
+    Read an uploaded transcript, reading at most max_bytes + 1 bytes
+
+    Args:
+        stream: Binary file object of the upload
+        max_bytes: Largest accepted transcript
+
+    Returns:
+        str: Decoded text, or None if the upload is larger than max_bytes
+    """
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        return None
+    return data.decode('utf-8', errors='replace')
+
+
+def save_summary(note: LectureNote, summary_result: dict):
+    """Attach a summary and its study questions/key concepts to a note (not committed)"""
+    note.summary_data = summary_result
+    note.status = 'processed'
+    note.question_count = len(summary_result['study_questions'])
+    note.concept_count = len(summary_result['key_concepts'])
+    
+    # Save study questions
+    for question_data in summary_result['study_questions']:
+        question = StudyQuestion(
+            note_id=note.note_id,
+            question_text=question_data['question'],
+            question_type=question_data['type'],
+            difficulty=question_data['difficulty'],
+            related_concept=question_data['related_concept']
+        )
+        db.session.add(question)
+    
+    # Save key concepts
+    for concept_data in summary_result['key_concepts']:
+        concept = KeyConcept(
+            note_id=note.note_id,
+            term=concept_data['term'],
+            definition=concept_data['definition'],
+            importance=concept_data['importance']
+        )
+        db.session.add(concept)
+
+
+def process_lecture_job(job, payload):
+    """Summarize a pending lecture note (job handler)"""
+    note = db.session.get(LectureNote, payload['note_id'])
+    if note is None:
+        return {'note_id': payload['note_id'], 'deleted': True}
+    if note.status == 'processed':
+        return {'note_id': note.note_id}
+    
+    blob = note.content_blob
+    if blob is not None and blob.summary_data is None:
+        # Reuse the summary of a near-identical transcript if there is one
+        job.progress(5, 'Checking for near-duplicate lectures')
+        near = lecture_store.find_near_duplicate(blob)
+        if near is not None:
+            blob.summary_data = near.summary_data
+            blob.summary_source = 'near_duplicate'
+            blob.duplicate_of = near.content_hash
+    
+    if blob is not None and blob.summary_data is not None:
+        summary_result = lecture_store.summary_for(blob, note.title)
+    else:
+        job.progress(10, 'Summarizing lecture')
+        if blob is not None:
+            chunks = lecture_store.iter_content(blob.content_hash)
+        else:
+            chunks = iter_text_chunks(note.original_content)
+        summary_result = get_summarizer().summarize_stream(chunks, note.title)
+        
+        if not summary_result.get('success'):
+            raise ValueError(summary_result.get('error', 'Summarization failed'))
+        
+        if blob is not None:
+            blob.summary_data = summary_result
+            blob.summary_source = 'summarized'
+    
+    job.progress(80, 'Saving study questions and key concepts')
+    save_summary(note, summary_result)
+    return {'note_id': note.note_id}
+
+
+def mark_lecture_failed(payload, error):
+    """Flag the note once summarization has run out of attempts"""
+    note = db.session.get(LectureNote, payload['note_id'])
+    if note is not None:
+        note.status = 'failed'
+
+
+job_queue.register('lecture_summary', process_lecture_job, on_failure=mark_lecture_failed)
 
 
 @lecture_bp.route('/upload', methods=['POST'])
 @login_required
 def upload_lecture():
-    """Upload and summarize lecture notes"""
+    """Upload lecture notes (JSON, or a multipart text file) and queue them for summarization"""
     try:
-        data = request.get_json()
+        max_bytes = current_app.config.get('LECTURE_MAX_TRANSCRIPT_BYTES', 2 * 1024 * 1024)
+        upload = request.files.get('file')
+        if upload is not None:
+            # Transcript file: form fields carry the metadata
+            if not upload.filename.lower().endswith(TRANSCRIPT_EXTENSIONS):
+                return error_response('Transcript must be a .txt or .md file', 400)
+            data = request.form
+            content = read_transcript(upload.stream, max_bytes)
+            if content is None:
+                return error_response(f'Transcript too large. Maximum {max_bytes} bytes.', 413)
+            content = content.strip()
+        else:
+            data = request.get_json()
+            content = data.get('content', '').strip()
+            if len(content.encode('utf-8')) > max_bytes:
+                return error_response(f'Transcript too large. Maximum {max_bytes} bytes.', 413)
         
         title = data.get('title', '').strip()
-        content = data.get('content', '').strip()
         subject = data.get('subject', '').strip()
         tags = data.get('tags', '')
         
@@ -33,60 +156,57 @@ def upload_lecture():
         if len(content) < 50:
             return error_response('Content too short. Minimum 50 characters required.', 400)
         
-        # Generate summary
-        summary_result = summarizer.summarize_lecture(content, title)
-        
-        if not summary_result.get('success'):
-            return error_response(summary_result.get('error', 'Summarization failed'), 400)
-        
-        # Save to database
+        # Identical transcripts are stored once and share a cached summary
+        blob, _ = lecture_store.acquire(content)
         lecture_note = LectureNote(
             user_id=session['user_id'],
             title=title,
-            original_content=content,
-            summary_data=summary_result,
+            original_content='',
+            content_hash=blob.content_hash,
             subject=subject,
             tags=tags,
             word_count=len(content.split()),
-            status='processed'
+            preview=make_preview(content),
+            status='pending'
         )
-        
         db.session.add(lecture_note)
-        db.session.flush()  # Get note_id
-        
-        # Save study questions
-        for question_data in summary_result['study_questions']:
-            question = StudyQuestion(
-                note_id=lecture_note.note_id,
-                question_text=question_data['question'],
-                question_type=question_data['type'],
-                difficulty=question_data['difficulty'],
-                related_concept=question_data['related_concept']
-            )
-            db.session.add(question)
-        
-        # Save key concepts
-        for concept_data in summary_result['key_concepts']:
-            concept = KeyConcept(
-                note_id=lecture_note.note_id,
-                term=concept_data['term'],
-                definition=concept_data['definition'],
-                importance=concept_data['importance']
-            )
-            db.session.add(concept)
         
+        if blob.summary_data is not None:
+            db.session.flush()
+            save_summary(lecture_note, lecture_store.summary_for(blob, title))
+            db.session.commit()
+            return success_response({
+                'note_id': lecture_note.note_id,
+                'title': title,
+                'status': 'processed',
+                'cached': True,
+                'message': 'Lecture notes processed successfully!'
+            })
+        
+        # Otherwise the summary is filled in by the job
         db.session.commit()
-        
-        # Generate HTML summary
-        html_summary = summarizer.format_summary_html(summary_result)
-        
+        note_id = lecture_note.note_id
+        
+        try:
+            job_id = job_queue.submit('lecture_summary', {'note_id': note_id},
+                                      user_id=session['user_id'])
+        except QueueFullError:
+            db.session.delete(lecture_note)
+            db.session.flush()
+            lecture_store.release_notes([lecture_note])
+            db.session.commit()
+            return error_response('Too many lectures are being processed. Please try again shortly.', 503)
+        
+        job = job_queue.get(job_id)
         return success_response({
-            'note_id': lecture_note.note_id,
+            'note_id': note_id,
             'title': title,
-            'summary': summary_result,
-            'html_summary': html_summary,
-            'message': 'Lecture notes processed successfully!'
-        })
+            'job_id': job_id,
+            'status': job['status'],
+            'status_url': url_for('lecture.get_job', job_id=job_id),
+            'cached': False,
+            'message': 'Lecture notes uploaded and queued for summarization'
+        }, status=200 if job['status'] in ('succeeded', 'failed') else 202)
         
     except Exception as e:
         db.session.rollback()
@@ -94,6 +214,17 @@ def upload_lecture():
         return error_response(f'Upload failed: {str(e)}', 500)
 
 
+@lecture_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Get status and progress of a summarization job"""
+    job = db.session.get(BackgroundJob, job_id)
+    if not job or job.user_id != session['user_id']:
+        return error_response('Job not found', 404)
+    
+    return success_response(job.to_dict())
+
+
 @lecture_bp.route('/notes', methods=['GET'])
 @login_required
 def get_user_notes():
@@ -113,7 +244,7 @@ def get_user_notes():
         )
         
         return success_response({
-            'notes': [note.to_dict() for note in notes.items],
+            'notes': [note.to_list_dict() for note in notes.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -132,7 +263,7 @@ def get_user_notes():
 def get_note_detail(note_id):
     """Get detailed lecture note with full content"""
     try:
-        note = LectureNote.query.filter_by(
+        note = LectureNote.query.options(db.undefer_group('body')).filter_by(
             note_id=note_id,
             user_id=session['user_id']
         ).first()
@@ -140,8 +271,9 @@ def get_note_detail(note_id):
         if not note:
             return error_response('Note not found', 404)
         
-        # Generate fresh HTML
-        html_summary = summarizer.format_summary_html(note.summary_data)
+        # Generate fresh HTML (pending/failed notes have no summary yet)
+        html_summary = get_summarizer().format_summary_html(note.summary_data) \
+            if note.summary_data else None
         
         return success_response({
             'note': note.to_dict_full(),
@@ -169,6 +301,8 @@ def delete_note(note_id):
             return error_response('Note not found', 404)
         
         db.session.delete(note)
+        db.session.flush()
+        lecture_store.release_notes([note])
         db.session.commit()
         
         return success_response({
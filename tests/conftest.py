@@ -62,6 +62,33 @@ def db(app):
         database.drop_all()
 
 
+@pytest.fixture(scope='function')
+def sqlite_app():
+    """Minimal Flask app bound to an in-memory database (no blueprints)"""
+    from flask import Flask
+    from database import db as database
+    from database import models  # noqa: F401 - register models
+    from backend import context_manager  # noqa: F401
+    from database import migrations  # noqa: F401
+    from backend import expiry_sweeper  # noqa: F401
+    from backend import session_store  # noqa: F401
+    from backend import token_revocation  # noqa: F401
+    from backend import job_queue  # noqa: F401
+    from database import lecture_notes_model  # noqa: F401
+    
+    flask_app = Flask(__name__)
+    flask_app.config['TESTING'] = TESTING
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = SQLALCHEMY_TRACK_MODIFICATIONS
+    database.init_app(flask_app)
+    
+    with flask_app.app_context():
+        database.create_all()
+        yield flask_app
+        database.session.remove()
+        database.drop_all()
+
+
 @pytest.fixture(scope='function')
 def session(db):
     """Create database session for tests"""
@@ -434,5 +434,2303 @@ class TestUtils:
         assert len(formatted) > 0
 
 
+
+@pytest.mark.unit
+class TestPerformanceMonitor:
+    """Test Performance Monitor metrics sampling"""
+    
+    def test_sampler_fills_ring_buffer(self):
+        """Test background sampler collects bounded history"""
+        from backend.performance_monitor import SystemMetricsSampler
+        
+        sampler = SystemMetricsSampler(interval=0.1, history_size=3)
+        for _ in range(5):
+            sampler.sample()
+        
+        assert len(sampler.get_history()) == 3
+        assert sampler.latest() is sampler.get_history()[-1]
+        assert 'cpu' in sampler.latest()['system']
+        assert 'open_files' in sampler.latest()['process']
+    
+    def test_metrics_read_does_not_block(self):
+        """Test reading metrics returns instantly from the latest sample"""
+        import time
+        from backend.performance_monitor import PerformanceMonitor
+        
+        monitor = PerformanceMonitor()
+        monitor.start_sampler(interval=0.1, history_size=10)
+        try:
+            time.sleep(0.35)
+            
+            start = time.perf_counter()
+            system = monitor.get_system_metrics()
+            monitor.get_process_metrics()
+            elapsed = time.perf_counter() - start
+            
+            assert elapsed < 0.05
+            assert 'memory' in system
+            assert 1 <= len(monitor.get_metrics_history(5)) <= 5
+        finally:
+            monitor.stop_sampler()
+        
+        assert monitor.sampler is None
+
+
+@pytest.mark.unit
+class TestQueryMonitor:
+    """Test SQL query timing and N+1 detection"""
+
+    def test_fingerprint_normalizes_literals(self):
+        """Test queries differing only by values share a fingerprint"""
+        from backend.query_monitor import fingerprint_sql
+
+        first = fingerprint_sql("SELECT * FROM users WHERE id = 1 AND name = 'bob'")
+        second = fingerprint_sql("SELECT *  FROM users\n WHERE id = 42 AND name = 'it''s'")
+
+        assert first == second == "SELECT * FROM users WHERE id = ? AND name = ?"
+        assert fingerprint_sql("SELECT a FROM t WHERE id IN (?, ?, ?)") == \
+            "SELECT a FROM t WHERE id IN (?)"
+        assert fingerprint_sql("SELECT a FROM t WHERE id = :id_1") == \
+            "SELECT a FROM t WHERE id = ?"
+
+    def test_detects_n_plus_one(self):
+        """Test repeated per-row queries in one request are reported"""
+        from flask import Flask
+        from sqlalchemy import create_engine, text
+        from backend.performance_monitor import PerformanceMonitor
+        from backend.query_monitor import QueryMonitor
+
+        app = Flask(__name__)
+        monitor = PerformanceMonitor()
+        query_monitor = QueryMonitor(monitor=monitor, n_plus_one_threshold=3)
+        query_monitor.init_app(app)
+        engine = create_engine('sqlite://')
+
+        try:
+            with app.test_request_context('/api/export'):
+                with engine.connect() as conn:
+                    for user_id in range(4):
+                        conn.execute(text('SELECT :id'), {'id': user_id})
+
+                stats = query_monitor.get_request_stats()
+                query_monitor._finish_request()
+        finally:
+            query_monitor.uninstall()
+            engine.dispose()
+
+        assert stats['query_count'] == 4
+        assert stats['repeated_queries'][0]['count'] == 4
+
+        reports = monitor.get_n_plus_one_reports()
+        assert len(reports) == 1
+        assert reports[0]['max_repeats'] == 4
+        assert monitor.get_query_fingerprints()[0]['count'] == 4
+        assert any(b['type'] == 'N+1 Queries' for b in monitor.get_bottlenecks()['bottlenecks'])
+
+    def test_failed_statements_leave_no_state(self):
+        """Test a statement that raises keeps timing consistent for the next one"""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.exc import OperationalError
+        from backend.performance_monitor import PerformanceMonitor
+        from backend.query_monitor import QueryMonitor
+
+        monitor = PerformanceMonitor()
+        query_monitor = QueryMonitor(monitor=monitor)
+        query_monitor.install()
+        engine = create_engine('sqlite://')
+
+        try:
+            with engine.connect() as conn:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        conn.execute(text('SELECT * FROM missing_table'))
+                conn.execute(text('SELECT 1'))
+                info = dict(conn.info)
+        finally:
+            query_monitor.uninstall()
+            engine.dispose()
+
+        assert info == {}
+        assert [f['fingerprint'] for f in monitor.get_query_fingerprints()] == ['SELECT ?']
+
+
+@pytest.mark.unit
+class TestTracer:
+    """Test request stage tracing"""
+
+    def test_nested_spans_and_otlp_export(self):
+        """Test spans nest under one trace and export as OTLP JSON"""
+        from backend.tracing import Tracer, InMemorySpanExporter
+
+        tracer = Tracer(enabled=True, sample_rate=1.0)
+        exporter = InMemorySpanExporter()
+        tracer.configure(exporter=exporter)
+
+        with tracer.span('POST /api/chat') as root:
+            with tracer.span('chat.aiml', engine='aiml'):
+                pass
+            root.set_attribute('chat.category', 'general')
+
+        spans = exporter.traces[0]
+        assert [s.name for s in spans] == ['POST /api/chat', 'chat.aiml']
+        assert spans[1].parent_id == spans[0].span_id
+        assert spans[1].trace_id == spans[0].trace_id
+
+        document = tracer.get_recent_traces()[0]
+        otel_spans = document['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert len(otel_spans[0]['traceId']) == 32
+        assert otel_spans[1]['parentSpanId'] == otel_spans[0]['spanId']
+        assert {'key': 'engine', 'value': {'stringValue': 'aiml'}} in otel_spans[1]['attributes']
+
+        stages = tracer.get_stage_breakdown()['POST /api/chat']
+        assert {s['stage'] for s in stages} == {'POST /api/chat', 'chat.aiml'}
+
+    def test_disabled_and_unsampled_record_nothing(self):
+        """Test no spans are kept when disabled or not sampled"""
+        from backend.tracing import Tracer
+
+        tracer = Tracer(enabled=False)
+        with tracer.span('root') as span:
+            span.set_attribute('ignored', True)
+
+        tracer.configure(enabled=True, sample_rate=0.0)
+        with tracer.span('root'):
+            with tracer.span('child'):
+                pass
+
+        assert tracer.get_recent_traces() == []
+        assert tracer.get_stage_breakdown() == {}
+
+    def test_error_marks_span(self):
+        """Test an exception leaving a span records error status"""
+        from backend.tracing import Tracer, STATUS_ERROR
+
+        tracer = Tracer(enabled=True)
+        with pytest.raises(ValueError):
+            with tracer.span('root'):
+                with tracer.span('chat.db_write'):
+                    raise ValueError('boom')
+
+        stages = {s['stage']: s for s in tracer.get_stage_breakdown()['root']}
+        assert stages['chat.db_write']['errors'] == 1
+        spans = tracer.get_recent_traces()[0]['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert spans[1]['status']['code'] == STATUS_ERROR
+
+
+@pytest.mark.unit
+class TestRequestMiddleware:
+    """Test the combined timing / rate limiting middleware"""
+
+    def _make_app(self, rate_limiter):
+        from flask import Flask, session
+        from backend.performance_monitor import PerformanceMonitor
+        from backend.request_middleware import init_request_middleware
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+
+        @app.route('/api/login')
+        def login():
+            session['user_id'] = 7
+            return 'ok'
+
+        @app.route('/api/ping')
+        def ping():
+            return 'pong'
+
+        @app.route('/health')
+        def health():
+            return 'healthy'
+
+        monitor = PerformanceMonitor()
+        middleware = init_request_middleware(app, monitor=monitor,
+                                             rate_limiter=rate_limiter)
+        return app, monitor, middleware
+
+    def test_tracks_requests_and_skips_health(self):
+        """Test one measurement per request reaches the monitor"""
+        from backend.rate_limiter import RateLimiter
+
+        app, monitor, _ = self._make_app(RateLimiter())
+        client = app.test_client()
+
+        assert client.get('/api/ping', buffered=True).status_code == 200
+        assert client.get('/health', buffered=True).status_code == 200
+
+        endpoints = monitor.metrics['endpoints']
+        assert list(endpoints) == ['ping']
+        assert endpoints['ping']['count'] == 1
+
+    def test_rate_limit_uses_session_user(self):
+        """Test limits apply per user once the session is known"""
+        from backend.rate_limiter import RateLimiter
+
+        rate_limiter = RateLimiter()
+        rate_limiter.set_custom_limit('user_7', 'user', {
+            'requests_per_minute': 2,
+            'requests_per_hour': 100,
+            'requests_per_day': 100
+        })
+        app, monitor, middleware = self._make_app(rate_limiter)
+        client = app.test_client()
+
+        # Keyed by IP until a response has tied the session to the user
+        assert client.get('/api/login', buffered=True).status_code == 200
+        assert client.get('/api/ping', buffered=True).status_code == 200
+        
+        assert client.get('/api/ping', buffered=True).status_code == 200
+        assert client.get('/api/ping', buffered=True).status_code == 200
+
+        response = client.get('/api/ping', buffered=True)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '60'
+        assert response.get_json()['period'] == 'minute'
+        assert 7 in middleware._session_users.values()
+
+    def test_session_map_is_thread_safe_and_bounded(self):
+        """Test concurrent responses keep the session -> user map consistent"""
+        import threading
+        import time
+        from backend.request_middleware import RequestMiddleware, ENVIRON_KEY
+
+        middleware = RequestMiddleware(None, max_sessions=50)
+        errors = []
+
+        def respond(worker):
+            try:
+                for i in range(500):
+                    environ = {ENVIRON_KEY: {'user_id': worker * 1000 + i}}
+                    middleware._finish(environ, f's{worker}-{i}', time.perf_counter_ns(), 200)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=respond, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(middleware._session_users) == 50
+
+
+@pytest.mark.unit
+class TestAsyncLogging:
+    """Test queue-based batched structured logging"""
+
+    def test_async_logger_writes_json(self, tmp_path):
+        """Test records reach the JSON file from the writer thread"""
+        import json
+        from backend.logging_system import StructuredLogger
+
+        log_file = tmp_path / 'async.log'
+        logger = StructuredLogger.get_logger(
+            'test-async-writes', log_file=str(log_file),
+            async_mode=True, queue_size=100, batch_size=10
+        )
+        assert len(logger.handlers) == 1  # only the queue handler
+
+        StructuredLogger.log_http_request(logger, 'GET', '/api/chat', 200, 12.5,
+                                          user_id=3, query_count=2, query_time_ms=1.5)
+        StructuredLogger.log_security_event(logger, 'login_failed', 'medium',
+                                            {'message': 'bad password'})
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('handler failed')
+
+        listener = StructuredLogger._listeners.pop('test-async-writes')
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+        lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+        assert lines[0]['event_type'] == 'http_request'
+        assert lines[0]['query_count'] == 2
+        assert lines[0]['level'] == 'INFO'
+        assert lines[1]['security_event'] == 'login_failed'
+        assert lines[1]['message'] == 'Security Event: login_failed - MEDIUM'
+        assert 'ValueError: boom' in lines[2]['exception']
+        assert StructuredLogger.get_async_stats()['test-async-writes']['dropped'] == 0
+
+    def test_queue_overflow_drops_records(self):
+        """Test a full queue drops and counts records instead of blocking"""
+        import logging
+        import queue
+        from backend.logging_system import DroppingQueueHandler
+
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        logger = logging.getLogger('test-async-overflow')
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            for i in range(5):
+                logger.warning('record %d', i)
+        finally:
+            logger.removeHandler(handler)
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+        assert handler.queue.get_nowait().msg == 'record 0'
+
+    def test_listener_survives_flush_errors(self):
+        """Test a failing flush neither kills the writer thread nor hangs stop()"""
+        import io
+        import logging
+        import queue
+        from backend.logging_system import BatchStreamHandler, BatchingQueueListener
+
+        class FullDiskHandler(BatchStreamHandler):
+            def flush(self):
+                if not self._in_batch:
+                    raise OSError(28, 'No space left on device')
+
+        errors = []
+        handler = FullDiskHandler(io.StringIO())
+        handler.handleError = errors.append
+        log_queue = queue.Queue(maxsize=4)
+        listener = BatchingQueueListener(log_queue, handler, batch_size=2)
+        listener.start()
+        try:
+            for i in range(10):
+                log_queue.put(logging.makeLogRecord({'msg': f'record {i}'}), timeout=5)
+            log_queue.join()
+            assert listener._thread.is_alive()
+            assert errors
+            assert handler.stream.getvalue().count('record') == 10
+        finally:
+            listener.stop()
+        assert listener._thread is None
+
+    def test_stop_with_full_queue_and_dead_writer(self):
+        """Test stop() makes room for the sentinel when nothing drains the queue"""
+        import logging
+        import queue
+        from backend.logging_system import BatchingQueueListener
+
+        log_queue = queue.Queue(maxsize=2)
+        listener = BatchingQueueListener(log_queue, logging.NullHandler())
+        listener.sentinel_timeout = 0.05
+        log_queue.put_nowait('a')
+        log_queue.put_nowait('b')
+
+        listener.enqueue_sentinel()
+        assert log_queue.get_nowait() == 'b'
+        assert log_queue.get_nowait() is listener._sentinel
+
+
+@pytest.mark.unit
+class TestContextHotTier:
+    """Test the in-memory hot tier of the context manager"""
+
+    def _count_queries(self):
+        from sqlalchemy import event
+        from database import db
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(args[2]))
+        return statements
+
+    def test_write_behind_coalesces_appends(self, sqlite_app):
+        """Test appends are served from memory and flushed in one batch"""
+        from backend.context_manager import ContextMemoryManager, ConversationContext
+
+        manager = ContextMemoryManager(max_context_messages=3)
+        manager._flusher = object()  # pretend the background flusher runs
+        statements = self._count_queries()
+
+        for i in range(5):
+            assert manager.append_message('s1', {'sender': 'user', 'text': f'm{i}'})
+        recent = manager.get_recent_messages('s1', limit=10)
+
+        assert [m['text'] for m in recent] == ['m2', 'm3', 'm4']
+        assert len(statements) == 1  # single SELECT on the first miss
+        assert ConversationContext.query.count() == 0
+
+        assert manager.flush() == 1
+        context = ConversationContext.query.filter_by(session_id='s1').one()
+        assert context.message_count == 3
+        assert manager.get_hot_tier_stats()['dirty'] == 0
+        assert manager.flush() == 0
+
+    def test_reads_after_eviction_hit_database(self, sqlite_app):
+        """Test LRU eviction keeps pending writes and reloads from the database"""
+        from backend.context_manager import ContextMemoryManager
+
+        manager = ContextMemoryManager(hot_capacity=1)
+        manager._flusher = object()
+
+        manager.append_message('a', {'sender': 'user', 'text': 'hello'})
+        manager.append_message('b', {'sender': 'user', 'text': 'hi'})
+        # 'a' was evicted while dirty but is still readable
+        assert manager.load_context('a')['context_data'][0]['text'] == 'hello'
+
+        manager.flush()
+        manager._hot.clear()
+
+        assert manager.load_context('b')['message_count'] == 1
+        assert manager.get_hot_tier_stats()['misses'] >= 3
+
+    def test_background_flusher_persists_on_stop(self, sqlite_app):
+        """Test the flusher thread writes pending sessions before stopping"""
+        from backend.context_manager import ContextMemoryManager, ConversationContext
+
+        manager = ContextMemoryManager(flush_interval=60)
+        manager.start_flusher(sqlite_app)
+        try:
+            manager.append_message('s3', {'sender': 'user', 'text': 'queued'})
+            assert ConversationContext.query.filter_by(session_id='s3').count() == 0
+        finally:
+            manager.stop_flusher()
+
+        assert ConversationContext.query.filter_by(session_id='s3').count() == 1
+
+    def test_appends_insert_rows_and_trim(self, sqlite_app):
+        """Test each flush inserts only new messages and trims old ones"""
+        from backend.context_manager import ContextMemoryManager, ContextMessage
+
+        manager = ContextMemoryManager(max_context_messages=3)
+        for i in range(5):
+            manager.append_message('s4', {'sender': 'user', 'text': f'm{i}', 'lang': 'en'})
+
+        rows = ContextMessage.query.filter_by(session_id='s4')\
+            .order_by(ContextMessage.seq).all()
+        assert [(row.seq, row.text) for row in rows] == [(3, 'm2'), (4, 'm3'), (5, 'm4')]
+
+        manager._hot.clear()
+        messages = manager.get_recent_messages('s4', limit=2)
+        assert [m['text'] for m in messages] == ['m3', 'm4']
+        assert messages[0]['lang'] == 'en'
+
+        manager.save_context('s4', [{'sender': 'bot', 'text': 'reset'}])
+        rows = ContextMessage.query.filter_by(session_id='s4').all()
+        assert [(row.seq, row.text) for row in rows] == [(1, 'reset')]
+
+    def test_migrates_json_blobs(self, sqlite_app):
+        """Test legacy context_data arrays move into context_messages"""
+        import json
+        from database import db
+        from database.migrations import migrate_context_blobs, run_migrations
+        from backend.context_manager import (
+            ContextMemoryManager, ConversationContext, ContextMessage
+        )
+
+        messages = [
+            {'sender': 'user', 'text': 'hi', 'timestamp': '2024-01-01T10:00:00'},
+            {'sender': 'bot', 'text': 'hello', 'timestamp': 'yesterday'}
+        ]
+        db.session.add(ConversationContext(session_id='legacy',
+                                           context_data=json.dumps(messages)))
+        db.session.commit()
+
+        assert run_migrations() == ['0001_context_messages_from_blob', '0002_expiry_indexes',
+                                  '0003_lecture_content_hash', '0004_lecture_note_list_columns',
+                                  '0005_keyset_pagination_indexes', '0006_hot_path_indexes']
+        assert run_migrations() == []
+        migrate_context_blobs()  # idempotent
+
+        assert ContextMessage.query.count() == 2
+        assert ConversationContext.query.one().context_data == '[]'
+        assert ContextMemoryManager().load_context('legacy')['context_data'] == messages
+
+    def test_without_flusher_writes_through(self, sqlite_app):
+        """Test writes persist immediately when no flusher is running"""
+        from backend.context_manager import ContextMemoryManager, ConversationContext
+
+        manager = ContextMemoryManager()
+        manager.save_context('s2', [{'sender': 'bot', 'text': 'welcome'}], user_id=None)
+
+        assert ConversationContext.query.filter_by(session_id='s2').one().message_count == 1
+        assert manager.clear_context('s2')
+        assert manager.load_context('s2') is None
+
+    def _during_insert(self, action):
+        """Run action once, when a flush first inserts context messages"""
+        from sqlalchemy import event
+        from database import db
+
+        calls = []
+
+        def hook(conn, cursor, statement, *args):
+            if statement.startswith('INSERT INTO context_messages') and not calls:
+                calls.append(statement)
+                action()
+
+        event.listen(db.engine, 'before_cursor_execute', hook)
+        return lambda: event.remove(db.engine, 'before_cursor_execute', hook)
+
+    def test_session_stays_in_memory_while_flushing(self, sqlite_app):
+        """Test an evicted session is not reloaded from the database mid-flush"""
+        from backend.context_manager import ContextMemoryManager, ContextMessage
+
+        manager = ContextMemoryManager(hot_capacity=1)
+        manager._flusher = object()
+        manager.append_message('a', {'sender': 'user', 'text': 'm0'})
+        manager.append_message('b', {'sender': 'user', 'text': 'other'})  # evicts 'a'
+
+        remove = self._during_insert(
+            lambda: manager.append_message('a', {'sender': 'user', 'text': 'm1'}))
+        try:
+            assert manager.flush() == 2
+        finally:
+            remove()
+        assert manager.flush() == 1
+
+        rows = ContextMessage.query.filter_by(session_id='a').order_by(ContextMessage.seq).all()
+        assert [(row.seq, row.text) for row in rows] == [(1, 'm0'), (2, 'm1')]
+
+    def test_failed_flush_keeps_later_appends(self, sqlite_app):
+        """Test a rolled-back flush is retried with messages appended meanwhile"""
+        from backend.context_manager import ContextMemoryManager, ContextMessage
+
+        manager = ContextMemoryManager(hot_capacity=1)
+        manager._flusher = object()
+        manager.append_message('a', {'sender': 'user', 'text': 'm0'})
+        manager.append_message('b', {'sender': 'user', 'text': 'other'})
+
+        def append_then_fail():
+            manager.append_message('a', {'sender': 'user', 'text': 'm1'})
+            raise OSError('disk I/O error')
+
+        remove = self._during_insert(append_then_fail)
+        try:
+            assert manager.flush() == 0
+        finally:
+            remove()
+        assert manager.get_hot_tier_stats()['dirty'] == 2
+        assert manager.flush() == 2
+
+        rows = ContextMessage.query.filter_by(session_id='a').order_by(ContextMessage.seq).all()
+        assert [(row.seq, row.text) for row in rows] == [(1, 'm0'), (2, 'm1')]
+
+    def test_clear_waits_for_flush(self, sqlite_app):
+        """Test a session cleared during a flush is not written back"""
+        import threading
+        from backend.context_manager import ContextMemoryManager, ConversationContext, ContextMessage
+
+        manager = ContextMemoryManager()
+        manager._flusher = object()
+        manager.append_message('a', {'sender': 'user', 'text': 'm0'})
+
+        inserting, release = threading.Event(), threading.Event()
+
+        def block():
+            inserting.set()
+            release.wait(5)
+
+        def flush():
+            with sqlite_app.app_context():
+                manager.flush()
+
+        def clear():
+            with sqlite_app.app_context():
+                manager.clear_context('a')
+
+        remove = self._during_insert(block)
+        try:
+            flusher = threading.Thread(target=flush)
+            flusher.start()
+            assert inserting.wait(5)
+            clearer = threading.Thread(target=clear)
+            clearer.start()
+            clearer.join(0.2)
+            assert clearer.is_alive()  # waits for the flush to commit
+            release.set()
+            flusher.join(5)
+            clearer.join(5)
+        finally:
+            release.set()
+            remove()
+
+        assert ConversationContext.query.filter_by(session_id='a').count() == 0
+        assert ContextMessage.query.filter_by(session_id='a').count() == 0
+        assert manager.load_context('a') is None
+
+
+@pytest.mark.unit
+class TestExpirySweeper:
+    """Test the background expiry sweeper"""
+
+    def test_sweeps_expired_contexts_in_batches(self, sqlite_app):
+        """Test only contexts idle past the window are deleted, with their messages"""
+        from datetime import datetime, timedelta
+        from database import db
+        from backend.context_manager import (
+            ConversationContext, ContextMessage, message_to_row
+        )
+        from backend.expiry_sweeper import ExpirySweeper
+
+        old = datetime.utcnow() - timedelta(days=3)
+        for i in range(5):
+            db.session.add(ConversationContext(session_id=f'old{i}', last_active=old))
+            db.session.execute(db.insert(ContextMessage), [
+                message_to_row(f'old{i}', 1, {'sender': 'user', 'text': 'hi'})
+            ])
+        db.session.add(ConversationContext(session_id='fresh'))
+        db.session.commit()
+
+        sweeper = ExpirySweeper(batch_size=2, context_window_hours=24)
+        report = sweeper.run_once()
+
+        assert report['skipped'] is False
+        assert report['contexts_deleted'] == 5
+        assert report['messages_deleted'] == 5
+        assert [c.session_id for c in ConversationContext.query.all()] == ['fresh']
+        assert sweeper.get_stats()['totals']['contexts_deleted'] == 5
+
+    def test_closes_abandoned_and_deletes_old_sessions(self, sqlite_app):
+        """Test abandoned sessions are closed and unreferenced old ones removed"""
+        from datetime import datetime, timedelta
+        from database import db
+        from database.models import Session, Conversation
+        from backend.expiry_sweeper import ExpirySweeper
+
+        now = datetime.utcnow()
+        db.session.add_all([
+            Session(session_id='open-old', started_at=now - timedelta(days=10)),
+            Session(session_id='open-new', started_at=now),
+            Session(session_id='ended-old', started_at=now - timedelta(days=60),
+                    ended_at=now - timedelta(days=59)),
+            Session(session_id='ended-kept', started_at=now - timedelta(days=60),
+                    ended_at=now - timedelta(days=59)),
+            Conversation(user_id=1, message='hi', response='hello',
+                         session_id='ended-kept')
+        ])
+        db.session.commit()
+
+        report = ExpirySweeper(session_lifetime_seconds=7 * 86400,
+                               session_retention_days=30).run_once()
+
+        assert report['sessions_closed'] == 1
+        assert report['sessions_deleted'] == 1
+        assert db.session.get(Session, 'open-old').ended_at is not None
+        assert db.session.get(Session, 'open-new').ended_at is None
+        assert db.session.get(Session, 'ended-old') is None
+        assert db.session.get(Session, 'ended-kept') is not None
+
+    def test_prunes_expired_session_files(self, sqlite_app, tmp_path):
+        """Test expired session files are removed and counted"""
+        import struct
+        import time
+        from backend.expiry_sweeper import ExpirySweeper
+        from backend.session_store import ShardedFileSessionStore
+
+        def write(name, expires):
+            (tmp_path / name).write_bytes(struct.pack('I', expires) + b'x' * 96)
+
+        # Flat files left by the old Flask-Session layout
+        write('expired', int(time.time()) - 60)
+        write('live', int(time.time()) + 3600)
+        write('forever', 0)
+        (tmp_path / '__wz_cache_count').write_bytes(b'3')
+
+        store = ShardedFileSessionStore(str(tmp_path))
+        store.set('abcdef', b'x' * 96, int(time.time()) - 60)
+        store.set('abcxyz', b'{}', int(time.time()) + 3600)
+
+        report = ExpirySweeper(session_store=store).run_once()
+
+        assert report['session_files_deleted'] == 2
+        assert report['bytes_reclaimed'] == 200
+        assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == \
+            ['__wz_cache_count', 'forever', 'live']
+        assert store.get('abcxyz') is not None
+
+    def test_lease_excludes_other_workers(self, sqlite_app):
+        """Test a held lease makes other workers skip until it expires"""
+        from datetime import datetime, timedelta
+        from database import db
+        from backend.expiry_sweeper import ExpirySweeper, LeaseLock, MaintenanceLease
+
+        holder = LeaseLock('expiry_sweeper', ttl_seconds=60, owner='worker-a')
+        assert holder.acquire()
+
+        sweeper = ExpirySweeper()
+        assert sweeper.run_once() == {'skipped': True}
+        assert sweeper.get_stats()['totals']['skipped'] == 1
+
+        lease = db.session.get(MaintenanceLease, 'expiry_sweeper')
+        lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert sweeper.run_once()['skipped'] is False
+        assert holder.acquire()  # released when the sweep finished
+
+
+
+class _FakeRedis:
+    """In-process stand-in for the subset of the Redis API the session and revocation stores use"""
+
+    def __init__(self):
+        import time
+        self._time = time.time
+        self.data = {}
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, 0))
+        if value is not None and expires < self._time():
+            del self.data[key]
+            return None
+        return value
+
+    def setex(self, key, ttl, value):
+        self.data[key] = (value, self._time() + ttl)
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def exists(self, key):
+        return int(self.get(key) is not None)
+
+    def ttl(self, key):
+        if self.get(key) is None:
+            return -2
+        return int(self.data[key][1] - self._time())
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, ({}, float('inf')))[0].update(mapping)
+
+    def _score_range(self, key, low, high):
+        def bound(value, default):
+            if value in ('-inf', '+inf'):
+                return default, False
+            if str(value).startswith('('):
+                return float(value[1:]), True
+            return float(value), False
+        (lo, lo_open), (hi, hi_open) = bound(low, float('-inf')), bound(high, float('inf'))
+        members = self.data.get(key, ({}, 0))[0]
+        return [m for m, score in sorted(members.items(), key=lambda item: item[1])
+                if (score > lo if lo_open else score >= lo) and (score < hi if hi_open else score <= hi)]
+
+    def zrangebyscore(self, key, low, high):
+        return [m.encode('utf-8') for m in self._score_range(key, low, high)]
+
+    def zremrangebyscore(self, key, low, high):
+        members = self._score_range(key, low, high)
+        for member in members:
+            del self.data[key][0][member]
+        return len(members)
+
+
+@pytest.mark.unit
+class TestSessionStore:
+    """Test server-side session stores and the session interface"""
+
+    def _app(self, store):
+        from flask import Flask, session
+        from backend.session_store import StoreSessionInterface
+
+        flask_app = Flask(__name__)
+        flask_app.secret_key = 'test'
+        flask_app.session_interface = StoreSessionInterface(store)
+
+        @flask_app.route('/set/<value>')
+        def set_value(value):
+            session['user_id'] = value
+            return 'ok'
+
+        @flask_app.route('/get')
+        def get_value():
+            session.permanent = True
+            return session.get('user_id') or ''
+
+        @flask_app.route('/clear')
+        def clear():
+            session.clear()
+            return 'ok'
+
+        return flask_app
+
+    def test_sharded_file_store_roundtrip(self, tmp_path):
+        """Test files are sharded by id prefix and expire"""
+        import time
+        from backend.session_store import ShardedFileSessionStore
+
+        store = ShardedFileSessionStore(str(tmp_path))
+        store.set('abcdef', b'{"a":1}', int(time.time()) + 60)
+        store.set('zz0000', b'{}', int(time.time()) - 1)
+
+        assert (tmp_path / 'ab' / 'cd' / 'abcdef').is_file()
+        assert store.get('abcdef')[0] == b'{"a":1}'
+        assert store.get('zz0000') is None
+        assert store.get('missing') is None
+        store.delete('abcdef')
+        assert store.get('abcdef') is None
+
+    def test_writes_only_when_modified(self, tmp_path):
+        """Test reads and permanent-only touches skip the write"""
+        from backend.session_store import ShardedFileSessionStore
+
+        flask_app = self._app(ShardedFileSessionStore(str(tmp_path)))
+        interface = flask_app.session_interface
+        client = flask_app.test_client()
+
+        client.get('/get')
+        assert interface.stats['writes'] == 0  # anonymous visit stores nothing
+        assert client.get_cookie('session') is None
+
+        client.get('/set/42')
+        assert interface.stats['writes'] == 1
+        for _ in range(3):
+            assert client.get('/get').data == b'42'
+        client.get('/set/42')
+        assert interface.stats['writes'] == 1
+        assert interface.stats['skipped_writes'] == 4
+
+        client.get('/clear')
+        assert interface.stats['deletes'] == 1
+        assert client.get('/get').data == b''
+        assert not [p for p in tmp_path.rglob('*') if p.is_file()]
+
+    def test_sql_store(self, sqlite_app):
+        """Test sessions persist in the server_sessions table"""
+        import time
+        from backend.session_store import SQLSessionStore, ServerSession
+
+        store = SQLSessionStore()
+        store.set('s1', b'{"a":1}', int(time.time()) + 60)
+        store.set('s1', b'{"a":2}', int(time.time()) + 60)
+        store.set('s2', b'{}', int(time.time()) - 1)
+
+        assert store.get('s1')[0] == b'{"a":2}'
+        assert store.get('s2') is None
+        assert store.prune()['session_files_deleted'] == 1
+        assert ServerSession.query.count() == 1
+
+    def test_redis_store_through_interface(self):
+        """Test the Redis store against an in-process fake client"""
+        from backend.session_store import RedisSessionStore
+
+        fake = _FakeRedis()
+        client = self._app(RedisSessionStore(fake)).test_client()
+
+        client.get('/set/7')
+        assert client.get('/get').data == b'7'
+        assert len(fake.data) == 1
+        assert next(iter(fake.data)).startswith('session:')
+
+    def test_redis_store_refreshes_expiry(self):
+        """Test active Redis sessions are extended past half their lifetime"""
+        from backend.session_store import RedisSessionStore
+
+        fake = _FakeRedis()
+        flask_app = self._app(RedisSessionStore(fake))
+        interface = flask_app.session_interface
+        client = flask_app.test_client()
+
+        client.get('/set/7')
+        client.get('/get')
+        assert interface.stats['writes'] == 1  # plenty of lifetime left
+
+        key = next(iter(fake.data))
+        value, expires = fake.data[key]
+        fake.data[key] = (value, fake._time() + 60)  # nearly expired
+        assert client.get('/get').data == b'7'
+        assert interface.stats['writes'] == 2
+        assert fake.ttl(key) > 60
+
+    def test_rejects_malformed_session_ids(self, tmp_path):
+        """Test cookie values that are not generated ids never reach the store"""
+        import struct
+        import time
+        from backend.session_store import ShardedFileSessionStore
+
+        planted = tmp_path / 'planted'
+        planted.write_bytes(struct.pack('I', int(time.time()) + 600) + b'{"user_id":"1"}')
+        store = ShardedFileSessionStore(str(tmp_path / 'sessions'))
+        client = self._app(store).test_client()
+
+        client.set_cookie('session', '..//' + str(planted).lstrip('/'))
+        assert client.get('/get').data == b''
+        with pytest.raises(ValueError):
+            store.set('../x', b'{}', int(time.time()) + 60)
+
+
+
+@pytest.mark.unit
+class TestSuggestionIndex:
+    """Test the compiled autocomplete suggestion index"""
+
+    def _index(self):
+        from backend.suggestion_index import SuggestionIndex
+
+        return SuggestionIndex([
+            ('What is machine learning?', 'popular', 3.0),
+            ('What is Newton\'s law of motion?', 'popular', 3.5),
+            ('What is photosynthesis', 'aiml', 1.0),
+            ('Explain photosynthesis', 'popular', 3.2),
+            ('what is machine learning', 'aiml', 1.0),  # duplicate key
+            ('How do I calculate derivatives?', 'popular', 2.0)
+        ])
+
+    def test_prefix_top_k_by_popularity(self):
+        """Test prefix hits come back most popular first"""
+        index = self._index()
+        results = [index.texts[i] for i, score in index.search('what is', 3)]
+
+        assert len(index) == 5
+        assert results == ["What is Newton's law of motion?",
+                           'What is machine learning?', 'What is photosynthesis']
+        assert index.top_prefix('what is m', 5) == index.top_prefix('what is machine', 5)
+        assert index.search('zzz', 5) == []
+
+    def test_typo_correction(self):
+        """Test misspelled words are corrected to indexed words"""
+        index = self._index()
+
+        assert index.correct_word('machne') == 'machine'
+        assert index.correct_word('lerning') == 'learning'
+        results = index.search('whta is machne', 5)
+        assert [index.texts[i] for i, _ in results] == ['What is machine learning?']
+        assert results[0][1] < 1.0
+
+    def test_matches_words_inside_suggestions(self):
+        """Test query words match anywhere in a suggestion"""
+        index = self._index()
+        texts = [index.texts[i] for i, _ in index.search('photosynth', 5)]
+
+        assert texts == ['Explain photosynthesis', 'What is photosynthesis']
+
+    def test_engine_merges_history(self):
+        """Test the engine combines history with indexed suggestions"""
+        from backend.autocomplete_engine import AutocompleteEngine
+
+        engine = AutocompleteEngine()
+        engine.add_to_history('What is a black hole?', user_id=1)
+        suggestions = engine.get_suggestions('what is', limit=20, user_id=1)
+        sources = {s['text']: s['source'] for s in suggestions}
+
+        assert sources['What is a black hole?'] == 'history'
+        assert sources['What is machine learning?'] == 'popular'
+        assert all(s['text'].lower().startswith('what is') for s in suggestions)
+        assert engine.get_suggestions('w') == []
+
+
+
+@pytest.mark.unit
+class TestAIMLPatternIndex:
+    """Test AIML pattern enumeration and incremental autocomplete refresh"""
+
+    AIML = """<?xml version="1.0" encoding="UTF-8"?>
+<aiml version="1.0.1">
+{categories}
+</aiml>"""
+
+    def _write(self, path, patterns):
+        categories = '\n'.join(
+            f'<category><pattern>{p}</pattern><template>ok</template></category>'
+            for p in patterns
+        )
+        path.write_text(self.AIML.format(categories=categories), encoding='utf-8')
+
+    def test_iter_patterns_walks_loaded_tree(self, tmp_path):
+        """Test patterns come back from the kernel without reparsing"""
+        from backend.aiml_engine import AIMLEngine
+
+        self._write(tmp_path / 'kb.aiml', ['WHAT IS AIML', 'TELL ME ABOUT *', '_ EXAMS'])
+        engine = AIMLEngine(str(tmp_path))
+
+        assert sorted(engine.iter_patterns()) == ['TELL ME ABOUT *', 'WHAT IS AIML', '_ EXAMS']
+        assert len(list(engine.iter_patterns())) == engine.get_pattern_count()
+
+    def test_autocomplete_refreshes_on_reload(self, tmp_path):
+        """Test additions go to the pending list and removals rebuild"""
+        from backend.aiml_engine import AIMLEngine
+        from backend.autocomplete_engine import AutocompleteEngine
+
+        kb = tmp_path / 'kb.aiml'
+        self._write(kb, ['WHAT IS AIML', 'TELL ME ABOUT *'])
+        engine = AIMLEngine(str(tmp_path))
+        autocomplete = AutocompleteEngine(engine)
+
+        assert autocomplete.patterns == {'What is aiml', 'Tell me about'}
+        assert autocomplete.get_suggestions('what is ai')[0]['source'] == 'aiml'
+
+        self._write(kb, ['WHAT IS AIML', 'TELL ME ABOUT *', 'HOSTEL FEES'])
+        engine.reload_patterns()
+        assert autocomplete.get_stats()['pending_patterns'] == 1
+        assert autocomplete.get_suggestions('hostel')[0]['text'] == 'Hostel fees'
+
+        self._write(kb, ['HOSTEL FEES'])
+        engine.reload_patterns()
+        assert autocomplete.patterns == {'Hostel fees'}
+        assert autocomplete.get_stats()['pending_patterns'] == 0
+        assert autocomplete.get_suggestions('what is aiml') == []
+
+
+
+@pytest.mark.unit
+class TestTrendingTracker:
+    """Test heavy-hitter trending queries and per-user history"""
+
+    def test_space_saving_keeps_heavy_hitters(self):
+        """Test frequent queries survive with a small counter budget"""
+        from backend.trending_tracker import DecayedSpaceSaving
+
+        sketch = DecayedSpaceSaving(capacity=10, tau=10 ** 9)
+        now = sketch.landmark
+        for i in range(2000):
+            sketch.add('hot', 'Hot', now)
+            if i % 2 == 0:
+                sketch.add('warm', 'Warm', now)
+            sketch.add(f'rare{i}', f'Rare {i}', now)
+
+        top = sketch.top(2, now)
+        assert [t['query'] for t in top] == ['Hot', 'Warm']
+        assert top[0]['count'] - top[0]['error'] <= 2000 <= top[0]['count']
+        assert len(sketch.counters) == 10
+
+    def test_windows_decay_old_queries(self):
+        """Test the hour window forgets what the day window still ranks"""
+        import time
+        from backend.trending_tracker import TrendingTracker
+
+        tracker = TrendingTracker(refresh_seconds=0)
+        now = time.time()
+        for _ in range(50):
+            tracker.record('Exam timetable', now=now - 6 * 3600)
+        for _ in range(5):
+            tracker.record('hostel fees?', now=now)
+
+        assert tracker.top('hour', 1)[0]['query'] == 'hostel fees?'
+        assert tracker.top('day', 1)[0]['query'] == 'Exam timetable'
+        with pytest.raises(ValueError):
+            tracker.top('week')
+
+    def test_per_user_history_is_bounded(self):
+        """Test each user keeps only their own latest queries"""
+        from backend.trending_tracker import TrendingTracker
+
+        tracker = TrendingTracker(history_size=3, max_users=2)
+        for i in range(5):
+            tracker.record(f'question {i}', user_id=1)
+        tracker.record('question 4', user_id=1)  # repeat is not duplicated
+        tracker.record('other', user_id=2)
+        tracker.record('third user', user_id=3)
+
+        assert tracker.recent(None) == []
+        assert 1 not in tracker.user_history  # least recently active dropped
+        assert tracker.recent(3) == ['third user']
+        tracker.record('again', user_id=2)
+        assert tracker.recent(2) == ['again', 'other']
+
+    def test_engine_uses_per_user_history(self):
+        """Test history suggestions are not shared between users"""
+        from backend.autocomplete_engine import AutocompleteEngine
+
+        engine = AutocompleteEngine()
+        engine.add_to_history('Where is the library?', user_id=7)
+
+        assert engine.get_suggestions('where is', user_id=7)[0]['source'] == 'history'
+        assert engine.get_suggestions('where is', user_id=8) == []
+        assert engine.get_trending_queries(1) == ['Where is the library?']
+
+    def test_anonymous_queries_stay_private(self):
+        """Test guests' queries count as trending but are never suggested back"""
+        from backend.autocomplete_engine import AutocompleteEngine
+
+        engine = AutocompleteEngine()
+        engine.add_to_history('Where is my hall ticket 4411?')
+
+        assert engine.get_suggestions('where is') == []
+        assert engine.trending.user_history == {}
+        assert engine.get_trending_queries(1) == ['Where is my hall ticket 4411?']
+
+
+
+@pytest.mark.unit
+class TestSentimentAnalyzer:
+    """Test the cached lexicon sentiment analyzer"""
+
+    # (message, expected label) from student chat traffic
+    LABELED = [
+        ("I love this chatbot, it's really helpful!", 'positive'),
+        ('This is not good at all.', 'negative'),
+        ('The exam was terrible :(', 'negative'),
+        ('Thanks a lot :)', 'positive'),
+        ("I'm not very happy with my grades", 'negative'),
+        ('What is the fee structure?', 'neutral'),
+        ('This is the worst lecture ever!!!', 'negative'),
+        ('Absolutely fantastic explanation, thank you so much.', 'positive'),
+        ('Mr. Smith was incredibly rude today', 'negative'),
+        ('I hate waiting in long queues', 'negative'),
+        ('Can you help me with my homework please', 'neutral'),
+        ('The course content is boring and too difficult', 'negative'),
+        ("I'm so sad and lonely :'(", 'negative'),
+        ('What a wonderful day <3', 'positive'),
+        ('The library is quiet and comfortable.', 'positive'),
+        ('It was not terribly bad', 'positive'),
+    ]
+
+    def test_tokenizer_splits_punctuation_and_keeps_emoticons(self):
+        """Test tokens follow TextBlob's tokenizer"""
+        from backend.sentiment_analyzer import tokenize
+
+        assert tokenize('Great job, Mr. Smith!! :-)') == \
+            ['great', 'job', ',', 'mr.', 'smith', '!', '!', ':-)']
+        assert tokenize('e.g. this... (!)') == ['e.g.', 'this', '...', '(!)']
+
+    def test_labels_and_cache(self):
+        """Test labels on the sample and memoization of repeats"""
+        from backend.sentiment_analyzer import SentimentAnalyzer
+
+        analyzer = SentimentAnalyzer(cache_size=100)
+        labels = [analyzer.analyze(text)[0] for text, _ in self.LABELED]
+        agreement = sum(a == b for a, (_, b) in zip(labels, self.LABELED)) / len(labels)
+
+        assert analyzer.analyze('not good')[1] == pytest.approx(-0.35)
+        assert analyzer.analyze('very good')[1] == pytest.approx(0.91)
+        assert analyzer.analyze('')[0] == 'neutral'
+        assert agreement >= 0.9
+        analyzer.analyze(self.LABELED[0][0])
+        assert analyzer.get_stats()['cache_hits'] >= 1
+
+    def test_matches_textblob(self):
+        """Test polarity and subjectivity equal TextBlob's on the sample"""
+        textblob = pytest.importorskip('textblob')
+        from backend.sentiment_analyzer import SentimentAnalyzer
+
+        analyzer = SentimentAnalyzer()
+        for text, _ in self.LABELED:
+            expected = textblob.TextBlob(text).sentiment
+            actual = analyzer.sentiment(text)
+            assert actual.polarity == pytest.approx(expected.polarity)
+            assert actual.subjectivity == pytest.approx(expected.subjectivity)
+
+
+
+@pytest.mark.unit
+class TestTfidfSummarizer:
+    """Test the TF-IDF lecture summarizer engine"""
+
+    LECTURE = (
+        "Thermodynamics is defined as the study of energy and its transformations. "
+        "Entropy refers to the measure of disorder in a system. "
+        "The first law of thermodynamics states that energy is conserved. "
+        "It is important to remember that energy cannot be created or destroyed. "
+        "For example, a heat engine converts heat into useful work. "
+        "For example, a heat engine converts heat into useful work! "
+        "The second law says the entropy of an isolated system never decreases. "
+        "The weather outside was nice this morning before class started. "
+        "Carnot engines are the most efficient heat engines possible."
+    )
+
+    def test_matrix_rows_are_normalized(self):
+        """Test CSR rows hold unit-length tf-idf vectors"""
+        from backend.lecture_summarizer import SentenceMatrix
+
+        matrix = SentenceMatrix(['heat flows from hot bodies', 'heat engines do work',
+                                 'entropy of the universe grows'])
+        heat = matrix.vocabulary['heat']
+
+        assert matrix.shape == (3, len(matrix.terms))
+        assert 'the' not in matrix.vocabulary
+        assert matrix.df[heat] == 2
+        for i in range(3):
+            assert sum(x * x for x in matrix.row(i).values()) == pytest.approx(1.0)
+        # Rarer terms weigh more
+        row = matrix.row(0)
+        assert row[heat] < row[matrix.vocabulary['flows']]
+
+    def test_keeps_output_contract(self):
+        """Test both engines return the same structure"""
+        from backend.lecture_summarizer import LectureSummarizer, create_summarizer
+
+        tfidf = create_summarizer('tfidf').summarize_lecture(self.LECTURE, 'Thermo')
+        keyword = LectureSummarizer().summarize_lecture(self.LECTURE, 'Thermo')
+
+        assert tfidf['success'] is True
+        assert set(tfidf) == set(keyword)
+        assert set(tfidf['summary']) == set(keyword['summary'])
+        assert set(tfidf['statistics']) == set(keyword['statistics'])
+        assert create_summarizer('keyword').__class__ is LectureSummarizer
+        assert create_summarizer('tfidf').summarize_lecture('too short')['success'] is False
+
+    def test_ranking_and_concepts(self):
+        """Test on-topic, non-duplicate sentences and matrix-derived concepts"""
+        from backend.lecture_summarizer import TfidfLectureSummarizer
+
+        result = TfidfLectureSummarizer().summarize_lecture(self.LECTURE)
+        bullets = result['summary']['bullet_points']
+        terms = [c['term'] for c in result['key_concepts']]
+
+        assert any(b.startswith('Thermodynamics is defined as') for b in bullets[:2])
+        assert sum('heat engine converts' in b for b in bullets) == 1
+        assert bullets.index('The weather outside was nice this morning before class started.') \
+            == len(bullets) - 1
+        assert terms[:2] == ['Thermodynamics', 'Entropy']
+        assert 'Heat' in terms
+
+    def test_splits_unpunctuated_transcripts(self):
+        """Test run-on transcripts are cut into sentence-sized chunks"""
+        from backend.lecture_summarizer import TfidfLectureSummarizer
+
+        summarizer = TfidfLectureSummarizer(max_sentence_words=40)
+        transcript = ' '.join(f'word{i % 50} energy' for i in range(100))
+        chunks = summarizer._split_sentences(transcript)
+
+        assert len(chunks) == 5
+        assert all(len(c.split()) == 40 for c in chunks)
+
+    def test_stream_matches_whole_text(self):
+        """Test chunked input gives the same summary as one string"""
+        import io
+        from backend.lecture_summarizer import TfidfLectureSummarizer, iter_text_chunks
+
+        summarizer = TfidfLectureSummarizer()
+        whole = summarizer.summarize_lecture(self.LECTURE)
+
+        for chunks in (iter_text_chunks(self.LECTURE, 7),
+                       iter_text_chunks(io.BytesIO(self.LECTURE.encode('utf-8')), 5)):
+            streamed = summarizer.summarize_stream(chunks)
+            assert streamed['summary'] == whole['summary']
+            assert streamed['key_concepts'] == whole['key_concepts']
+            assert streamed['statistics'] == whole['statistics']
+
+        assert summarizer.summarize_stream(['too', ' short'])['success'] is False
+
+    def test_text_chunks_and_spool(self):
+        """Test bytes split inside a character decode and spooled sentences read back"""
+        import io
+        from backend.lecture_summarizer import SentenceSpool, iter_text_chunks
+
+        assert ''.join(iter_text_chunks(io.BytesIO('naïve café'.encode('utf-8')), 3)) == 'naïve café'
+
+        with SentenceSpool(max_memory=16) as spool:
+            for sentence in ('first sentence', 'zweite Straße', 'third'):
+                spool.append(sentence)
+            assert len(spool) == 3
+            assert spool[1] == 'zweite Straße'
+            assert list(spool) == ['first sentence', 'zweite Straße', 'third']
+
+
+
+@pytest.mark.unit
+class TestJobQueue:
+    """Test the background job queue"""
+
+    def test_inline_job_reports_progress_and_result(self, sqlite_app):
+        """Test a job runs, records progress and stores its result"""
+        from database import db
+        from backend.job_queue import JobQueue, BackgroundJob
+
+        seen = []
+
+        def handler(job, payload):
+            job.progress(40, 'halfway')
+            seen.append(db.session.execute(
+                db.select(BackgroundJob.progress).filter_by(job_id=job.job_id)
+            ).scalar())
+            return {'doubled': payload['n'] * 2}
+
+        queue = JobQueue(workers=0)
+        queue.register('double', handler)
+        job_id = queue.submit('double', {'n': 21}, user_id=7)
+        job = queue.get(job_id)
+
+        assert seen == [40]
+        assert job['status'] == 'succeeded'
+        assert job['progress'] == 100
+        assert job['result'] == {'doubled': 42}
+        assert job['attempts'] == 1
+        assert queue.get_stats()['pending'] == 0
+
+    def test_retries_then_fails(self, sqlite_app):
+        """Test failed attempts are retried and exhausted jobs run the failure hook"""
+        from backend.job_queue import JobQueue
+
+        calls = []
+        failures = []
+
+        def flaky(job, payload):
+            calls.append(job.attempt)
+            if job.attempt < payload['succeed_on']:
+                raise RuntimeError(f'attempt {job.attempt}')
+            return 'ok'
+
+        queue = JobQueue(workers=0, max_attempts=3)
+        queue.register('flaky', flaky, on_failure=lambda payload, e: failures.append(str(e)))
+
+        recovered = queue.get(queue.submit('flaky', {'succeed_on': 2}))
+        assert recovered['status'] == 'succeeded'
+        assert recovered['attempts'] == 2
+
+        failed = queue.get(queue.submit('flaky', {'succeed_on': 9}))
+        assert failed['status'] == 'failed'
+        assert failed['attempts'] == 3
+        assert failed['error'] == 'RuntimeError: attempt 3'
+        assert failures == ['attempt 3']
+        assert calls == [1, 2, 1, 2, 3]
+
+    def test_worker_pool_caps_pending_jobs(self, sqlite_app):
+        """Test jobs run off-thread and submissions beyond max_pending are rejected"""
+        import threading
+        from backend.job_queue import JobQueue, QueueFullError
+
+        release = threading.Event()
+        threads = []
+
+        def slow(job, payload):
+            threads.append(threading.current_thread().name)
+            release.wait(5)
+            return payload
+
+        queue = JobQueue(workers=1, max_pending=1, retry_delay=0)
+        queue.register('slow', slow)
+        queue.start(sqlite_app)
+        try:
+            job_id = queue.submit('slow', {'a': 1})
+            with pytest.raises(QueueFullError):
+                queue.submit('slow', {'a': 2})
+            release.set()
+            assert queue.wait_idle(5)
+        finally:
+            queue.stop()
+
+        assert threads[0].startswith('job-worker')
+        assert queue.get(job_id)['result'] == {'a': 1}
+        assert queue.get_stats()['rejected'] == 1
+
+    def test_start_requeues_abandoned_jobs(self, sqlite_app):
+        """Test jobs left queued or running by a previous process are finished on start"""
+        from database import db
+        from backend.job_queue import JobQueue, BackgroundJob
+
+        failures = []
+        db.session.add_all([
+            BackgroundJob(job_id='queued', kind='echo', payload={'n': 1}, status='queued'),
+            BackgroundJob(job_id='running', kind='echo', payload={'n': 2},
+                          status='running', attempts=1, max_attempts=3),
+            BackgroundJob(job_id='exhausted', kind='echo', payload={'n': 3},
+                          status='running', attempts=3, max_attempts=3),
+            BackgroundJob(job_id='foreign', kind='other', status='queued')
+        ])
+        db.session.commit()
+
+        queue = JobQueue(workers=0, stale_after=0)
+        queue.register('echo', lambda job, payload: payload['n'],
+                       on_failure=lambda payload, e: failures.append(payload['n']))
+        queue.start(sqlite_app)
+
+        jobs = {job_id: queue.get(job_id) for job_id in ('queued', 'running', 'exhausted', 'foreign')}
+        assert jobs['queued']['status'] == 'succeeded'
+        assert jobs['running']['result'] == 2
+        assert jobs['running']['attempts'] == 2
+        assert jobs['exhausted']['status'] == 'failed'
+        assert failures == [3]
+        assert jobs['foreign']['status'] == 'queued'
+        assert queue.get_stats()['pending'] == 0
+
+        fresh = JobQueue(workers=0, stale_after=300)
+        fresh.register('other', lambda job, payload: None)
+        fresh.start(sqlite_app)
+        assert queue.get('foreign')['status'] == 'queued'  # updated too recently
+
+    def test_failed_commit_is_retried_then_failed(self, sqlite_app):
+        """Test a commit error after the handler goes through the retry/failure path"""
+        from database import db
+        from backend.job_queue import JobQueue, BackgroundJob
+
+        failures = []
+
+        def invalid_row(job, payload):
+            db.session.add(BackgroundJob(job_id=f'bad{job.attempt}', kind=None))  # NOT NULL
+            return 'done'
+
+        queue = JobQueue(workers=0, max_attempts=2)
+        queue.register('invalid', invalid_row,
+                       on_failure=lambda payload, e: failures.append(type(e).__name__))
+        job = queue.get(queue.submit('invalid'))
+
+        assert job['status'] == 'failed'
+        assert job['attempts'] == 2
+        assert job['error'].startswith('IntegrityError')
+        assert failures == ['IntegrityError']
+        assert BackgroundJob.query.count() == 1
+        assert queue.get_stats()['pending'] == 0
+
+    def test_progress_after_flush_on_file_sqlite(self, tmp_path):
+        """Test progress does not wait on the handler's own SQLite write lock"""
+        import time
+        from flask import Flask
+        from database import db
+        from database.engine import configure_engine_options, init_engine
+        from backend.job_queue import JobQueue, BackgroundJob
+
+        flask_app = Flask(__name__)
+        flask_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'jobs.db'}"
+        flask_app.config['SQLITE_BUSY_TIMEOUT'] = 2
+        configure_engine_options(flask_app)
+        db.init_app(flask_app)
+        init_engine(flask_app, db)
+
+        written = []
+
+        def handler(job, payload):
+            written.append(job.progress(10, 'before flush'))
+            db.session.add(BackgroundJob(job_id='child', kind='child'))
+            db.session.flush()
+            written.append(job.progress(50, 'after flush'))
+            return 'ok'
+
+        with flask_app.app_context():
+            db.create_all()
+            try:
+                queue = JobQueue(workers=0)
+                queue.register('flushing', handler)
+                started = time.monotonic()
+                job = queue.get(queue.submit('flushing'))
+
+                assert time.monotonic() - started < 1.5
+                assert written == [True, False]
+                assert job['status'] == 'succeeded'
+                assert db.session.get(BackgroundJob, 'child') is not None
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+    def test_lecture_job_processes_pending_note(self, sqlite_app):
+        """Test the lecture handler fills in the summary of a pending note"""
+        from backend.job_queue import JobQueue
+        from database.lecture_notes_model import LectureNote, StudyQuestion
+        from database import db
+        from routes.lecture_routes import process_lecture_job, mark_lecture_failed
+
+        content = ("Entropy is defined as a measure of disorder in a system. "
+                   "It is important to know that entropy of an isolated system grows. "
+                   "For example, ice melting in a warm room increases entropy.")
+        note = LectureNote(user_id=1, title='Entropy', original_content=content,
+                           word_count=len(content.split()), status='pending')
+        db.session.add(note)
+        db.session.commit()
+
+        queue = JobQueue(workers=0)
+        queue.register('lecture_summary', process_lecture_job, on_failure=mark_lecture_failed)
+        job = queue.get(queue.submit('lecture_summary', {'note_id': note.note_id}))
+        note = db.session.get(LectureNote, note.note_id)
+
+        assert job['result'] == {'note_id': note.note_id}
+        assert note.status == 'processed'
+        assert note.summary_data['success'] is True
+        assert StudyQuestion.query.filter_by(note_id=note.note_id).count() == \
+            len(note.summary_data['study_questions']) == note.question_count
+
+
+@pytest.mark.unit
+class TestLectureContentStore:
+    """Test lecture transcript deduplication and summary reuse"""
+
+    TEXT = ("Photosynthesis is defined as the process by which plants turn light into chemical energy. "
+            "It is important to remember that chlorophyll absorbs mostly red and blue light. "
+            "For example, leaves look green because green light is reflected. "
+            "The light reactions take place in the thylakoid membranes of the chloroplast. "
+            "The Calvin cycle then fixes carbon dioxide into sugars in the stroma. ") * 4
+
+    def test_identical_uploads_share_content(self, sqlite_app):
+        """Test whitespace-only differences map to one stored copy"""
+        from backend.lecture_store import LectureContentStore
+        from database.lecture_notes_model import LectureContent
+        from database import db
+
+        store = LectureContentStore()
+        first, created = store.acquire(self.TEXT)
+        second, created_again = store.acquire('  ' + self.TEXT.replace('. ', '.\n\n'))
+        db.session.commit()
+
+        assert created and not created_again
+        assert first is second
+        assert db.session.get(LectureContent, first.content_hash).ref_count == 2
+
+        store.release(first.content_hash)
+        db.session.commit()
+        assert db.session.get(LectureContent, first.content_hash).ref_count == 1
+        store.release(first.content_hash)
+        db.session.commit()
+        assert LectureContent.query.count() == 0
+
+    def test_simhash_finds_near_duplicate(self, sqlite_app):
+        """Test a one-word edit stays within the near-duplicate distance"""
+        from backend.lecture_store import LectureContentStore, simhash, hamming
+        from database import db
+
+        edited = self.TEXT.replace('stroma', 'cytoplasm', 1)
+        assert hamming(simhash(self.TEXT), simhash(edited)) <= 3
+        assert hamming(simhash(self.TEXT), simhash('Mitochondria are the powerhouse of the cell. ' * 20)) > 3
+
+        store = LectureContentStore(max_distance=3)
+        original, _ = store.acquire(self.TEXT)
+        store.fingerprint(original)
+        copy, _ = store.acquire(edited)
+        assert store.find_near_duplicate(copy) is None  # nothing summarized yet
+
+        original.summary_data = {'success': True, 'title': 'Plants'}
+        db.session.commit()
+        assert store.find_near_duplicate(copy) is original
+        assert LectureContentStore(max_distance=0).find_near_duplicate(copy) is None
+
+    def test_lecture_job_reuses_cached_summary(self, sqlite_app):
+        """Test a repeated upload is summarized once and counted in the stats"""
+        from unittest.mock import patch
+        from backend.job_queue import JobQueue
+        from backend.lecture_store import LectureContentStore
+        from database.lecture_notes_model import LectureNote
+        from database import db
+        from routes import lecture_routes
+
+        store = LectureContentStore()
+        queue = JobQueue(workers=0)
+        queue.register('lecture_summary', lecture_routes.process_lecture_job)
+
+        notes = []
+        with patch.object(lecture_routes, 'lecture_store', store), \
+                patch.object(lecture_routes, 'get_summarizer', wraps=lecture_routes.get_summarizer) as summarizer:
+            for title in ('Plants', 'Plants again'):
+                blob, _ = store.acquire(self.TEXT)
+                note = LectureNote(user_id=1, title=title, original_content='',
+                                   content_hash=blob.content_hash, status='pending')
+                db.session.add(note)
+                db.session.commit()
+                queue.submit('lecture_summary', {'note_id': note.note_id})
+                notes.append(db.session.get(LectureNote, note.note_id))
+
+        assert summarizer.call_count == 1
+        assert [note.status for note in notes] == ['processed', 'processed']
+        assert notes[1].summary_data['title'] == 'Plants again'
+        assert notes[0].content == notes[1].content == self.TEXT
+
+        stats = store.get_stats()
+        assert stats['uploads'] == 2 and stats['stored_contents'] == 1
+        assert stats['cache_hit_rate'] == 50.0
+        assert stats['bytes_saved'] == len(self.TEXT.encode('utf-8'))
+
+    def test_content_read_in_chunks(self, sqlite_app):
+        """Test stored transcripts are fingerprinted on upload and read back in chunks"""
+        import io
+        from sqlalchemy import inspect
+        from backend.lecture_store import LectureContentStore
+        from database.lecture_notes_model import LectureContent
+        from database import db
+        from routes.lecture_routes import read_transcript
+
+        store = LectureContentStore()
+        key = store.acquire(self.TEXT)[0].content_hash
+        db.session.commit()
+        db.session.expunge_all()
+
+        blob = db.session.get(LectureContent, key)
+        assert blob.simhash is not None
+        assert 'content' not in inspect(blob).dict  # deferred
+        chunks = list(store.iter_content(key, chunk_size=100))
+        assert ''.join(chunks) == self.TEXT
+        assert len(chunks) == -(-len(self.TEXT) // 100)
+        assert list(store.iter_content('missing')) == []
+
+        assert read_transcript(io.BytesIO('caf\u00e9'.encode('utf-8')), 5) == 'caf\u00e9'
+        assert read_transcript(io.BytesIO(b'x' * 6), 5) is None
+
+
+@pytest.mark.unit
+class TestLectureNoteListing:
+    """Test note lists read only small, precomputed columns"""
+
+    def _add_note(self, content, **fields):
+        from database.lecture_notes_model import LectureNote, make_preview
+        from database import db
+
+        note = LectureNote(user_id=1, title='Week 1', original_content=content,
+                           word_count=len(content.split()), preview=make_preview(content), **fields)
+        db.session.add(note)
+        db.session.commit()
+        return note.note_id
+
+    def test_list_dict_leaves_large_columns_unloaded(self, sqlite_app):
+        """Test list serialization never loads the transcript or summary"""
+        from database.lecture_notes_model import LectureNote
+        from database import db
+
+        content = 'Thermodynamics studies heat and work. ' * 2000
+        note_id = self._add_note(content, summary_data={'success': True}, question_count=4, concept_count=2)
+        db.session.expunge_all()
+
+        note = LectureNote.query.filter_by(user_id=1).one()
+        data = note.to_list_dict()
+        assert 'original_content' not in note.__dict__
+        assert 'summary_data' not in note.__dict__
+        assert data['original_content'] == content[:500] + '...'
+        assert (data['question_count'], data['concept_count']) == (4, 2)
+        assert 'summary_data' not in data
+
+        db.session.expunge_all()
+        note = db.session.get(LectureNote, note_id, options=[db.undefer_group('body')])
+        assert 'summary_data' in note.__dict__
+        assert note.to_dict_full()['original_content'] == content
+
+    def test_migration_backfills_previews_and_counts(self, sqlite_app):
+        """Test the list columns are filled in for notes created before them"""
+        from database.lecture_notes_model import LectureNote, StudyQuestion, KeyConcept
+        from database.migrations import add_lecture_note_list_columns
+        from database import db
+
+        short_id = self._add_note('Short transcript about entropy and heat engines.')
+        long_id = self._add_note('Carnot cycle. ' * 100)
+        db.session.add_all([StudyQuestion(note_id=long_id, question_text=f'Q{i}?') for i in range(3)])
+        db.session.add(KeyConcept(note_id=long_id, term='Carnot', definition='Ideal cycle'))
+        db.session.execute(db.update(LectureNote).values(preview=None, question_count=0, concept_count=0))
+        db.session.commit()
+
+        add_lecture_note_list_columns(batch_size=1)
+        db.session.expunge_all()
+
+        short, long = db.session.get(LectureNote, short_id), db.session.get(LectureNote, long_id)
+        assert short.preview == 'Short transcript about entropy and heat engines.'
+        assert long.preview.endswith('...') and len(long.preview) == 503
+        assert (long.question_count, long.concept_count) == (3, 1)
+        assert (short.question_count, short.concept_count) == (0, 0)
+
+
+@pytest.mark.unit
+class TestStreamingExport:
+    """Test chunked CSV/NDJSON/JSON exports"""
+
+    ROWS = [
+        {'id': 1, 'text': 'plain', 'tags': ['a', 'b'], 'when': None},
+        {'id': 2, 'text': 'comma, "quoted"\nnewline', 'tags': [], 'when': None}
+    ]
+
+    def test_formats_round_trip(self):
+        """Test every format decodes back to the rows, gzipped or not"""
+        import csv
+        import gzip
+        import io
+        import json
+        from backend.streaming_export import encode_rows
+
+        fields = ['id', 'text', 'tags']
+        text = b''.join(encode_rows(iter(self.ROWS), fields, 'csv')).decode('utf-8')
+        parsed = list(csv.DictReader(io.StringIO(text)))
+        assert [row['text'] for row in parsed] == ['plain', 'comma, "quoted"\nnewline']
+        assert parsed[0]['tags'] == 'a,b'
+
+        ndjson = b''.join(encode_rows(iter(self.ROWS), fields, 'ndjson')).decode('utf-8')
+        assert [json.loads(line) for line in ndjson.splitlines()] == self.ROWS
+
+        compressed = b''.join(encode_rows(iter(self.ROWS), fields, 'json', compress=True))
+        assert json.loads(gzip.decompress(compressed)) == self.ROWS
+        assert json.loads(b''.join(encode_rows(iter([]), fields, 'json'))) == []
+
+        with pytest.raises(ValueError):
+            list(encode_rows(iter(self.ROWS), fields, 'xml'))
+
+    def test_conversation_export_streams_from_database(self, sqlite_app):
+        """Test conversations stream through a chunked response with their ratings"""
+        import csv
+        import io
+        from database import db
+        from database.models import User, Conversation, Feedback
+        from backend.analytics import Analytics, CONVERSATION_EXPORT_FIELDS
+        from backend.streaming_export import export_response
+
+        user = User(username='student', email='s@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        for i in range(5):
+            db.session.add(Conversation(user_id=user.user_id, message=f'question {i}', response='answer'))
+        db.session.flush()
+        db.session.add(Feedback(conversation_id=1, rating='good'))
+        db.session.commit()
+
+        with sqlite_app.test_request_context('/admin/conversations/export'):
+            rows = Analytics(None).iter_conversation_rows(batch_size=2)
+            response = export_response(rows, CONVERSATION_EXPORT_FIELDS, 'csv', filename='conversations')
+            assert response.is_streamed
+            assert 'conversations.csv' in response.headers['Content-Disposition']
+            body = b''.join(response.response).decode('utf-8')
+
+        parsed = list(csv.DictReader(io.StringIO(body)))
+        assert [row['message'] for row in parsed] == [f'question {i}' for i in range(5)]
+        assert parsed[0]['username'] == 'student'
+        assert [row['feedback_rating'] for row in parsed[:2]] == ['good', '']
+        assert parsed[0]['timestamp']
+
+
+@pytest.mark.unit
+class TestKeysetPagination:
+    """Test cursor pagination of newest-first listings"""
+
+    def _conversations(self, count):
+        from datetime import datetime, timedelta
+        from database import db
+        from database.models import User, Conversation
+
+        user = User(username='student', email='s@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        start = datetime(2024, 1, 1, 9, 0)
+        # Pairs share a timestamp, so the id tiebreaker matters
+        db.session.add_all([
+            Conversation(user_id=user.user_id, message=f'q{i}', response='a',
+                         timestamp=start + timedelta(minutes=i // 2))
+            for i in range(count)
+        ])
+        db.session.commit()
+        return user.user_id
+
+    def test_cursor_round_trip(self):
+        """Test cursors encode datetimes and reject tampering"""
+        from datetime import datetime
+        from database.pagination import encode_cursor, decode_cursor, InvalidCursorError
+
+        when = datetime(2024, 5, 1, 12, 30, 15, 250)
+        assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+        assert decode_cursor(encode_cursor(7.5, 3)) == (7.5, 3)
+        for bad in ('not-a-cursor', encode_cursor(1, 2)[:-3] + '!!!', '',
+                    encode_cursor([1], 2), encode_cursor({'t': 1}, 2), encode_cursor({'x': '1'}, 2),
+                    encode_cursor(None, 2), encode_cursor('a', '2'), encode_cursor('a', True)):
+            with pytest.raises(InvalidCursorError):
+                decode_cursor(bad)
+
+    def test_per_page_is_clamped(self):
+        """Test ?per_page= cannot ask for the whole table"""
+        from flask import Flask, request
+        from database.pagination import pagination_args
+
+        app = Flask(__name__)
+        for query, expected in (('', 20), ('?per_page=1000000', 100), ('?per_page=0', 1),
+                                ('?per_page=abc', 20), ('?per_page=50&include_total=1', 50)):
+            with app.test_request_context('/' + query):
+                assert pagination_args(request)[1] == expected
+
+    def test_pages_cover_every_row_once(self, sqlite_app):
+        """Test walking the cursors returns each conversation once, newest first"""
+        from database import db
+        from database.db_manager import DatabaseManager
+        from database.pagination import count_cache
+
+        user_id = self._conversations(23)
+        manager = DatabaseManager(db)
+        count_cache.invalidate()
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = manager.get_user_conversations(user_id, cursor, per_page=5, with_total=(pages == 0))
+            seen.extend(c.message for c in page.items)
+            pages += 1
+            if pages == 1:
+                assert page.to_dict()['total'] == 23
+            else:
+                assert 'total' not in page.to_dict()
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+
+        assert pages == 5
+        assert seen == [f'q{i}' for i in reversed(range(23))]
+
+        # The total is cached per listing until it expires or is invalidated
+        self._add_more(user_id)
+        assert manager.get_user_conversations(user_id, with_total=True).total == 23
+        count_cache.invalidate(f'conversations:{user_id}')
+        assert manager.get_user_conversations(user_id, with_total=True).total == 24
+
+    def _add_more(self, user_id):
+        from database import db
+        from database.models import Conversation
+
+        db.session.add(Conversation(user_id=user_id, message='late', response='a'))
+        db.session.commit()
+
+    def test_seek_uses_composite_index(self, sqlite_app):
+        """Test the chat history seek is an index range scan, not a sort"""
+        from sqlalchemy import event
+        from database import db
+        from database.db_manager import DatabaseManager
+
+        user_id = self._conversations(10)
+        manager = DatabaseManager(db)
+        cursor = manager.get_user_conversations(user_id, per_page=3).next_cursor
+
+        captured = []
+        def capture(conn, cursor_, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            page = manager.get_user_conversations(user_id, cursor, per_page=3)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        assert [c.message for c in page.items] == ['q6', 'q5', 'q4']
+        statement, parameters = captured[-1]
+        plan = ' '.join(
+            str(row[-1]) for row in
+            db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        )
+        assert 'ix_conversations_user_timestamp' in plan
+        assert 'TEMP B-TREE' not in plan
+
+@pytest.mark.unit
+class TestQueryPlans:
+    """Test hot DatabaseManager queries are served by indexes"""
+
+    def _seed(self):
+        from database import db
+        from database.models import User, Conversation, Feedback, KnowledgeBase, Session, Analytics
+        from database.lecture_notes_model import LectureNote
+        from backend.context_manager import ConversationContext
+
+        user = User(username='student', email='s@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Session(session_id='s1', user_id=user.user_id))
+        db.session.add(Analytics(user_id=user.user_id))
+        db.session.add(ConversationContext(session_id='s1', user_id=user.user_id))
+        db.session.add_all([
+            Conversation(user_id=user.user_id, session_id='s1', message=f'q{i}', response='a')
+            for i in range(5)
+        ])
+        db.session.flush()
+        db.session.add(Feedback(conversation_id=1, rating='good'))
+        db.session.add(KnowledgeBase(question='q', answer='a', created_by=user.user_id))
+        db.session.add(LectureNote(user_id=user.user_id, title='t', original_content='c'))
+        db.session.commit()
+        return user.user_id
+
+    def test_hot_queries_use_indexes(self, sqlite_app):
+        """Test no hot query reads a whole table"""
+        from database import db
+        from database.db_manager import DatabaseManager
+        from database.models import Conversation
+        from database.lecture_notes_model import LectureNote
+        from database.query_plans import capture_queries, audit
+        from backend.context_manager import ConversationContext
+
+        user_id = self._seed()
+        manager = DatabaseManager(db)
+        with capture_queries() as captured:
+            manager.get_user_by_id(user_id)
+            manager.get_user_by_username('student')
+            manager.get_user_by_email('s@example.com')
+            manager.get_all_users(manager.get_all_users(per_page=1).next_cursor)
+            page = manager.get_user_conversations(user_id, per_page=2)
+            manager.get_user_conversations(user_id, page.next_cursor, per_page=2)
+            manager.get_recent_conversations()
+            manager.search_conversations('q', user_id=user_id)
+            manager.get_all_feedback()
+            manager.get_feedback_stats()
+            manager.get_all_knowledge('pending')
+            manager.get_approved_knowledge()
+            manager.get_pending_knowledge()
+            manager.get_session('s1')
+            manager.get_analytics(user_id)
+            ConversationContext.query.filter_by(session_id='s1').first()
+            Conversation.query.filter_by(session_id='s1').all()
+            LectureNote.query.filter_by(user_id=user_id).order_by(LectureNote.created_at.desc()).limit(10).all()
+
+        report = audit(captured)
+        assert len(report) >= 18
+        offenders = ['{} -> {}'.format(r['sql'], r['plan']) for r in report if r['full_scans']]
+        assert not offenders, 'Full table scans:\n' + '\n'.join(offenders)
+
+    def test_detects_full_scan(self, sqlite_app):
+        """Test an unindexed filter is reported"""
+        from database.models import Conversation
+        from database.query_plans import capture_queries, audit
+
+        self._seed()
+        with capture_queries() as captured:
+            Conversation.query.filter_by(response='a').all()
+
+        assert audit(captured)[0]['full_scans'] == ['conversations']
+
+
+@pytest.mark.unit
+class TestEngineConfig:
+    """Test connection pool options and SQLite pragmas"""
+
+    def _file_app(self, tmp_path, **config):
+        from flask import Flask
+        from database import db
+        from database.engine import configure_engine_options, init_engine
+
+        flask_app = Flask(__name__)
+        flask_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'edubot.db'}"
+        flask_app.config.update(config)
+        configure_engine_options(flask_app)
+        db.init_app(flask_app)
+        init_engine(flask_app, db)
+        return flask_app
+
+    def test_engine_options_per_dialect(self):
+        """Test server databases get a recycled, pre-pinged pool and memory SQLite is untouched"""
+        from database.engine import engine_options, TimedQueuePool
+
+        options = engine_options('mysql+pymysql://u:p@db/edubot', {'DB_POOL_SIZE': 8, 'DB_POOL_RECYCLE': 600})
+        assert options['poolclass'] is TimedQueuePool
+        assert options['pool_size'] == 8
+        assert options['pool_recycle'] == 600
+        assert options['pool_pre_ping'] is True
+
+        sqlite_options = engine_options('sqlite:///edubot.db', {'SQLITE_BUSY_TIMEOUT': 5})
+        assert sqlite_options['connect_args'] == {'timeout': 5, 'check_same_thread': False}
+        assert 'pool_recycle' not in sqlite_options
+        assert engine_options('sqlite:///:memory:', {}) == {}
+
+    def test_sqlite_pragmas_and_pool_metrics(self, tmp_path):
+        """Test file SQLite runs in WAL mode and checkouts are counted"""
+        from database import db
+        from database.engine import pool_metrics
+
+        flask_app = self._file_app(tmp_path, SQLITE_MMAP_SIZE=1048576)
+        pool_metrics.reset()
+        with flask_app.app_context():
+            conn = db.session.connection()
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 30000
+
+            stats = pool_metrics.get_stats()
+            assert stats['checkouts'] == 1
+            assert stats['in_use'] >= 1
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_concurrent_writers_wait_for_lock(self, tmp_path):
+        """Test parallel writers queue on the lock instead of failing"""
+        import threading
+        from database import db
+        from database.models import User
+
+        flask_app = self._file_app(tmp_path)
+        with flask_app.app_context():
+            db.create_all()
+
+        errors = []
+
+        def write(worker):
+            with flask_app.app_context():
+                try:
+                    for i in range(20):
+                        db.session.add(User(username=f'w{worker}-{i}', email=f'w{worker}-{i}@x.com',
+                                            password_hash='x'))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with flask_app.app_context():
+            assert not errors
+            assert User.query.count() == 120
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.mark.unit
+class TestReplicaRouting:
+    """Test read_only() routing between two SQLite files"""
+
+    def _replica_app(self, tmp_path, **config):
+        from flask import Flask
+        from database import db
+        from database.engine import configure_engine_options, init_engine
+        from database.replica import init_replica
+
+        flask_app = Flask(__name__)
+        flask_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primary.db'}"
+        flask_app.config['REPLICA_DATABASE_URL'] = f"sqlite:///{tmp_path / 'replica.db'}"
+        flask_app.config.update(config)
+        configure_engine_options(flask_app)
+        db.init_app(flask_app)
+        init_engine(flask_app, db)
+        init_replica(flask_app)
+        with flask_app.app_context():
+            db.create_all()
+            db.metadata.create_all(flask_app.extensions['replica_engine'])
+        return flask_app
+
+    def _add_user(self, engine, username):
+        from database.models import User
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert().values(
+                username=username, email=f'{username}@x.com', password_hash='x'))
+
+    def _usernames(self):
+        from database.models import User
+        return [user.username for user in User.query.order_by(User.user_id).all()]
+
+    def test_reads_go_to_replica_and_writes_to_primary(self, tmp_path):
+        """Test queries in read_only() use the replica while flushes stay on the primary"""
+        from database import db
+        from database.models import User
+        from database.replica import read_only
+
+        flask_app = self._replica_app(tmp_path)
+        with flask_app.app_context():
+            self._add_user(db.engines[None], 'on-primary')
+            self._add_user(flask_app.extensions['replica_engine'], 'on-replica')
+
+            assert self._usernames() == ['on-primary']
+            with read_only():
+                assert self._usernames() == ['on-replica']
+                db.session.add(User(username='written', email='w@x.com', password_hash='x'))
+                db.session.commit()
+
+            @read_only()
+            def report():
+                return self._usernames()
+
+            assert report() == ['on-replica']
+            assert self._usernames() == ['on-primary', 'written']
+            db.session.remove()
+
+    def test_lagging_replica_falls_back_to_primary(self, tmp_path):
+        """Test reads return to the primary once the replica trails beyond REPLICA_MAX_LAG"""
+        from datetime import timedelta
+        from database import db
+        from database.models import ReplicaHeartbeat
+        from database.replica import read_only, replica_router
+
+        flask_app = self._replica_app(tmp_path, REPLICA_MAX_LAG=2, REPLICA_CHECK_INTERVAL=0)
+        heartbeat = ReplicaHeartbeat.__table__
+        with flask_app.app_context():
+            self._add_user(db.engines[None], 'on-primary')
+            self._add_user(flask_app.extensions['replica_engine'], 'on-replica')
+
+            with read_only():
+                assert self._usernames() == ['on-replica']  # First heartbeat written
+            db.session.remove()
+
+            # Replica applied a heartbeat 10 seconds older than the primary's
+            with db.engines[None].connect() as conn:
+                beat = conn.execute(db.select(heartbeat.c.beat_at)).scalar()
+            with flask_app.extensions['replica_engine'].begin() as conn:
+                conn.execute(heartbeat.insert().values(heartbeat_id=1, beat_at=beat - timedelta(seconds=10)))
+            with db.engines[None].begin() as conn:
+                conn.execute(heartbeat.update().values(beat_at=beat))
+
+            with read_only():
+                assert self._usernames() == ['on-primary']
+            assert replica_router.get_stats()['healthy'] is False
+            assert replica_router.lag == pytest.approx(10)
+            db.session.remove()
+
+            # Caught up again
+            with db.engines[None].connect() as conn:
+                beat = conn.execute(db.select(heartbeat.c.beat_at)).scalar()
+            with flask_app.extensions['replica_engine'].begin() as conn:
+                conn.execute(heartbeat.update().values(beat_at=beat))
+            with read_only():
+                assert self._usernames() == ['on-replica']
+            db.session.remove()
+
+    def test_streamed_rows_keep_replica_connection(self, tmp_path):
+        """Test rows streamed after read_only() exits still come from the replica"""
+        from database import db
+        from database.models import User
+        from database.replica import read_only
+        from backend.streaming_export import iter_rows
+
+        flask_app = self._replica_app(tmp_path)
+        with flask_app.app_context():
+            self._add_user(db.engines[None], 'on-primary')
+            self._add_user(flask_app.extensions['replica_engine'], 'on-replica')
+
+            with read_only():
+                rows = iter_rows(db.select(User.username))
+            assert [row['username'] for row in rows] == ['on-replica']
+            db.session.remove()
+
+    def test_without_replica_reads_primary(self, sqlite_app):
+        """Test read_only() is a no-op when no replica bind is configured"""
+        from database import db
+        from database.replica import read_only
+
+        self._add_user(db.engine, 'on-primary')
+        with read_only():
+            assert self._usernames() == ['on-primary']
+
+
+@pytest.mark.unit
+class TestPrincipalCache:
+    """Test auth decorators reuse cached principals until invalidated"""
+
+    def _user(self, role='admin'):
+        from database import db
+        from database.models import User
+
+        user = User(username='admin1', email='a@example.com', password_hash='x', role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user.user_id
+
+    def _users_queries(self, captured):
+        return [sql for sql, _ in captured if 'FROM users' in sql]
+
+    def test_session_checks_hit_cache_until_role_changes(self, sqlite_app):
+        """Test admin_required reads users once and sees update_user immediately"""
+        from database import db
+        from database.db_manager import DatabaseManager
+        from database.query_plans import capture_queries
+        from backend.principal_cache import principal_cache
+        from backend.utils import admin_required, login_required
+
+        principal_cache.clear()
+        sqlite_app.secret_key = 'test'
+
+        @sqlite_app.route('/admin-only')
+        @login_required
+        @admin_required
+        def admin_only():
+            return 'ok'
+
+        user_id = self._user()
+        client = sqlite_app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+
+        with capture_queries() as captured:
+            for _ in range(5):
+                assert client.get('/admin-only').status_code == 200
+        assert len(self._users_queries(captured)) == 1
+
+        DatabaseManager(db).update_user(user_id, role='user')
+        assert client.get('/admin-only').status_code == 403
+
+        DatabaseManager(db).update_user(user_id, is_active=False)
+        assert client.get('/admin-only').status_code == 401
+
+    def test_jwt_uses_current_role_and_forgets_revoked_tokens(self, sqlite_app):
+        """Test role_required follows role changes made after the token was issued"""
+        from backend.jwt_auth import JWTAuth, role_required
+        from backend.principal_cache import principal_cache
+
+        principal_cache.clear()
+        jwt_auth = JWTAuth('secret')
+        sqlite_app.jwt_auth = jwt_auth
+
+        @sqlite_app.route('/jwt-admin')
+        @role_required('admin')
+        def jwt_admin():
+            return 'ok'
+
+        user_id = self._user()
+        token = jwt_auth.generate_access_token(user_id, 'admin1', 'admin')
+        headers = {'Authorization': f'Bearer {token}'}
+        client = sqlite_app.test_client()
+
+        assert client.get('/jwt-admin', headers=headers).status_code == 200
+        assert principal_cache.get_stats()['tokens'] == 1
+
+        from database import db
+        from database.models import User
+        db.session.get(User, user_id).role = 'user'
+        db.session.commit()
+        assert client.get('/jwt-admin', headers=headers).status_code == 200  # Cached within TTL
+        principal_cache.invalidate(user_id)
+        assert client.get('/jwt-admin', headers=headers).status_code == 403
+
+        jwt_auth.revoke_token(token)
+        assert principal_cache.get_stats()['tokens'] == 0
+        assert client.get('/jwt-admin', headers=headers).status_code == 401
+
+
+@pytest.mark.unit
+class TestTokenRevocation:
+    """Test the persistent JWT revocation list and its Bloom filter"""
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test every added key is found and unknown keys rarely are"""
+        from backend.token_revocation import BloomFilter
+
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        assert all(f'jti-{i}' in bloom for i in range(1000))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        assert false_positives < 300  # ~1% expected
+
+    def test_sql_store_shared_between_workers(self, sqlite_app):
+        """Test a revocation in one worker reaches another after a sync and unknown ids skip the store"""
+        import time
+        from database.query_plans import capture_queries
+        from backend.token_revocation import SQLRevocationStore, TokenRevocationList
+
+        worker_a = TokenRevocationList(SQLRevocationStore(), capacity=1000, sync_interval=0)
+        worker_b = TokenRevocationList(SQLRevocationStore(), capacity=1000, sync_interval=3600)
+        assert worker_b.is_revoked('jti-1') is False  # Builds b's filter
+
+        worker_a.revoke('jti-1', time.time() + 3600)
+        assert worker_a.is_revoked('jti-1') is True
+        assert worker_b.is_revoked('jti-1') is False  # Not synced yet
+        worker_b.sync()
+        assert worker_b.is_revoked('jti-1') is True
+
+        with capture_queries() as captured:
+            for i in range(50):
+                assert worker_b.is_revoked(f'never-revoked-{i}') is False
+        assert not [sql for sql, _ in captured if 'revoked_tokens' in sql]
+        assert worker_b.get_stats()['bloom_negatives'] >= 50
+
+    def test_expired_revocations_are_purged(self, sqlite_app):
+        """Test the sweeper deletes revocations of expired tokens"""
+        import time
+        from backend.expiry_sweeper import ExpirySweeper
+        from backend.token_revocation import RevokedToken, SQLRevocationStore, TokenRevocationList
+
+        revocations = TokenRevocationList(SQLRevocationStore(), capacity=1000)
+        revocations.revoke('expired', time.time() - 10)
+        revocations.revoke('live', time.time() + 3600)
+        assert revocations.is_revoked('expired') is False
+
+        report = ExpirySweeper(revocation_list=revocations).run_once()
+        assert report['revoked_tokens_deleted'] == 1
+        assert [row.jti for row in RevokedToken.query.all()] == ['live']
+
+        revocations.rebuild()
+        assert revocations.get_stats()['bloom_entries'] == 1
+
+    def test_redis_store(self):
+        """Test the Redis store against an in-process fake client"""
+        import time
+        from backend.token_revocation import RedisRevocationStore, TokenRevocationList
+
+        fake = _FakeRedis()
+        store = RedisRevocationStore(fake, max_token_lifetime=3600)
+        revocations = TokenRevocationList(store, capacity=1000)
+        revocations.revoke('jti-1', time.time() + 60)
+
+        assert revocations.is_revoked('jti-1') is True
+        assert revocations.is_revoked('jti-2') is False
+        assert list(store.revoked_since(0)) == ['jti-1']
+
+        fake.zadd(store.log_key, {f'old {int(time.time()) - 7200}': time.time() - 7200})
+        assert store.prune()['revoked_tokens_deleted'] == 1
+
+    def test_jwt_revocation_persists(self, sqlite_app):
+        """Test a revoked token is rejected by a fresh JWTAuth using the same store"""
+        import jwt as pyjwt
+        from backend.jwt_auth import JWTAuth
+        from backend.token_revocation import SQLRevocationStore, token_revocations
+
+        store = token_revocations.store
+        token_revocations.configure(SQLRevocationStore())
+        try:
+            token = JWTAuth('secret').generate_access_token(1, 'student')
+            assert JWTAuth('secret').revoke_token(token)
+
+            token_revocations.configure(SQLRevocationStore())  # As after a restart
+            with pytest.raises(pyjwt.InvalidTokenError):
+                JWTAuth('secret').verify_token(token)
+        finally:
+            token_revocations.configure(store)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,423 @@
+"""
+Performance Benchmarks
+Micro-benchmarks for request-path overhead of backend modules
+"""
+
+import time
+
+import pytest
+
+
+def _run(wsgi_app, environ, iterations):
+    """Call a WSGI app repeatedly and return mean nanoseconds per call"""
+    def start_response(status, headers, exc_info=None):
+        return None
+
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        result = wsgi_app(dict(environ), start_response)
+        for _chunk in result:
+            pass
+        if hasattr(result, 'close'):
+            result.close()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+@pytest.mark.slow
+class TestRequestMiddlewareOverhead:
+    """Benchmark per-request overhead of the request middleware"""
+
+    ITERATIONS = 20000
+    CLIENTS = 200
+
+    def test_middleware_overhead(self):
+        """Test timing, metrics, logging and rate limiting add little per request"""
+        import logging
+        from backend.performance_monitor import PerformanceMonitor
+        from backend.rate_limiter import RateLimiter
+        from backend.request_middleware import RequestMiddleware
+
+        def bare_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        logger = logging.getLogger('edubot.benchmark')
+        logger.setLevel(logging.WARNING)
+        rate_limiter = RateLimiter()
+        rate_limiter.default_limits = {
+            'requests_per_minute': 10 ** 9,
+            'requests_per_hour': 10 ** 9,
+            'requests_per_day': 10 ** 9
+        }
+
+        middleware = RequestMiddleware(
+            bare_app,
+            logger=logger,
+            monitor=PerformanceMonitor(),
+            rate_limiter=rate_limiter
+        )
+
+        page = {'PATH_INFO': '/dashboard', 'REQUEST_METHOD': 'GET',
+                'REMOTE_ADDR': '127.0.0.1'}
+        health = dict(page, PATH_INFO='/health')
+
+        baseline_ns = _run(bare_app, page, self.ITERATIONS)
+        tracked_ns = _run(middleware, page, self.ITERATIONS)
+        skipped_ns = _run(middleware, health, self.ITERATIONS)
+
+        # /api/ paths are also rate limited; the limiter scans each client's
+        # request history, so spread the requests over CLIENTS addresses
+        limited_ns = 0
+        per_client = self.ITERATIONS // self.CLIENTS
+        for client in range(self.CLIENTS):
+            api = dict(page, PATH_INFO='/api/chat', REMOTE_ADDR=f'10.0.{client // 256}.{client % 256}')
+            limited_ns += _run(middleware, api, per_client) / self.CLIENTS
+
+        overhead_us = (tracked_ns - baseline_ns) / 1000
+        limited_us = (limited_ns - baseline_ns) / 1000
+        skipped_us = (skipped_ns - baseline_ns) / 1000
+        print(f"\nMiddleware overhead: {overhead_us:.2f}us/request "
+              f"(rate-limited /api/ path with {per_client} requests per client: {limited_us:.2f}us, "
+              f"skipped path: {skipped_us:.2f}us)")
+
+        assert rate_limiter.get_usage_stats('10.0.0.0')['total_requests'] == per_client
+        assert overhead_us < 100
+        assert limited_us < 200
+        assert skipped_us < 5
+
+
+@pytest.mark.slow
+class TestSessionStoreThroughput:
+    """Benchmark the server-side session read/write path"""
+
+    SESSIONS = 2000
+
+    def _time_store(self, store, payload):
+        import secrets
+
+        sids = [secrets.token_urlsafe(32) for _ in range(self.SESSIONS)]
+        expires_at = int(time.time()) + 3600
+
+        start = time.perf_counter_ns()
+        for sid in sids:
+            store.set(sid, payload, expires_at)
+        write_ns = (time.perf_counter_ns() - start) / len(sids)
+
+        start = time.perf_counter_ns()
+        for sid in sids:
+            store.get(sid)
+        read_ns = (time.perf_counter_ns() - start) / len(sids)
+        return read_ns / 1000, write_ns / 1000
+
+    def test_file_store_vs_flat_cache(self, tmp_path):
+        """Test the sharded store keeps pace with the old flat pickle cache"""
+        cachelib = pytest.importorskip('cachelib')
+        from flask.sessions import session_json_serializer
+        from backend.session_store import ShardedFileSessionStore
+
+        data = {'user_id': 42, 'username': 'student', 'role': 'user', '_permanent': True}
+        payload = session_json_serializer.dumps(data).encode('utf-8')
+
+        store = ShardedFileSessionStore(str(tmp_path / 'sharded'))
+        read_us, write_us = self._time_store(store, payload)
+
+        flat = cachelib.FileSystemCache(str(tmp_path / 'flat'), threshold=0)
+        start = time.perf_counter_ns()
+        for i in range(self.SESSIONS):
+            flat.set(f'session:{i}', data, timeout=3600)
+        flat_write_us = (time.perf_counter_ns() - start) / self.SESSIONS / 1000
+        start = time.perf_counter_ns()
+        for i in range(self.SESSIONS):
+            flat.get(f'session:{i}')
+        flat_read_us = (time.perf_counter_ns() - start) / self.SESSIONS / 1000
+
+        print(f"\nSharded file store: read {read_us:.1f}us, write {write_us:.1f}us "
+              f"(flat cache: read {flat_read_us:.1f}us, write {flat_write_us:.1f}us)")
+
+        assert read_us < 500
+        assert write_us < 2000
+
+    def test_unmodified_requests_skip_writes(self, tmp_path):
+        """Test read-only requests cost a read but no write"""
+        from flask import Flask, session
+        from backend.session_store import ShardedFileSessionStore, StoreSessionInterface
+
+        flask_app = Flask(__name__)
+        flask_app.secret_key = 'benchmark'
+        flask_app.session_interface = StoreSessionInterface(
+            ShardedFileSessionStore(str(tmp_path))
+        )
+
+        @flask_app.route('/login')
+        def login():
+            session['user_id'] = 42
+            return 'ok'
+
+        @flask_app.route('/page')
+        def page():
+            session.permanent = True
+            return str(session.get('user_id'))
+
+        client = flask_app.test_client()
+        client.get('/login')
+
+        start = time.perf_counter_ns()
+        for _ in range(1000):
+            client.get('/page')
+        request_us = (time.perf_counter_ns() - start) / 1000 / 1000
+
+        stats = flask_app.session_interface.get_stats()
+        print(f"\nRead-only request with session: {request_us:.1f}us, "
+              f"writes={stats['writes']}, skipped={stats['skipped_writes']}")
+
+        assert stats['writes'] == 1
+        assert stats['reads'] == 1000
+
+
+@pytest.mark.slow
+class TestAutocompleteLatency:
+    """Benchmark suggestion lookups against a large candidate set"""
+
+    CANDIDATES = 100000
+
+    def test_suggest_under_one_millisecond(self):
+        """Test prefix, typo and mid-text lookups stay under 1 ms at 100k candidates"""
+        import random
+        from backend.autocomplete_engine import AutocompleteEngine
+
+        rng = random.Random(7)
+        openers = ['what is', 'how do i', 'explain', 'tell me about', 'why does',
+                   'can you describe', 'where can i find', 'when should i']
+        words = ['photosynthesis', 'derivatives', 'relativity', 'scholarship',
+                 'admission', 'chemistry', 'algebra', 'semester', 'library',
+                 'thermodynamics', 'probability', 'statistics', 'hostel', 'exam',
+                 'geometry', 'biology', 'programming', 'database', 'network']
+
+        engine = AutocompleteEngine()
+        engine.patterns = {
+            f"{rng.choice(openers)} {' '.join(rng.sample(words, 3))} {i}"
+            for i in range(self.CANDIDATES)
+        }
+        build_start = time.perf_counter()
+        engine.rebuild_index()
+        build_s = time.perf_counter() - build_start
+        for i in range(100):
+            engine.add_to_history(f'what is topic {i}', user_id=1)
+
+        queries = ['wh', 'what is', 'how do i deriv', 'explain thermo',
+                   'whta is', 'probabilty', 'statistics hostel', 'zzzz']
+        iterations = 200
+
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            for query in queries:
+                engine.get_suggestions(query, 10, user_id=1)
+        per_query_us = (time.perf_counter_ns() - start) / (iterations * len(queries)) / 1000
+
+        print(f"\nAutocomplete over {len(engine.index)} entries: "
+              f"{per_query_us:.1f}us/query (index build {build_s:.2f}s)")
+
+        assert len(engine.get_suggestions('explain thermo', 10)) == 10
+        assert per_query_us < 1000
+
+
+@pytest.mark.slow
+class TestTrendingAccuracy:
+    """Benchmark the trending tracker on a skewed query stream"""
+
+    QUERIES = 300000
+
+    def test_top_k_matches_exact_counts(self):
+        """Test Space-Saving finds the true top 10 of a Zipf stream"""
+        import random
+        from collections import Counter
+        from backend.trending_tracker import TrendingTracker
+
+        rng = random.Random(3)
+        weights = [1 / rank ** 1.1 for rank in range(1, 50001)]
+        stream = rng.choices(range(50000), weights=weights, k=self.QUERIES)
+
+        tracker = TrendingTracker(windows={'all': 10 ** 9}, capacity=1000)
+        start = time.perf_counter_ns()
+        for i, item in enumerate(stream):
+            tracker.record(f'query {item}', user_id=i % 5000)
+        record_us = (time.perf_counter_ns() - start) / len(stream) / 1000
+
+        start = time.perf_counter_ns()
+        for _ in range(1000):
+            top = tracker.top('all', 10)
+        top_us = (time.perf_counter_ns() - start) / 1000 / 1000
+
+        exact = [f'query {item}' for item, _ in Counter(stream).most_common(10)]
+        print(f"\nTrending: record {record_us:.1f}us, top-10 {top_us:.2f}us")
+
+        assert [t['query'] for t in top] == exact
+        assert len(tracker.user_history) == 5000
+        assert top_us < 50
+
+
+@pytest.mark.slow
+class TestSentimentThroughput:
+    """Benchmark the compiled sentiment analyzer against TextBlob"""
+
+    def test_faster_than_textblob(self):
+        """Test uncached scoring beats TextBlob and repeats hit the cache"""
+        textblob = pytest.importorskip('textblob')
+        from backend.sentiment_analyzer import SentimentAnalyzer
+
+        messages = [
+            f"Message {i}: the lecture was really not that good, but the lab is great!"
+            for i in range(500)
+        ]
+        analyzer = SentimentAnalyzer(cache_size=len(messages))
+        analyzer.load()
+        textblob.TextBlob('warm up').sentiment
+
+        start = time.perf_counter_ns()
+        for message in messages:
+            textblob.TextBlob(message).sentiment
+        textblob_us = (time.perf_counter_ns() - start) / len(messages) / 1000
+
+        start = time.perf_counter_ns()
+        for message in messages:
+            analyzer.analyze(message)
+        cold_us = (time.perf_counter_ns() - start) / len(messages) / 1000
+
+        start = time.perf_counter_ns()
+        for message in messages:
+            analyzer.analyze(message)
+        cached_us = (time.perf_counter_ns() - start) / len(messages) / 1000
+
+        print(f"\nSentiment: TextBlob {textblob_us:.1f}us, compiled {cold_us:.1f}us, "
+              f"cached {cached_us:.2f}us per message")
+
+        assert cold_us < textblob_us
+        assert cached_us < 5
+
+
+@pytest.mark.slow
+class TestLectureSummarizerScaling:
+    """Benchmark the TF-IDF summarizer on synthetic transcripts"""
+
+    SIZES = (1000, 10000, 50000, 100000)  # words; ~100k is a 200-page transcript
+
+    @staticmethod
+    def _transcript(words, seed=5):
+        import random
+
+        rng = random.Random(seed)
+        topic = ('energy entropy heat work system engine cycle temperature pressure '
+                 'volume gas reversible process equilibrium law').split()
+        filler = [f'term{i}' for i in range(3000)]
+        cues = ['is defined as', 'for example', 'it is important that', 'therefore']
+        sentences = []
+        count = 0
+        while count < words:
+            length = rng.randint(8, 25)
+            tokens = rng.choices(topic, k=length // 3) + rng.choices(filler, k=length - length // 3)
+            rng.shuffle(tokens)
+            if rng.random() < 0.1:
+                tokens.insert(1, rng.choice(cues))
+            sentences.append(' '.join(tokens).capitalize() + '.')
+            count += length
+        return ' '.join(sentences)
+
+    def test_scales_to_long_transcripts(self):
+        """Test a ~100k word transcript summarizes in well under a second"""
+        from backend.lecture_summarizer import TfidfLectureSummarizer
+
+        summarizer = TfidfLectureSummarizer()
+        timings = {}
+        for size in self.SIZES:
+            transcript = self._transcript(size)
+            start = time.perf_counter()
+            result = summarizer.summarize_lecture(transcript, 'Synthetic')
+            timings[size] = time.perf_counter() - start
+            assert result['success'] is True
+            assert len(result['summary']['bullet_points']) == 10
+            assert result['key_concepts']
+
+        print('\nTF-IDF summarizer: ' + ', '.join(
+            f'{size} words {seconds * 1000:.0f}ms' for size, seconds in timings.items()
+        ))
+
+        assert timings[100000] < 0.8
+        # Roughly linear: 10x the words costs well under 20x the time
+        assert timings[100000] < 20 * timings[10000]
+
+    def test_streaming_uses_less_memory(self):
+        """Test chunked summarization of a transcript file peaks below whole-string mode"""
+        import io
+        import tracemalloc
+        from backend.lecture_summarizer import TfidfLectureSummarizer, iter_text_chunks
+
+        summarizer = TfidfLectureSummarizer()
+        encoded = self._transcript(100000).encode('utf-8')
+
+        tracemalloc.start()
+        try:
+            streamed = summarizer.summarize_stream(iter_text_chunks(io.BytesIO(encoded)))
+            stream_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            whole = summarizer.summarize_lecture(encoded.decode('utf-8'))
+            whole_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        print(f"\nPeak memory for {len(encoded) / 1e6:.1f}MB: streamed "
+              f"{stream_peak / 1e6:.1f}MB, whole string {whole_peak / 1e6:.1f}MB")
+
+        assert streamed['summary'] == whole['summary']
+        assert stream_peak < whole_peak * 0.6
+
+
+@pytest.mark.slow
+class TestStreamingExportMemory:
+    """Benchmark export memory against building the whole file"""
+
+    def test_export_memory_is_flat(self, sqlite_app):
+        """Test streaming 50k conversations peaks far below the buffered export"""
+        import csv
+        import io
+        import tracemalloc
+        from database import db
+        from database.models import User, Conversation
+        from backend.analytics import Analytics, CONVERSATION_EXPORT_FIELDS
+        from backend.streaming_export import encode_rows
+
+        db.session.add(User(username='student', email='s@example.com', password_hash='x'))
+        db.session.flush()
+        db.session.execute(db.insert(Conversation), [
+            {'user_id': 1, 'message': f'What is topic {i}?', 'response': 'It is explained in week 3. ' * 4}
+            for i in range(50000)
+        ])
+        db.session.commit()
+        analytics = Analytics(None)
+
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            written = 0
+            for chunk in encode_rows(analytics.iter_conversation_rows(), CONVERSATION_EXPORT_FIELDS, 'csv'):
+                written += len(chunk)
+            stream_seconds = time.perf_counter() - start
+            stream_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            # The previous approach: every row in a list, then one StringIO
+            rows = list(analytics.iter_conversation_rows())
+            output = io.StringIO()
+            writer = csv.DictWriter(output, fieldnames=CONVERSATION_EXPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+            buffered = output.getvalue()
+            buffered_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        print(f"\nExport of {written / 1e6:.1f}MB: streamed peak {stream_peak / 1e6:.1f}MB "
+              f"in {stream_seconds:.2f}s, buffered peak {buffered_peak / 1e6:.1f}MB")
+
+        assert len(buffered) > 0
+        assert stream_peak < 5e6
+        assert stream_peak < buffered_peak * 0.2